@@ -6,6 +6,8 @@ Uses yt-dlp as primary method with web scraping fallback
 import os
 import re
 import json
+import asyncio
+import logging
 import sys
 import subprocess
 import urllib.request
@@ -17,13 +19,27 @@ import time  # Add time module for sleep
 import requests  # Add requests library for modern HTTP requests
 import random
 import concurrent.futures
+import copy
+import contextvars
 import traceback  # Add traceback for error handling
 from urllib.parse import urlparse, parse_qs
 from typing import Dict, Any
+from ttl_cache import TTLCache
+from request_context import RequestContext, memoized
+from title_normalizer import normalize_title, normalize_titles, normalizes_titles
+from records import VideoRecord, PlaylistRecord
+from duration_parser import summarize_durations, video_durations
+from playlist_scorer import SCORING_CONFIG, playlist_stats, table_points
+from candidate_store import get_candidate_store
+from playlist_stats_store import get_playlist_stats_store, playlist_from_fields
+from negative_cache import NegativeCache, TERMINAL_FAILURES, classify_failure
+from usage_meter import current_labels, usage_labels
+
+logger = logging.getLogger(__name__)
 
 # Import relevance checker for batch processing
 try:
-    from relevance_checker import check_batch_relevance, preprocess_title
+    from relevance_checker import check_batch_relevance
     HAS_RELEVANCE_CHECKER = True
 except ImportError:
     # print("Warning: relevance_checker module not found. Relevance checking will be unavailable.")
@@ -31,8 +47,6 @@ except ImportError:
     def check_batch_relevance(titles, query):
         #print("Relevance checking unavailable: relevance_checker module not found")
         return None
-    def preprocess_title(title, max_length=200):
-        return title
 
 # Try to import dotenv for .env file support
 try:
@@ -52,6 +66,26 @@ except ImportError:
     ##print("Note: Advanced playlist functionality unavailable. Using fallback methods.")
     HAS_CUSTOM_PLAYLIST = False
 
+# Video details are cached by ID; bulk requests are split into chunks fetched concurrently
+VIDEO_DETAILS_CACHE = TTLCache(ttl=int(os.environ.get("VIDEO_DETAILS_CACHE_TTL", "3600")))
+VIDEO_DETAILS_BATCH_SIZE = 25
+VIDEO_DETAILS_MAX_WORKERS = 8
+
+# Private, deleted, empty and throttled playlists/videos are remembered briefly so the
+# next request skips the fallback cascade (TTL per failure class, see negative_cache.py)
+NEGATIVE_CACHE = NegativeCache()
+
+# Playlist fetch mode used while scoring candidates:
+# "stats" reads header totals from the first page and only loads the full video list for the winner,
+# "full" fetches every video of every candidate
+PLAYLIST_FETCH_MODE = os.environ.get("PLAYLIST_FETCH_MODE", "stats").lower()
+
+# Reuse playlist stats across queries from the playlist stats store (stats mode only)
+PLAYLIST_STATS_STORE_ENABLED = os.environ.get("PLAYLIST_STATS_STORE_ENABLED", "true").lower() == "true"
+
+# Save scored candidates to the candidate store so they can be re-ranked under a new scoring config
+CANDIDATE_STORE_ENABLED = os.environ.get("CANDIDATE_STORE_ENABLED", "true").lower() == "true"
+
 # ===== UTILITY FUNCTIONS =====
 
 def format_number(num):
@@ -73,77 +107,8 @@ def format_number(num):
         return str(num)
 
 def clean_repeated_title(data: Dict[str, Any]) -> Dict[str, Any]:
-    """Clean repeated titles in data recursively, handling any nested structures"""
-    if not data:
-        return data
-    
-    # Handle dictionary case
-    if isinstance(data, dict):
-        # Clean title if present
-        if "title" in data and isinstance(data["title"], str):
-            # First handle newlines
-            if '\n' in data["title"]:
-                data["title"] = data["title"].split('\n')[0].strip()
-            
-            # Then use the preprocess_title function if available
-            if HAS_RELEVANCE_CHECKER:
-                original_title = data["title"]
-                data["title"] = preprocess_title(data["title"], max_length=200)
-                
-                # Log if title was modified
-                # if original_title != data["title"] and len(original_title) > 50:
-                #     print(f"Title cleaned: {len(original_title)} chars -> {len(data['title'])} chars")
-                #     if len(original_title) > 100:
-                #         print(f"Original (truncated): {original_title[:40]}...{original_title[-40:]}")
-                #     else:
-                #         print(f"Original: {original_title}")
-                #     print(f"Cleaned: {data['title']}")
-            else:
-                # Fallback cleaning if preprocess_title is not available
-                # Remove excessive repetition using regex
-                title = data["title"]
-                
-                # Handle repetitive patterns (3 or more repetitions)
-                repetition_pattern = r'(\b[\w\s]{5,50}\b)(\s+\1){2,}'
-                
-                # Keep checking for repetitions until no more are found
-                prev_title = ""
-                current_title = title
-                
-                while prev_title != current_title:
-                    prev_title = current_title
-                    
-                    # Find repetitive patterns
-                    match = re.search(repetition_pattern, current_title, re.IGNORECASE)
-                    if match:
-                        # Get the repeating pattern
-                        pattern = match.group(1)
-                        # Replace multiple repetitions with just one instance
-                        replacement = pattern
-                        # Create a regex that matches 2 or more repetitions of this exact pattern
-                        exact_pattern = re.escape(pattern) + r'(\s+' + re.escape(pattern) + r'){1,}'
-                        current_title = re.sub(exact_pattern, replacement, current_title, flags=re.IGNORECASE)
-                
-                # Truncate if still too long
-                if len(current_title) > 200:
-                    #print(f"Title too long ({len(title)} chars), truncating to 200 chars")
-                    current_title = current_title[:200] + "..."
-                
-                data["title"] = current_title
-        
-        # Recursively clean all nested dictionaries and lists
-        for key, value in data.items():
-            if isinstance(value, (dict, list)):
-                data[key] = clean_repeated_title(value)
-                
-    # Handle list case
-    elif isinstance(data, list):
-        # Clean each item in the list
-        for i, item in enumerate(data):
-            if isinstance(item, (dict, list)):
-                data[i] = clean_repeated_title(item)
-    
-    return data
+    """Clean repeated titles in data recursively, skipping records already normalized at ingestion"""
+    return normalize_titles(data)
 
 def extract_video_id(url):
     """Extract the video ID from a YouTube URL"""
@@ -200,6 +165,7 @@ def check_yt_dlp():
     except (subprocess.SubprocessError, FileNotFoundError):
         return False
 
+@normalizes_titles
 def search_youtube(query, limit=8, content_type=None, min_duration=None, max_duration=None):
     """Search for videos or playlists on YouTube with filters"""
     # Try yt-dlp first (best results)
@@ -295,50 +261,88 @@ def search_youtube(query, limit=8, content_type=None, min_duration=None, max_dur
 
 # ===== MAIN API FUNCTIONS =====
 
+def _format_yt_dlp_video_details(data, url):
+    """Convert a yt-dlp --print-json record to the video details structure"""
+    # Process the publish date to ensure we have a usable format
+    publish_date = data.get("upload_date", "")
+    # If we have a date in YYYYMMDD format, format it more clearly
+    if publish_date and publish_date.isdigit() and len(publish_date) == 8:
+        year = publish_date[:4]
+        month = publish_date[4:6]
+        day = publish_date[6:8]
+        publish_date_formatted = f"{year}-{month}-{day}"
+    else:
+        publish_date_formatted = publish_date
+    
+    return normalize_titles({
+        "id": data.get("id", ""),
+        "title": data.get("title", "Unknown"),
+        "channel": {
+            "name": data.get("uploader", "Unknown Channel"),
+            "id": data.get("channel_id", ""),
+            "url": data.get("channel_url", "")
+        },
+        "description": data.get("description", ""),
+        "thumbnail": data.get("thumbnail", ""),
+        "publish_date": publish_date,
+        "publish_date_formatted": publish_date_formatted,
+        "duration": data.get("duration", 0),
+        "duration_string": data.get("duration_string", ""),
+        "views": data.get("view_count", 0),
+        "views_formatted": format_number(data.get("view_count", 0)),
+        "likes": data.get("like_count", None),
+        "likes_formatted": format_number(data.get("like_count", None)),
+        "url": url,
+        "source": "yt-dlp"
+    })
+
 def get_video_details(video_id_or_url):
     """Get details about a YouTube video including likes"""
     video_id = extract_video_id(video_id_or_url)
     url = f"https://www.youtube.com/watch?v={video_id}"
     
+    cached = VIDEO_DETAILS_CACHE.get(video_id)
+    if cached is not None:
+        # Deep copies, so callers editing nested values (e.g. "channel") never change the cache
+        return copy.deepcopy(cached)
+    
+    failed = NEGATIVE_CACHE.get("video", video_id)
+    if failed is not None:
+        return _failed_video_result(video_id, url, failed["failure"], failed["reason"])
+    
+    details = _fetch_video_details(video_id, url)
+    if "error" not in details:
+        VIDEO_DETAILS_CACHE.set(video_id, details)
+    elif details.get("failure"):
+        NEGATIVE_CACHE.add("video", video_id, details["failure"], details["error"])
+    return copy.deepcopy(details)
+
+def _failed_video_result(video_id, url, failure, reason):
+    """Error result for a video that could not be fetched"""
+    return {
+        "id": video_id,
+        "title": "Could not retrieve video info",
+        "error": reason,
+        "failure": failure,
+        "url": url
+    }
+
+@normalizes_titles
+def _fetch_video_details(video_id, url):
+    """Fetch details for a single video with yt-dlp, falling back to scraping the watch page"""
     # Try yt-dlp first (best results)
     if check_yt_dlp():
         try:
             cmd = ["yt-dlp", "--no-playlist", "--skip-download", "--print-json", url]
             result = subprocess.run(cmd, capture_output=True, text=True, check=True)
             data = json.loads(result.stdout.strip())
-            
-            # Process the publish date to ensure we have a usable format
-            publish_date = data.get("upload_date", "")
-            # If we have a date in YYYYMMDD format, format it more clearly
-            if publish_date and publish_date.isdigit() and len(publish_date) == 8:
-                year = publish_date[:4]
-                month = publish_date[4:6]
-                day = publish_date[6:8]
-                publish_date_formatted = f"{year}-{month}-{day}"
-            else:
-                publish_date_formatted = publish_date
-            
-            return {
-                "id": data.get("id", ""),
-                "title": data.get("title", "Unknown"),
-                "channel": {
-                    "name": data.get("uploader", "Unknown Channel"),
-                    "id": data.get("channel_id", ""),
-                    "url": data.get("channel_url", "")
-                },
-                "description": data.get("description", ""),
-                "thumbnail": data.get("thumbnail", ""),
-                "publish_date": publish_date,
-                "publish_date_formatted": publish_date_formatted,
-                "duration": data.get("duration", 0),
-                "duration_string": data.get("duration_string", ""),
-                "views": data.get("view_count", 0),
-                "views_formatted": format_number(data.get("view_count", 0)),
-                "likes": data.get("like_count", None),
-                "likes_formatted": format_number(data.get("like_count", None)),
-                "url": url,
-                "source": "yt-dlp"
-            }
+            return _format_yt_dlp_video_details(data, url)
+        except subprocess.CalledProcessError as e:
+            print(f"yt-dlp error: {e}")
+            failure = classify_failure(e.stderr)
+            if failure in TERMINAL_FAILURES:
+                # The watch page would show the same, skip the web fallback
+                return _failed_video_result(video_id, url, failure, (e.stderr or "").strip()[-200:])
         except Exception as e:
             print(f"yt-dlp error: {e}")
     
@@ -440,10 +444,125 @@ def get_video_details(video_id_or_url):
             "id": video_id,
             "title": "Could not retrieve video info",
             "error": str(e),
+            "failure": classify_failure(str(e), "transient"),
             "url": url
         }
 
-def get_playlist_videos(playlist_id_or_url, limit=0, max_details=15):
+def get_videos_details(video_ids, fields=None):
+    """
+    Get details for many videos at once
+    
+    Cached videos are served from VIDEO_DETAILS_CACHE. The rest are fetched in chunks of
+    VIDEO_DETAILS_BATCH_SIZE with one yt-dlp process per chunk, running the chunks concurrently.
+    Videos yt-dlp could not return are fetched individually with get_video_details.
+    
+    Args:
+        video_ids: List of YouTube video IDs or URLs (duplicates are fetched once)
+        fields: Optional list of fields to return for each video, e.g. ["duration"] ("id" is always included)
+        
+    Returns:
+        dict: Video details keyed by video ID, in request order
+    """
+    ids = list(dict.fromkeys(extract_video_id(video_id) for video_id in video_ids if video_id))
+    
+    results = VIDEO_DETAILS_CACHE.get_many(ids)
+    
+    # Videos that recently failed are answered from the negative cache
+    for video_id in ids:
+        if video_id not in results:
+            failed = NEGATIVE_CACHE.get("video", video_id)
+            if failed is not None:
+                results[video_id] = _failed_video_result(
+                    video_id, f"https://www.youtube.com/watch?v={video_id}", failed["failure"], failed["reason"]
+                )
+    
+    missing = [video_id for video_id in ids if video_id not in results]
+    
+    if missing:
+        chunks = [missing[i:i + VIDEO_DETAILS_BATCH_SIZE] for i in range(0, len(missing), VIDEO_DETAILS_BATCH_SIZE)]
+        
+        if check_yt_dlp():
+            with concurrent.futures.ThreadPoolExecutor(max_workers=VIDEO_DETAILS_MAX_WORKERS) as executor:
+                for fetched in executor.map(_fetch_video_details_batch, chunks):
+                    results.update(fetched)
+        
+        # Anything yt-dlp skipped (or all of them, without yt-dlp) goes through the single-video path
+        remaining = [video_id for video_id in missing if video_id not in results]
+        if remaining:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=VIDEO_DETAILS_MAX_WORKERS) as executor:
+                for video_id, details in zip(remaining, executor.map(get_video_details, remaining)):
+                    results[video_id] = details
+    
+    ordered = {}
+    for video_id in ids:
+        details = results.get(video_id)
+        if details is None:
+            continue
+        # Cached dicts are shared with later requests, so hand out deep copies
+        if fields:
+            details = {field: copy.deepcopy(details.get(field)) for field in ["id", *fields]}
+        else:
+            details = copy.deepcopy(details)
+        ordered[video_id] = details
+    return ordered
+
+def _fetch_video_details_batch(video_ids):
+    """Fetch details for several videos with a single yt-dlp process, caching the results"""
+    urls = [f"https://www.youtube.com/watch?v={video_id}" for video_id in video_ids]
+    cmd = ["yt-dlp", "--no-playlist", "--skip-download", "--ignore-errors", "--print-json", *urls]
+    
+    fetched = {}
+    try:
+        # Unavailable videos make yt-dlp exit non-zero, the rest are still printed
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        for line in result.stdout.splitlines():
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            video_id = data.get("id")
+            if video_id not in video_ids:
+                continue
+            details = _format_yt_dlp_video_details(data, f"https://www.youtube.com/watch?v={video_id}")
+            VIDEO_DETAILS_CACHE.set(video_id, details)
+            fetched[video_id] = details
+        
+        # Private/removed videos are reported per ID on stderr, remember them instead of retrying one by one
+        for match in re.finditer(r'ERROR: \[youtube\] ([\w-]+): (.+)', result.stderr or ""):
+            video_id, reason = match.groups()
+            failure = classify_failure(reason)
+            if video_id in video_ids and video_id not in fetched and failure in TERMINAL_FAILURES:
+                NEGATIVE_CACHE.add("video", video_id, failure, reason)
+                fetched[video_id] = _failed_video_result(
+                    video_id, f"https://www.youtube.com/watch?v={video_id}", failure, reason
+                )
+    except Exception as e:
+        print(f"yt-dlp batch error: {e}")
+    return fetched
+
+def _add_first_video_details(video, context=None):
+    """Fetch detailed info (likes/views/date/duration) for a playlist's first video, used for scoring"""
+    try:
+        details = memoized(context, "video_details", video["id"], get_video_details, video["id"])
+        if "likes" in details:
+            video["likes"] = details["likes"]
+            video["likes_formatted"] = details["likes_formatted"]
+        if "views" in details:
+            video["views"] = details["views"]
+            video["views_formatted"] = details["views_formatted"]
+        if "publish_date" in details:
+            video["publish_date"] = details["publish_date"]
+        if "duration" in details:
+            video["duration_seconds"] = details["duration"]
+            video["duration_string"] = details["duration_string"]
+    except Exception as e:
+        print(f"Error getting details for first video: {e}")
+    return video
+
+@normalizes_titles
+def get_playlist_videos(playlist_id_or_url, limit=0, max_details=15, context=None):
     """
     Get videos from a YouTube playlist
     
@@ -451,6 +570,7 @@ def get_playlist_videos(playlist_id_or_url, limit=0, max_details=15):
         playlist_id_or_url: YouTube playlist ID or URL
         limit: Maximum number of videos to retrieve (0 for all videos)
         max_details: Maximum number of videos to fetch detailed info for (typically just set to 1)
+        context: Optional RequestContext used to reuse upstream results within one request
         
     Returns:
         dict: Playlist info with videos
@@ -464,8 +584,13 @@ def get_playlist_videos(playlist_id_or_url, limit=0, max_details=15):
     playlist_id = extract_playlist_id(playlist_id_or_url)
     playlist_url = f"https://www.youtube.com/playlist?list={playlist_id}"
     
+    # Playlists that recently turned out private, deleted or empty are not fetched again
+    failed = NEGATIVE_CACHE.get("playlist", playlist_id)
+    if failed is not None:
+        return _failed_playlist_result(playlist_id, playlist_url, failed["failure"], failed["reason"])
+    
     # First, try to get direct playlist view count from the web page
-    direct_view_count = get_direct_playlist_views(playlist_url, debug=True)
+    direct_view_count = memoized(context, "playlist_views", playlist_url, get_direct_playlist_views, playlist_url, debug=True)
     
     # Try using the CustomPlaylist implementation if available
     if HAS_CUSTOM_PLAYLIST:
@@ -473,16 +598,22 @@ def get_playlist_videos(playlist_id_or_url, limit=0, max_details=15):
             #print(f"Fetching playlist using CustomPlaylist: {playlist_id}")
             playlist = CustomPlaylist(playlist_id)
             
+            # yt-dlp and the web fallback would run into the same private/deleted/throttled page
+            if playlist.failure in TERMINAL_FAILURES:
+                NEGATIVE_CACHE.add("playlist", playlist_id, playlist.failure, playlist.failure_reason)
+                return _failed_playlist_result(playlist_id, playlist_url, playlist.failure, playlist.failure_reason)
+            
             # Use asyncio to directly fetch all videos using our fetch_playlist method
-            import asyncio
             try:
                 loop = asyncio.new_event_loop()
                 asyncio.set_event_loop(loop)
-                success = loop.run_until_complete(playlist.fetch_playlist())
+                success = loop.run_until_complete(playlist.fetch_playlist(limit=limit))
                 loop.close()
                 
                 if not success or not playlist.videos:
                     #print("Error fetching playlist or no videos found")
+                    NEGATIVE_CACHE.add("playlist", playlist_id, playlist.failure or ("empty" if success else "transient"),
+                                       playlist.failure_reason or "No videos found")
                     return {
                         "id": playlist_id,
                         "title": playlist.info.get('title', 'Unknown Playlist'),
@@ -499,6 +630,8 @@ def get_playlist_videos(playlist_id_or_url, limit=0, max_details=15):
                 # If we failed to fetch videos with the async method, try the regular method
             if not playlist.videos:
                 #print("No videos found in playlist")
+                NEGATIVE_CACHE.add("playlist", playlist_id, playlist.failure or "transient",
+                                   playlist.failure_reason or "No videos found")
                 return {
                     "id": playlist_id,
                     "title": playlist.info.get('title', 'Unknown Playlist'),
@@ -513,40 +646,6 @@ def get_playlist_videos(playlist_id_or_url, limit=0, max_details=15):
                 playlist.videos = playlist.videos[:limit]
                 #print(f"Limited videos to {limit} as requested")
             
-            # Format the videos to match our expected structure
-            formatted_videos = []
-            for i, video in enumerate(playlist.videos):
-                formatted_video = {
-                    "id": video.get("id", ""),
-                    "title": video.get("title", "Unknown"),
-                    "channel": {"name": video.get("channel", {}).get("name", "Unknown Channel")},
-                    "duration": video.get("duration", "Unknown"),
-                    "url": f"https://www.youtube.com/watch?v={video.get('id', '')}",
-                    "publish_date": video.get("publish_date", "Unknown")
-                }
-                formatted_videos.append(formatted_video)
-            
-            # Get detailed info for ONLY the first video (if available) for scoring purposes
-            if formatted_videos and max_details > 0:
-                #print(f"\nFetching detailed information for first video for scoring purposes...")
-                try:
-                    first_video = formatted_videos[0]
-                    #print(f"Getting details for first video: {first_video['title'][:30]}...")
-                    details = get_video_details(first_video["id"])
-                    if "likes" in details:
-                        first_video["likes"] = details["likes"]
-                        first_video["likes_formatted"] = details["likes_formatted"]
-                    if "views" in details:
-                        first_video["views"] = details["views"]
-                        first_video["views_formatted"] = details["views_formatted"]
-                    if "publish_date" in details:
-                        first_video["publish_date"] = details["publish_date"]
-                    if "duration" in details:
-                        first_video["duration_seconds"] = details["duration"]
-                        first_video["duration_string"] = details["duration_string"]
-                except Exception as e:
-                    print(f"Error getting details for first video: {e}")
-            
             # #print debugging info for the playlist title
             #print(f"Raw playlist info: {playlist.info}")
             
@@ -563,23 +662,22 @@ def get_playlist_videos(playlist_id_or_url, limit=0, max_details=15):
                 except Exception as e:
                     print(f"Failed to get playlist title from yt-dlp: {e}")
             
-            # Clean up the playlist title (remove repetitions)
-            if playlist_title and '\n' in playlist_title:
-                # If the title contains newlines, it might be repeated
-                # Take only the first line
-                playlist_title = playlist_title.split('\n')[0].strip()
+            # The title is normalized (first line, repetitions removed) by the record
+            playlist_record = PlaylistRecord(
+                playlist_id,
+                playlist_title,
+                playlist.info.get('channel', {}).get('name', 'Unknown Channel'),
+                playlist.videos
+            )
             
-            # Add direct view count to the result if available
-            result = {
-                "id": playlist_id,
-                "title": playlist_title,
-                "channel": {"name": playlist.info.get('channel', {}).get('name', 'Unknown Channel')},
-                "url": playlist_url,
-                "videos": formatted_videos,
-                "video_count": len(formatted_videos),
-                "source": "custom_playlist"
-            }
+            # Convert to plain dicts only now that the result leaves the fetcher
+            result = playlist_record.to_dict()
+            
+            # Get detailed info for ONLY the first video (if available) for scoring purposes
+            if result["videos"] and max_details > 0:
+                _add_first_video_details(result["videos"][0], context)
             
+            # Add direct view count to the result if available
             if direct_view_count is not None:
                 result["direct_view_count"] = direct_view_count
                 result["direct_view_count_formatted"] = format_number(direct_view_count)
@@ -613,49 +711,37 @@ def get_playlist_videos(playlist_id_or_url, limit=0, max_details=15):
                 
                 try:
                     data = json.loads(line)
-                    video = {
+                    videos.append(VideoRecord.from_entry({
                         "id": data.get("id", ""),
                         "title": data.get("title", "Unknown"),
-                        "channel": {"name": data.get("uploader", "Unknown Channel")},
+                        "channel": data.get("uploader", "Unknown Channel"),
                         "duration": data.get("duration_string", "Unknown"),
-                        "duration_seconds": data.get("duration", 0),
-                        "thumbnail": data.get("thumbnail", ""),
-                        "url": f"https://www.youtube.com/watch?v={data.get('id', '')}",
+                        "thumbnail": data.get("thumbnail"),
                         "publish_date": data.get("upload_date", "Unknown")
-                    }
-                    videos.append(video)
+                    }))
                 except json.JSONDecodeError:
                     print(f"Error parsing JSON: {line}")
             
+            result = PlaylistRecord(playlist_id, playlist_title, videos=videos, source="yt-dlp").to_dict()
+            
             # Get detailed info for ONLY the first video (if available)
-            if videos and max_details > 0:
-                first_video = videos[0]
-                try:
-                    details = get_video_details(first_video["id"])
-                    if "likes" in details:
-                        first_video["likes"] = details["likes"]
-                        first_video["likes_formatted"] = details["likes_formatted"]
-                    if "views" in details:
-                        first_video["views"] = details["views"]
-                        first_video["views_formatted"] = details["views_formatted"]
-                except Exception as e:
-                    print(f"Error getting details for first video: {e}")
+            if result["videos"] and max_details > 0:
+                _add_first_video_details(result["videos"][0], context)
             
             # Add direct view count to the result if available
-            result = {
-                "id": playlist_id,
-                "title": playlist_title,
-                "url": playlist_url,
-                "videos": videos,
-                "video_count": len(videos),
-                "source": "yt-dlp"
-            }
-            
             if direct_view_count is not None:
                 result["direct_view_count"] = direct_view_count
                 result["direct_view_count_formatted"] = format_number(direct_view_count)
                 
             return result
+        except subprocess.CalledProcessError as e:
+            print(f"yt-dlp error: {e}")
+            failure = classify_failure(e.stderr)
+            if failure in TERMINAL_FAILURES:
+                # The web fallback would load the same page, stop here
+                reason = (e.stderr or "").strip()[-200:]
+                NEGATIVE_CACHE.add("playlist", playlist_id, failure, reason)
+                return _failed_playlist_result(playlist_id, playlist_url, failure, reason)
         except Exception as e:
             print(f"yt-dlp error: {e}")
     
@@ -683,45 +769,15 @@ def get_playlist_videos(playlist_id_or_url, limit=0, max_details=15):
                 break
             
             video_id, title, channel = match.groups()
-            video = {
-                "id": video_id,
-                "title": title,
-                "channel": {"name": channel},
-                "url": f"https://www.youtube.com/watch?v={video_id}",
-                "publish_date": "Unknown"
-            }
-            videos.append(video)
+            videos.append(VideoRecord(video_id, normalize_title(title), channel))
+        
+        result = PlaylistRecord(playlist_id, playlist_title, videos=videos, source="web_fallback").to_dict()
         
         # Get detailed info for ONLY the first video (if available)
-        if videos and max_details > 0:
-            try:
-                first_video = videos[0]
-                #print(f"Getting details for first video: {first_video['title'][:30]}...")
-                details = get_video_details(first_video["id"])
-                if "likes" in details:
-                    first_video["likes"] = details["likes"]
-                    first_video["likes_formatted"] = details["likes_formatted"]
-                if "views" in details:
-                    first_video["views"] = details["views"]
-                    first_video["views_formatted"] = details["views_formatted"]
-                if "publish_date" in details:
-                    first_video["publish_date"] = details["publish_date"]
-                if "duration" in details:
-                    first_video["duration_seconds"] = details["duration"]
-                    first_video["duration_string"] = details["duration_string"]
-            except Exception as e:
-                print(f"Error getting details for first video: {e}")
+        if result["videos"] and max_details > 0:
+            _add_first_video_details(result["videos"][0], context)
         
         # Add direct view count to the result if available
-        result = {
-            "id": playlist_id,
-            "title": playlist_title,
-            "url": playlist_url,
-            "videos": videos,
-            "video_count": len(videos),
-            "source": "web_fallback"
-        }
-        
         if direct_view_count is not None:
             result["direct_view_count"] = direct_view_count
             result["direct_view_count_formatted"] = format_number(direct_view_count)
@@ -729,14 +785,285 @@ def get_playlist_videos(playlist_id_or_url, limit=0, max_details=15):
         return result
     except Exception as e:
         #print(f"Web fallback error: {e}")
+        failure = classify_failure(str(e), "transient")
+        NEGATIVE_CACHE.add("playlist", playlist_id, failure, str(e))
         return {
             "id": playlist_id,
             "title": "Could not retrieve playlist info",
             "error": str(e),
+            "failure": failure,
             "url": playlist_url,
             "videos": []
         }
 
+def _failed_playlist_result(playlist_id, playlist_url, failure, reason):
+    """Empty result for a playlist that could not be fetched"""
+    return {
+        "id": playlist_id,
+        "title": "Could not retrieve playlist info",
+        "error": reason,
+        "failure": failure,
+        "url": playlist_url,
+        "videos": [],
+        "video_count": 0
+    }
+
+@normalizes_titles
+def get_playlist_stats(playlist_id_or_url, max_details=1, context=None):
+    """
+    Get playlist statistics for scoring without fetching every video
+    
+    Reads the header totals (video count, view count) from the first playlist page and
+    estimates the total duration from the lengthText values found on that page.
+    The returned dict has the same shape as get_playlist_videos, but "videos" only
+    holds the first video and "videos_loaded" is False.
+    
+    Args:
+        playlist_id_or_url: YouTube playlist ID or URL
+        max_details: Fetch detailed info (likes/views/date) for the first video if > 0
+        context: Optional RequestContext used to reuse upstream results within one request
+        
+    Returns:
+        dict: Playlist stats, or None if stats could not be read (callers fall back to get_playlist_videos)
+    """
+    if not HAS_CUSTOM_PLAYLIST:
+        return None
+    
+    playlist_id = extract_playlist_id(playlist_id_or_url)
+    playlist_url = f"https://www.youtube.com/playlist?list={playlist_id}"
+    
+    # Known dead playlists are answered by get_playlist_videos from the negative cache
+    if NEGATIVE_CACHE.get("playlist", playlist_id) is not None:
+        return None
+    
+    try:
+        custom_playlist = CustomPlaylist(playlist_id)
+        stats = custom_playlist.get_stats()
+    except Exception as e:
+        print(f"Error reading playlist stats: {e}")
+        return None
+    
+    if custom_playlist.failure in TERMINAL_FAILURES:
+        NEGATIVE_CACHE.add("playlist", playlist_id, custom_playlist.failure, custom_playlist.failure_reason)
+        return None
+    
+    if not stats:
+        return None
+    
+    first_video = stats["first_video"].to_dict()
+    
+    if max_details > 0:
+        _add_first_video_details(first_video, context)
+    
+    # The title is normalized with the rest of the result by @normalizes_titles
+    result = {
+        "id": playlist_id,
+        "title": stats["title"],
+        "channel": {"name": stats["channel"].get("name", "Unknown Channel")},
+        "url": playlist_url,
+        "videos": [first_video],
+        "video_count": stats["video_count"],
+        "videos_loaded": False,
+        "duration_confidence": stats["duration_confidence"],
+        "duration_sample_size": stats["duration_sample_size"],
+        "source": "custom_playlist_stats",
+        # Enhanced fields understood by score_playlist
+        "_video_count": stats["video_count"]
+    }
+    
+    if stats["avg_duration_minutes"] is not None:
+        result["_avg_duration_minutes"] = stats["avg_duration_minutes"]
+        result["_total_duration_minutes"] = stats["total_duration_minutes"]
+    
+    direct_view_count = stats["view_count"]
+    if direct_view_count is None:
+        direct_view_count = memoized(context, "playlist_views", playlist_url, get_direct_playlist_views, playlist_url)
+    
+    if direct_view_count is not None:
+        result["direct_view_count"] = direct_view_count
+        result["direct_view_count_formatted"] = format_number(direct_view_count)
+    
+    return result
+
+def get_stored_playlist_stats(playlist_id_or_url, max_details=1, context=None):
+    """
+    Get playlist statistics from the playlist stats store, fetching only what is stale
+    
+    Stats do not depend on the query, so a playlist that was a candidate for another
+    query recently is scored from the store without loading its page. Only stale field
+    groups are fetched again: the header and durations both come from the playlist page,
+    while a fresh first video is kept and its details are not looked up again.
+    
+    Args:
+        playlist_id_or_url: YouTube playlist ID or URL
+        max_details: Fetch detailed info (likes/views/date) for the first video if > 0
+        context: Optional RequestContext used to reuse upstream results within one request
+        
+    Returns:
+        dict: Playlist stats in the get_playlist_stats format, or None if they could not be read
+    """
+    if not PLAYLIST_STATS_STORE_ENABLED:
+        return get_playlist_stats(playlist_id_or_url, max_details, context)
+    
+    playlist_id = extract_playlist_id(playlist_id_or_url)
+    store = get_playlist_stats_store()
+    
+    try:
+        entries = store.get(playlist_id)
+    except Exception as e:
+        print(f"Error reading playlist stats store: {e}")
+        entries = {}
+    
+    stored_first_video = entries.get("first_video")
+    first_video_fresh = bool(
+        stored_first_video and stored_first_video["fresh"] and stored_first_video["value"].get("videos")
+        and (max_details <= 0 or "views" in stored_first_video["value"]["videos"][0])
+    )
+    
+    if entries.get("header", {}).get("fresh") and entries.get("durations", {}).get("fresh") and "first_video" in entries:
+        playlist = playlist_from_fields(playlist_id, entries)
+        if first_video_fresh:
+            return playlist
+        
+        if max_details > 0:
+            _add_first_video_details(playlist["videos"][0], context)
+        _save_playlist_stats(store, playlist, ["first_video"])
+        return playlist
+    
+    # The page has to be loaded for the header or durations; the first video's details
+    # are only looked up again if they are stale or the playlist now starts with another video
+    playlist = get_playlist_stats(playlist_id, 0 if first_video_fresh else max_details, context)
+    if not playlist:
+        return playlist
+    
+    fields = ["header", "durations"]
+    if first_video_fresh and playlist["videos"][0]["id"] == stored_first_video["value"]["videos"][0]["id"]:
+        playlist["videos"] = stored_first_video["value"]["videos"]
+    else:
+        if first_video_fresh and max_details > 0:
+            _add_first_video_details(playlist["videos"][0], context)
+        fields.append("first_video")
+    
+    _save_playlist_stats(store, playlist, fields)
+    return playlist
+
+def _save_playlist_stats(store, playlist, fields):
+    """Write field groups of a playlist to the stats store; a failed write only costs a refetch later"""
+    try:
+        store.put_playlist(playlist, fields=fields)
+    except Exception as e:
+        print(f"Error saving playlist stats: {e}")
+
+def load_playlist_videos(playlist, limit=0, context=None):
+    """
+    Load the full video list for a playlist that was fetched in stats mode
+    
+    Args:
+        playlist: Playlist dict returned by get_playlist_stats
+        limit: Maximum number of videos to load (0 for all videos)
+        context: Optional RequestContext used to reuse upstream results within one request
+        
+    Returns:
+        dict: The same playlist dict with "videos" populated
+    """
+    if playlist.get("videos_loaded", True):
+        return playlist
+    
+    full_playlist = get_playlist_videos(playlist["id"], limit=limit, max_details=0, context=context)
+    videos = full_playlist.get("videos", [])
+    if not videos:
+        return playlist
+    
+    # Keep the first-video details that were already fetched for scoring
+    first_video = playlist["videos"][0] if playlist.get("videos") else None
+    if first_video and videos[0].get("id") == first_video.get("id"):
+        videos[0] = {**videos[0], **first_video}
+    
+    playlist["videos"] = videos
+    playlist["video_count"] = len(videos)
+    playlist["videos_loaded"] = True
+    return playlist
+
+async def iter_playlist_videos(playlist_id_or_url, limit=0, max_details=15):
+    """
+    Stream a playlist's videos as each page is fetched
+    
+    Yields a {"type": "playlist"} header first, then one {"type": "video"} item per video
+    as soon as its page has been parsed, and finally a {"type": "end"} item with the totals
+    and the direct view count. Falls back to get_playlist_videos when CustomPlaylist is
+    unavailable or returns no videos.
+    
+    Args:
+        playlist_id_or_url: YouTube playlist ID or URL
+        limit: Maximum number of videos to retrieve (0 for all videos)
+        max_details: Fetch detailed info for the first video if > 0
+    """
+    loop = asyncio.get_running_loop()
+    
+    playlist_id = extract_playlist_id(playlist_id_or_url)
+    playlist_url = f"https://www.youtube.com/playlist?list={playlist_id}"
+    
+    # The view count is only needed for the final line, fetch it alongside the videos
+    direct_views_future = loop.run_in_executor(None, get_direct_playlist_views, playlist_url)
+    
+    header_sent = False
+    video_count = 0
+    source = "custom_playlist"
+    
+    if HAS_CUSTOM_PLAYLIST:
+        try:
+            playlist = await loop.run_in_executor(None, CustomPlaylist, playlist_id)
+            
+            yield normalize_titles({
+                "type": "playlist",
+                "id": playlist_id,
+                "title": playlist.info.get('title', 'Unknown Playlist'),
+                "channel": {"name": playlist.info.get('channel', {}).get('name', 'Unknown Channel')},
+                "url": playlist_url
+            })
+            header_sent = True
+            
+            pages = playlist.iter_pages(limit=limit)
+            try:
+                async for batch in pages:
+                    for record in batch:
+                        video = record.to_dict()
+                        if video_count == 0 and max_details > 0:
+                            await loop.run_in_executor(None, _add_first_video_details, video)
+                        yield {"type": "video", "index": video_count, "video": video}
+                        video_count += 1
+            finally:
+                await pages.aclose()
+        except Exception as e:
+            print(f"Error streaming playlist with CustomPlaylist: {e}")
+            traceback.print_exc()
+    
+    direct_view_count = await direct_views_future
+    
+    if video_count == 0:
+        # Nothing was streamed, fall back to the regular (non-streaming) fetch
+        result = await loop.run_in_executor(None, get_playlist_videos, playlist_id, limit, max_details)
+        if not header_sent:
+            yield {
+                "type": "playlist",
+                "id": playlist_id,
+                "title": result.get("title", "Unknown Playlist"),
+                "channel": result.get("channel", {"name": "Unknown Channel"}),
+                "url": playlist_url
+            }
+        for video in result.get("videos", []):
+            yield {"type": "video", "index": video_count, "video": video}
+            video_count += 1
+        source = result.get("source", source)
+        if direct_view_count is None:
+            direct_view_count = result.get("direct_view_count")
+    
+    end = {"type": "end", "video_count": video_count, "source": source}
+    if direct_view_count is not None:
+        end["direct_view_count"] = direct_view_count
+        end["direct_view_count_formatted"] = format_number(direct_view_count)
+    yield end
+
 def get_direct_playlist_views(playlist_url, debug=False):
     """
     Try to extract total playlist view count directly from YouTube's playlist page
@@ -842,6 +1169,7 @@ def get_direct_playlist_views(playlist_url, debug=False):
         #print(f"Error fetching direct playlist views: {e}")
         return None
 
+@normalizes_titles
 def search_youtube_web(query, limit=10, content_type=None, min_duration=None, max_duration=None):
     """Web scraping fallback for YouTube search"""
     try:
@@ -930,6 +1258,7 @@ def search_youtube_web(query, limit=10, content_type=None, min_duration=None, ma
             "error": str(e)
         }
 
+@normalizes_titles
 def search_playlists(query, limit=10):
     """
     Search specifically for YouTube playlists using direct web scraping
@@ -1096,19 +1425,8 @@ def check_batch_title_relevance(titles, query):
         processed_titles = []
         for title in titles:
             if title:
-                # Use preprocess_title if available, otherwise use simple cleaning
-                if HAS_RELEVANCE_CHECKER:
-                    processed_title = preprocess_title(title, max_length=200)
-                else:
-                    # Simple cleaning for fallback
-                    processed_title = title
-                    if '\n' in processed_title:
-                        processed_title = processed_title.split('\n')[0].strip()
-                    # Truncate if too long
-                    if len(processed_title) > 200:
-                        processed_title = processed_title[:200] + "..."
-                
-                processed_titles.append(processed_title)
+                # A no-op for titles that were already normalized at ingestion
+                processed_titles.append(normalize_title(title))
             else:
                 processed_titles.append("")
         
@@ -1120,8 +1438,10 @@ def check_batch_title_relevance(titles, query):
                     #print(f"Original (truncated): {original[:40]}...{original[-40:]}")
                     print(f"Processed: {processed}")
         
-        # Use our relevance checker module for batch processing
-        result = check_batch_relevance(processed_titles, technology)
+        # Use our relevance checker module for batch processing. The evaluation threads carry
+        # the caller's usage labels; the endpoint is only a default for callers without any
+        with usage_labels(**{"endpoint": "/find/best-playlist", **current_labels()}):
+            result = check_batch_relevance(processed_titles, technology)
         
         # Map results back to original titles
         if result and 'results' in result:
@@ -1140,7 +1460,81 @@ def check_batch_title_relevance(titles, query):
         #print(f"Traceback: {traceback.format_exc()}")
         return None
 
-def find_best_playlist(query, debug=False, detailed_fetch=False):
+class PlaylistPipeline:
+    """
+    Stage hooks used by find_best_playlist
+    
+    Subclass and override a stage to customise one request (e.g. extra title cleaning
+    or logging in the API layer) without replacing module functions:
+    
+        fetch(playlist_id, max_details, context) -> playlist dict used for scoring
+        load(playlist, limit, context)           -> winner with its full video list
+        clean(playlist)                          -> playlist with cleaned titles
+        score(playlist, query, debug, relevance_check, context) -> (score, details)
+        record(query, scored_playlists)          -> persist the candidates' scoring inputs
+        log(message)                             -> progress messages
+    """
+    
+    def fetch(self, playlist_id, max_details, context):
+        """Fetch playlist data for scoring - header stats only in stats mode, the full list otherwise"""
+        playlist = None
+        if PLAYLIST_FETCH_MODE == "stats":
+            playlist = memoized(context, "playlist_stats", (playlist_id, max_details),
+                                get_stored_playlist_stats, playlist_id, max_details=max_details, context=context)
+        if not playlist:
+            playlist = memoized(context, "playlist_videos", (playlist_id, 0, max_details),
+                                get_playlist_videos, playlist_id, limit=0, max_details=max_details, context=context)
+        return playlist
+    
+    def load(self, playlist, limit, context):
+        """Load the full video list for the winning playlist"""
+        return load_playlist_videos(playlist, limit=limit, context=context)
+    
+    def clean(self, playlist):
+        """Handle playlist title repetition (a no-op for playlists normalized at ingestion)"""
+        return normalize_titles(playlist) if playlist else playlist
+    
+    def score(self, playlist, query, debug, relevance_check, context):
+        """Apply the scoring criteria"""
+        return score_playlist(playlist, query, debug, relevance_check, context=context)
+    
+    def record(self, query, scored_playlists):
+        """Save the scoring inputs of the scored candidates so they can be re-ranked offline (rescore.py)"""
+        if not CANDIDATE_STORE_ENABLED or not scored_playlists:
+            return
+        try:
+            stats = playlist_stats(
+                [result["playlist"] for result in scored_playlists],
+                publish_years=[result["details"].get("publish_year") for result in scored_playlists]
+            )
+            candidates = [
+                {
+                    "id": result["playlist"].get("id"),
+                    "title": result["playlist"].get("title"),
+                    "stats": row,
+                    "score": result["score"]
+                }
+                for result, row in zip(scored_playlists, stats)
+            ]
+            get_candidate_store().record(query, candidates, SCORING_CONFIG["version"])
+        except Exception as e:
+            print(f"Error recording candidate stats: {e}")
+    
+    def log(self, message):
+        """Report pipeline progress"""
+        print(message)
+
+class CleaningPlaylistPipeline(PlaylistPipeline):
+    """Pipeline for API requests and pre-warming: cleans every title before scoring and logs through logging"""
+    
+    def clean(self, playlist):
+        # Records normalized at ingestion are skipped, this only touches anything left over
+        return clean_repeated_title(super().clean(playlist))
+    
+    def log(self, message):
+        logger.info(message)
+
+def find_best_playlist(query, debug=False, detailed_fetch=False, max_videos=0, context=None, pipeline=None):
     """
     Find the best educational playlist for a given query
     
@@ -1148,10 +1542,18 @@ def find_best_playlist(query, debug=False, detailed_fetch=False):
         query (str): The search query
         debug (bool, optional): Enable debug output. Defaults to False.
         detailed_fetch (bool, optional): Fetch detailed information for more videos. Defaults to False.
+        max_videos (int, optional): Maximum number of videos to load for the best playlist (0 for all). Defaults to 0.
+        context (RequestContext, optional): Memoizes upstream calls for this request. A new one is created if not given.
+        pipeline (PlaylistPipeline, optional): Stage hooks for fetching, cleaning, scoring and logging. Defaults to PlaylistPipeline().
         
     Returns:
         dict: Best playlist with score and details
     """
+    if context is None:
+        context = RequestContext()
+    if pipeline is None:
+        pipeline = PlaylistPipeline()
+    
     #print(f"Finding best playlist for: {query}")
     
     # Search for playlists
@@ -1211,6 +1613,8 @@ def find_best_playlist(query, debug=False, detailed_fetch=False):
             title_relevance_map = {}
             for result in batch_result['results']:
                 title_relevance_map[result['title']] = result
+                # Single-title checks later in the pipeline reuse this verdict
+                context.prime("title_relevance", (result['title'], query), {"results": [result]})
             
             # Add relevance information to each playlist summary
             for summary in playlist_summaries:
@@ -1250,20 +1654,19 @@ def find_best_playlist(query, debug=False, detailed_fetch=False):
             
             #print(f"Fetching playlist data for ID: {playlist_id}")
             
-            # Fetch playlist data
-            playlist = get_playlist_videos(playlist_id, limit=0, max_details=max_details_count)
+            # Fetch playlist data - header stats only in stats mode, the full list is loaded for the winner
+            playlist = pipeline.fetch(playlist_id, max_details_count, context)
             
             #print(f"Playlist data fetched. Has videos: {bool(playlist.get('videos'))}")
             
-            # Handle playlist title repetition
-            if "title" in playlist and '\n' in playlist["title"]:
-                playlist["title"] = playlist["title"].split('\n')[0].strip()
+            playlist = pipeline.clean(playlist)
                 
             videos = playlist.get("videos", [])
+            video_count = playlist.get("_video_count", len(videos))
             
             # Note about video count but don't skip
-            if len(videos) < 5:
-                print(f"⚠️ Note: This playlist has fewer videos than recommended ({len(videos)}/5 minimum)")
+            if video_count < 5:
+                pipeline.log(f"⚠️ Note: This playlist has fewer videos than recommended ({video_count}/5 minimum)")
                 
             # Check if we have relevance information from batch processing
             relevance_check = playlist_summary.get('relevance_check')
@@ -1279,7 +1682,7 @@ def find_best_playlist(query, debug=False, detailed_fetch=False):
 
                 if technologies:
                     #print(f"  Technologies detected: {', '.join(technologies)}")
-                    print(f"  IMPORTANT - Is this playlist relevant to '{query}'? {'YES' if is_relevant else 'NO'}")
+                    pipeline.log(f"  IMPORTANT - Is this playlist relevant to '{query}'? {'YES' if is_relevant else 'NO'}")
                 
                 # Skip non-relevant playlists entirely
                 if not is_relevant:
@@ -1288,12 +1691,13 @@ def find_best_playlist(query, debug=False, detailed_fetch=False):
                     #print(f"   Skipping this playlist")
                     return None
             else:
-                print("No relevance check information available")
+                pipeline.log("No relevance check information available")
             
             #print("Applying scoring criteria...")
             
             # Apply scoring criteria - pass the pre-computed relevance_check
-            score, details = score_playlist(playlist, query, debug, relevance_check)
+            pipeline.log(f"Scoring playlist: {playlist.get('title', '')}")
+            score, details = pipeline.score(playlist, query, debug, relevance_check, context)
             
             #print(f"Score result: {score}")
                 
@@ -1316,7 +1720,7 @@ def find_best_playlist(query, debug=False, detailed_fetch=False):
                 #print(f"✅ Final Score: {score:.1f}/10.0")
 
                 if technologies:
-                    print(f"✅ Technologies detected: {', '.join(technologies)}")   
+                    pipeline.log(f"✅ Technologies detected: {', '.join(technologies)}")   
                 return result
             
             else:
@@ -1332,7 +1736,8 @@ def find_best_playlist(query, debug=False, detailed_fetch=False):
     with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
         # Submit tasks for each playlist
         future_to_playlist = {
-            executor.submit(evaluate_playlist, summary, i): summary 
+            # Each task runs in a copy of the caller's context so its usage labels follow it
+            executor.submit(contextvars.copy_context().run, evaluate_playlist, summary, i): summary
             for i, summary in enumerate(playlist_summaries)
         }
         
@@ -1361,6 +1766,9 @@ def find_best_playlist(query, debug=False, detailed_fetch=False):
                 if debug:
                     print(f"Error processing result for playlist {summary['title']}: {e}")
     
+    # Keep the candidates' scoring inputs before the winner's full video list is loaded
+    pipeline.record(query, scored_playlists)
+    
     # Return the exceptional playlist if found, otherwise sort and return the best one
     if exceptional_playlist:
         if debug:
@@ -1368,6 +1776,8 @@ def find_best_playlist(query, debug=False, detailed_fetch=False):
             #print(f"Score: {exceptional_playlist['score']:.1f}/10.0")
             #print(f"Verdict: {exceptional_playlist['verdict']}")
             #print(f"URL: {exceptional_playlist['playlist']['url']}")
+        exceptional_playlist["playlist"] = pipeline.clean(pipeline.load(exceptional_playlist["playlist"], max_videos, context))
+        exceptional_playlist["upstream_calls"] = context.stats()
         return exceptional_playlist
     
     # Sort playlists by score and return the best one if no exceptional playlist was found
@@ -1388,6 +1798,13 @@ def find_best_playlist(query, debug=False, detailed_fetch=False):
                 for i, p in enumerate(scored_playlists[1:4]):
                     print(f"{i+2}. {p['playlist']['title']} - Score: {p['score']:.1f}/10.0 - {p['verdict']}")
         
+        # Only the winner needs its full video list
+        best["playlist"] = pipeline.clean(pipeline.load(best["playlist"], max_videos, context))
+        best["upstream_calls"] = context.stats()
+        
+        if debug:
+            print(f"Upstream calls: {best['upstream_calls']}")
+        
         # Return the best playlist regardless of score
         return best
     elif debug:
@@ -1395,7 +1812,7 @@ def find_best_playlist(query, debug=False, detailed_fetch=False):
     
     return None
 
-def score_playlist(playlist, query, debug=False, relevance_check=None):
+def score_playlist(playlist, query, debug=False, relevance_check=None, context=None):
     """
     Score a playlist based on defined criteria
     
@@ -1404,6 +1821,7 @@ def score_playlist(playlist, query, debug=False, relevance_check=None):
         query: The search query
         debug: Whether to print debug information
         relevance_check: Pre-computed relevance check result (to avoid redundant API calls)
+        context: Optional RequestContext used to reuse upstream results within one request
     
     Returns:
         tuple: (score, details) or (None, None) if fails critical criteria
@@ -1411,7 +1829,10 @@ def score_playlist(playlist, query, debug=False, relevance_check=None):
     title = playlist.get("title", "")
     videos = playlist.get("videos", [])
     
-    #print(f"Scoring playlist: '{title}' ({len(videos)} videos)")
+    # Playlists fetched in stats mode only carry the first video, the header count is authoritative
+    video_count = playlist.get("_video_count") or len(videos)
+    
+    #print(f"Scoring playlist: '{title}' ({video_count} videos)")
     
     # Initialize main_tech_term at the beginning
     main_tech_term = None
@@ -1470,7 +1891,7 @@ def score_playlist(playlist, query, debug=False, relevance_check=None):
         #print(f"Checking title relevance: '{title}'")
         
         # Use batch relevance checker (this is the redundant call we want to avoid)
-        batch_result = check_batch_title_relevance([title], query)
+        batch_result = memoized(context, "title_relevance", (title, query), check_batch_title_relevance, [title], query)
         
         if batch_result and 'results' in batch_result and batch_result['results']:
             first_result = batch_result['results'][0]
@@ -1534,14 +1955,11 @@ def score_playlist(playlist, query, debug=False, relevance_check=None):
     
     # 🧮 Start scoring the playlist - NEW SCORING SYSTEM (Total: 10 points)
 
+    # Thresholds and points come from the versioned scoring config (scoring_config.json)
+    tables = SCORING_CONFIG["components"]
+
     # 3. Video Count (1.5 pts)
-    video_count = len(videos)
-    if video_count >= 10:
-        video_count_score = 1.5  # Ideal range (above 10 videos)
-    elif video_count >= 5:
-        video_count_score = 1.0  # 5-9 videos
-    else:
-        video_count_score = 0.5  # <5 videos
+    video_count_score = table_points(tables["video_count"], video_count)
     
     details["video_count_score"] = video_count_score
     total_score += video_count_score
@@ -1563,14 +1981,7 @@ def score_playlist(playlist, query, debug=False, relevance_check=None):
     
     details["total_views"] = direct_view_count
     
-    if direct_view_count >= 1000000:
-        total_views_score = 1.8  # 1M views → 1.8
-    elif direct_view_count >= 500000:
-        total_views_score = 1.5  # 500k-999k → 1.5
-    elif direct_view_count >= 100000:
-        total_views_score = 1.0  # 100k-499k → 1.0
-    else:
-        total_views_score = 0.5  # <100k → 0.5
+    total_views_score = table_points(tables["total_views"], direct_view_count)
     
     details["total_views_score"] = total_views_score
     total_score += total_views_score
@@ -1584,15 +1995,7 @@ def score_playlist(playlist, query, debug=False, relevance_check=None):
     
     if video_count > 0 and direct_view_count > 0:
         avg_views_per_video = direct_view_count / video_count
-        
-        if avg_views_per_video >= 100000:
-            avg_views_score = 1.4  # 100k → 1.4
-        elif avg_views_per_video >= 50000:
-            avg_views_score = 1.0  # 50k-100k → 1.0
-        elif avg_views_per_video >= 10000:
-            avg_views_score = 0.7  # 10k-50k → 0.7
-        else:
-            avg_views_score = 0.3  # <10k → 0.3
+        avg_views_score = table_points(tables["avg_views"], avg_views_per_video)
     
     details["avg_views_score"] = avg_views_score
     details["avg_views_per_video"] = avg_views_per_video
@@ -1602,67 +2005,34 @@ def score_playlist(playlist, query, debug=False, relevance_check=None):
         print(f"+ Average views per video ({format_number(avg_views_per_video)}): +{avg_views_score:.1f} points")
     
     # 1. Duration Ratio (0 to 2.0 points) - Same as before
-    videos_with_duration = [v for v in videos if "duration_seconds" in v and v["duration_seconds"]]
+    # Parse every video's duration in one pass: duration_seconds when fetched, otherwise the
+    # lengthText ("12:34") or accessibility label ("12 minutes, 3 seconds") from the playlist page
+    duration_summary = summarize_durations(video_durations(videos), video_count)
     
-    if enhanced_duration is not None:
-        # Use our enhanced duration calculation
-        duration_per_video = enhanced_duration
-        
-        if '_total_duration_minutes' in playlist:
-            details["total_duration_minutes"] = playlist.get('_total_duration_minutes')
-        elif videos_with_duration:
-            # Still calculate total if not provided
-            total_duration_minutes = sum(v["duration_seconds"] for v in videos_with_duration) / 60
-            details["total_duration_minutes"] = total_duration_minutes
-        
-        # Calculate thresholds for scoring
-        threshold_high = len(videos) * 45    # 45 min per video threshold for highest score
-        threshold_medium = len(videos) * 30  # 30 min per video threshold for medium score
-        threshold_low = len(videos) * 15     # 15 min per video threshold for minimum score
-        
+    if enhanced_duration is None or '_total_duration_minutes' not in playlist:
+        # Calculate the total from the videos unless the enhanced total was provided
+        if duration_summary["total_duration_minutes"] is not None:
+            details["total_duration_minutes"] = duration_summary["total_duration_minutes"]
+    
+    if enhanced_duration is not None or duration_summary["total_duration_minutes"] is not None:
         total_duration_minutes = details["total_duration_minutes"]
         
-        # Determine which threshold the total duration meets
-        if total_duration_minutes >= threshold_high:
-            duration_ratio_score = 2.0
-            threshold_desc = f"{total_duration_minutes:.1f} minutes ≥ {len(videos)} videos × 45 min ({threshold_high} min)"
-        elif total_duration_minutes >= threshold_medium:
-            duration_ratio_score = 1.5
-            threshold_desc = f"{total_duration_minutes:.1f} minutes ≥ {len(videos)} videos × 30 min ({threshold_medium} min)"
-        elif total_duration_minutes >= threshold_low:
-            duration_ratio_score = 1.0
-            threshold_desc = f"{total_duration_minutes:.1f} minutes ≥ {len(videos)} videos × 15 min ({threshold_low} min)"
-        else:
-            duration_ratio_score = 0.0
-            threshold_desc = f"{total_duration_minutes:.1f} minutes < {len(videos)} videos × 15 min ({threshold_low} min)"
-            
-        details["duration_ratio_score"] = duration_ratio_score
-        total_score += duration_ratio_score
+        # Thresholds are minutes per video, so the total is compared against video count × threshold
+        duration_table = tables["duration_ratio"]
+        total_thresholds = [video_count * minutes for minutes in duration_table["thresholds"]]
+        duration_ratio_score = table_points(dict(duration_table, thresholds=total_thresholds), total_duration_minutes)
         
-        if debug:
-            print(f"+ Duration/video ratio: +{duration_ratio_score:.1f} points ({threshold_desc})")
-    elif videos_with_duration:
-        total_duration_minutes = sum(v["duration_seconds"] for v in videos_with_duration) / 60
-        details["total_duration_minutes"] = total_duration_minutes
-        
-        # Calculate thresholds for scoring
-        threshold_high = len(videos) * 45    # 45 min per video threshold for highest score
-        threshold_medium = len(videos) * 30  # 30 min per video threshold for medium score
-        threshold_low = len(videos) * 15     # 15 min per video threshold for minimum score
-        
-        # Determine which threshold the total duration meets
-        if total_duration_minutes >= threshold_high:
-            duration_ratio_score = 2.0
-            threshold_desc = f"{total_duration_minutes:.1f} minutes ≥ {len(videos)} videos × 45 min ({threshold_high} min)"
-        elif total_duration_minutes >= threshold_medium:
-            duration_ratio_score = 1.5
-            threshold_desc = f"{total_duration_minutes:.1f} minutes ≥ {len(videos)} videos × 30 min ({threshold_medium} min)"
-        elif total_duration_minutes >= threshold_low:
-            duration_ratio_score = 1.0
-            threshold_desc = f"{total_duration_minutes:.1f} minutes ≥ {len(videos)} videos × 15 min ({threshold_low} min)"
+        if duration_table.get("reached_when", ">=") == ">":
+            reached_sign, missed_sign = ">", "≤"
+            reached = [minutes for minutes in duration_table["thresholds"] if total_duration_minutes > video_count * minutes]
         else:
-            duration_ratio_score = 0.0
-            threshold_desc = f"{total_duration_minutes:.1f} minutes < {len(videos)} videos × 15 min ({threshold_low} min)"
+            reached_sign, missed_sign = "≥", "<"
+            reached = [minutes for minutes in duration_table["thresholds"] if total_duration_minutes >= video_count * minutes]
+        if reached:
+            threshold_desc = f"{total_duration_minutes:.1f} minutes {reached_sign} {video_count} videos × {reached[-1]} min ({video_count * reached[-1]} min)"
+        else:
+            lowest = duration_table["thresholds"][0]
+            threshold_desc = f"{total_duration_minutes:.1f} minutes {missed_sign} {video_count} videos × {lowest} min ({video_count * lowest} min)"
         
         details["duration_ratio_score"] = duration_ratio_score
         total_score += duration_ratio_score
@@ -1736,7 +2106,7 @@ def score_playlist(playlist, query, debug=False, relevance_check=None):
                 if debug:
                     print(f"Fetching detailed info for first video to get publish date...")
                 video_id = first_video.get("id")
-                detailed_video = get_video_details(video_id)
+                detailed_video = memoized(context, "video_details", video_id, get_video_details, video_id)
                 
                 if "publish_date_formatted" in detailed_video:
                     formatted_date = detailed_video.get("publish_date_formatted")
@@ -1760,22 +2130,13 @@ def score_playlist(playlist, query, debug=False, relevance_check=None):
     # Calculate recency score based on the year - NEW SCALE
     if publish_year:
         years_diff = current_year - publish_year
-        if years_diff <= 1:  # 0-1 year old
-            recency_score = 0.5
-            if debug:
-                print(f"+ First video publish year ({publish_year} - within 1 year): +{recency_score:.1f} points")
-        elif years_diff <= 2:  # 1-2 years old
-            recency_score = 0.3
-            if debug:
-                print(f"+ First video publish year ({publish_year} - 1-2 years old): +{recency_score:.1f} points")
-        else:  # 2+ years old
-            recency_score = 0.1
-            if debug:
-                print(f"+ First video publish year ({publish_year} - older than 2 years): +{recency_score:.1f} points")
+        recency_score = table_points(tables["recency"], years_diff)
+        if debug:
+            print(f"+ First video publish year ({publish_year} - {years_diff} years old): +{recency_score:.1f} points")
     else:  # No year detected
-        recency_score = 0.1  # Default to oldest category
+        recency_score = SCORING_CONFIG.get("recency_default", 0.1)  # Default to oldest category
         if debug:
-            print(f"+ First video recency (no year detected): +0.1 points (default)")
+            print(f"+ First video recency (no year detected): +{recency_score:.1f} points (default)")
     
     details["recency_score"] = recency_score
     details["publish_year"] = publish_year  # Store the year for reference
@@ -1787,13 +2148,7 @@ def score_playlist(playlist, query, debug=False, relevance_check=None):
     if videos and "likes" in videos[0] and "views" in videos[0] and videos[0]["views"]:
         first_video = videos[0]
         like_ratio = (first_video["likes"] / first_video["views"]) * 100
-        
-        if like_ratio >= 2:
-            like_ratio_score = 0.8  # 2% → 0.8
-        elif like_ratio >= 1:
-            like_ratio_score = 0.5  # 1-2% → 0.5
-        else:
-            like_ratio_score = 0.2  # <1% → 0.2
+        like_ratio_score = table_points(tables["like_ratio"], like_ratio)
         
         details["like_ratio_score"] = like_ratio_score
         total_score += like_ratio_score
@@ -1810,13 +2165,7 @@ def score_playlist(playlist, query, debug=False, relevance_check=None):
     
     if videos and "views" in videos[0]:
         first_video_views = videos[0]["views"]
-        
-        if first_video_views >= 500000:
-            first_video_views_score = 1.0  # 500k → 1.0
-        elif first_video_views >= 100000:
-            first_video_views_score = 0.7  # 100k-500k → 0.7
-        else:
-            first_video_views_score = 0.3  # <100k → 0.3
+        first_video_views_score = table_points(tables["first_video_views"], first_video_views)
         
         details["first_video_views_score"] = first_video_views_score
         total_score += first_video_views_score
@@ -0,0 +1,125 @@
+"""
+Persistent store of scored best-playlist candidates.
+
+Every /find/best-playlist request scores a handful of candidate playlists. The inputs
+of their point components (see playlist_scorer.playlist_stats) are saved here per
+query, so the candidates can later be re-ranked under a different scoring config
+without fetching anything from YouTube again.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CANDIDATE_STORE_PATH = os.environ.get(
+    "CANDIDATE_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "candidate_stats.db")
+)
+
+
+class CandidateStore:
+    """
+    SQLite-backed store of candidate statistics, one row per (query, playlist)
+
+    Thread-safe: the evaluation threads of find_best_playlist may write concurrently.
+    """
+
+    def __init__(self, path=CANDIDATE_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS candidates (
+                    query TEXT NOT NULL,
+                    playlist_id TEXT NOT NULL,
+                    title TEXT,
+                    stats TEXT NOT NULL,
+                    score REAL,
+                    config_version TEXT,
+                    recorded_at REAL NOT NULL,
+                    PRIMARY KEY (query, playlist_id)
+                )
+                """
+            )
+
+    def record(self, query, candidates, config_version):
+        """
+        Save the scored candidates of a query, replacing the ones recorded for it earlier
+
+        Playlists that are no longer candidates for the query are dropped, so re-ranking
+        only sees the latest set.
+
+        Args:
+            query: The search query (stored lowercased and stripped)
+            candidates: Dicts with "id", "title", "stats" (a playlist_stats row) and "score"
+            config_version: Version of the scoring config the scores were computed with
+        """
+        now = time.time()
+        query = query.strip().lower()
+        rows = [
+            (query, candidate["id"], candidate.get("title"),
+             json.dumps(candidate["stats"]), candidate.get("score"), config_version, now)
+            for candidate in candidates
+        ]
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM candidates WHERE query = ?", (query,))
+            self._connection.executemany(
+                "INSERT INTO candidates VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def load(self, query=None, limit=None):
+        """
+        Return stored candidates grouped by query
+
+        Args:
+            query: Only return candidates for this query
+            limit: Only return the most recently recorded queries
+
+        Returns:
+            dict: {query: [{"id", "title", "stats", "score", "config_version", "recorded_at"}, ...]}
+        """
+        with self._lock:
+            if query is not None:
+                cursor = self._connection.execute(
+                    "SELECT * FROM candidates WHERE query = ? ORDER BY score DESC", (query.strip().lower(),)
+                )
+            else:
+                cursor = self._connection.execute(
+                    "SELECT * FROM candidates ORDER BY recorded_at DESC, score DESC"
+                )
+            rows = cursor.fetchall()
+
+        grouped = {}
+        for query_text, playlist_id, title, stats, score, config_version, recorded_at in rows:
+            if query_text not in grouped and limit is not None and len(grouped) >= limit:
+                continue
+            grouped.setdefault(query_text, []).append({
+                "id": playlist_id,
+                "title": title,
+                "stats": json.loads(stats),
+                "score": score,
+                "config_version": config_version,
+                "recorded_at": recorded_at
+            })
+        return grouped
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_candidate_store():
+    """Return the shared store, opening it on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CandidateStore()
+        return _store
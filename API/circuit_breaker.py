@@ -0,0 +1,199 @@
+"""
+Circuit breaker for calls to a flaky upstream service.
+
+When Groq is degraded every relevance check still waits for its attempts and backoff to
+run out before falling back to the rule-based check, adding seconds to each request. The
+breaker watches a sliding window of recent calls and opens when too many of them fail or
+are slow. While open, callers skip the upstream entirely and use their fallback at once;
+a background probe checks the service periodically and closes the circuit when it
+answers again. Without a probe, a single trial call is let through after the open period
+instead (half-open).
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Defaults, overridable per breaker
+CIRCUIT_WINDOW_SIZE = int(os.environ.get("CIRCUIT_WINDOW_SIZE", 20))
+CIRCUIT_MIN_CALLS = int(os.environ.get("CIRCUIT_MIN_CALLS", 5))
+CIRCUIT_FAILURE_RATE = float(os.environ.get("CIRCUIT_FAILURE_RATE", 0.5))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.environ.get("CIRCUIT_SLOW_CALL_SECONDS", 8))
+CIRCUIT_SLOW_CALL_RATE = float(os.environ.get("CIRCUIT_SLOW_CALL_RATE", 0.5))
+CIRCUIT_OPEN_SECONDS = float(os.environ.get("CIRCUIT_OPEN_SECONDS", 30))
+
+
+class CircuitBreaker:
+    """
+    Error-rate and latency circuit breaker over the last window_size calls
+
+    Call allow() before using the service and record() with the outcome afterwards.
+    Thread-safe.
+    """
+
+    def __init__(self, name, window_size=CIRCUIT_WINDOW_SIZE, min_calls=CIRCUIT_MIN_CALLS,
+                 failure_rate=CIRCUIT_FAILURE_RATE, slow_call_seconds=CIRCUIT_SLOW_CALL_SECONDS,
+                 slow_call_rate=CIRCUIT_SLOW_CALL_RATE, open_seconds=CIRCUIT_OPEN_SECONDS, probe=None):
+        """
+        Args:
+            name: Name used in log messages and stats
+            window_size: Number of recent calls the rates are computed over
+            min_calls: Calls needed in the window before the circuit may open
+            failure_rate: Fraction of failed calls that opens the circuit
+            slow_call_seconds: Calls taking longer than this count as slow
+            slow_call_rate: Fraction of slow calls that opens the circuit
+            open_seconds: How long the circuit stays open before it is probed
+            probe: Optional callable returning True when the service is healthy, run in
+                   a background thread while the circuit is open
+        """
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.probe = probe
+
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = None
+        self._open_until = 0.0
+        self._trial_in_flight = False
+        self._probe_timer = None
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def allow(self):
+        """
+        Whether a call to the service should be attempted now
+
+        Returns:
+            bool: False while the circuit is open, callers should use their fallback
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+
+            if self._state == OPEN and self.probe is None and time.time() >= self._open_until:
+                self._state = HALF_OPEN
+
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                # Let exactly one trial call through
+                self._trial_in_flight = True
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record(self, success, duration=0.0):
+        """
+        Record the outcome of a call that allow() let through
+
+        Args:
+            success: Whether the service answered properly
+            duration: How long the call took, in seconds
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trial_in_flight = False
+                if success and duration <= self.slow_call_seconds:
+                    self._close()
+                else:
+                    self._open(self.open_seconds)
+                return
+
+            if self._state == OPEN:
+                # A call that started before the circuit opened
+                return
+
+            self._window.append((success, duration > self.slow_call_seconds))
+            if len(self._window) < self.min_calls:
+                return
+
+            failures = sum(1 for ok, _ in self._window if not ok)
+            slow = sum(1 for _, is_slow in self._window if is_slow)
+            if (failures / len(self._window) >= self.failure_rate
+                    or slow / len(self._window) >= self.slow_call_rate):
+                self._open(self.open_seconds)
+
+    def trip(self, seconds=None):
+        """Open the circuit right away, e.g. when the service asks us to back off for a while"""
+        with self._lock:
+            self._open(max(seconds or 0, self.open_seconds))
+
+    def reset(self):
+        """Close the circuit and forget the window"""
+        with self._lock:
+            self._close()
+
+    def stats(self):
+        """Return the state and the rates over the current window"""
+        with self._lock:
+            calls = len(self._window)
+            return {
+                "name": self.name,
+                "state": self._state,
+                "calls": calls,
+                "failure_rate": round(sum(1 for ok, _ in self._window if not ok) / calls, 3) if calls else 0.0,
+                "slow_call_rate": round(sum(1 for _, is_slow in self._window if is_slow) / calls, 3) if calls else 0.0,
+                "opened_at": self._opened_at,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected
+            }
+
+    def _open(self, seconds):
+        """Switch to OPEN (lock held) and schedule the background probe"""
+        if self._state != OPEN:
+            self.times_opened += 1
+            self._opened_at = time.time()
+            print(f"⚡ Circuit '{self.name}' opened for {seconds:.0f}s")
+        self._state = OPEN
+        self._open_until = max(self._open_until, time.time() + seconds)
+        self._trial_in_flight = False
+
+        if self.probe is not None:
+            if self._probe_timer is not None:
+                self._probe_timer.cancel()
+            self._probe_timer = threading.Timer(self._open_until - time.time(), self._run_probe)
+            self._probe_timer.daemon = True
+            self._probe_timer.start()
+
+    def _close(self):
+        """Switch to CLOSED (lock held)"""
+        if self._state != CLOSED:
+            print(f"✅ Circuit '{self.name}' closed")
+        self._state = CLOSED
+        self._window.clear()
+        self._trial_in_flight = False
+        self._open_until = 0.0
+        if self._probe_timer is not None:
+            self._probe_timer.cancel()
+            self._probe_timer = None
+
+    def _run_probe(self):
+        started = time.time()
+        try:
+            healthy = bool(self.probe())
+        except Exception as e:
+            print(f"Circuit '{self.name}' probe failed: {e}")
+            healthy = False
+        duration = time.time() - started
+
+        with self._lock:
+            if self._state != OPEN:
+                return
+            if healthy and duration <= self.slow_call_seconds:
+                self._close()
+            else:
+                self._open(self.open_seconds)
@@ -0,0 +1,142 @@
+"""
+Bulk video duration parsing and aggregation.
+
+Playlist pages give durations as lengthText strings ("12:34", "1:02:03") or as
+accessibility labels ("12 minutes, 3 seconds"), while yt-dlp gives seconds. A whole
+playlist's durations are parsed together: the strings are joined and scanned once per
+format, and the totals, averages and sampling confidence are computed with NumPy.
+"""
+
+import re
+
+import numpy as np
+
+# "12:34" or "1:02:03" on its own line
+_CLOCK_PATTERN = re.compile(r'^[ \t]*(?:(\d+):)?(\d+):(\d{1,2})[ \t]*$', re.MULTILINE)
+
+# "1 hour, 2 minutes, 3 seconds" - any subset, any order
+_UNIT_PATTERN = re.compile(r'(\d+)\s*(hours?|hrs?|h|minutes?|mins?|m|seconds?|secs?|s)\b', re.IGNORECASE)
+
+_UNIT_SECONDS = {'h': 3600, 'm': 60, 's': 1}
+
+
+def parse_durations(values):
+    """
+    Convert a sequence of durations to seconds
+
+    Args:
+        values: Durations as numbers of seconds, clock strings ("12:34", "1:02:03")
+                or labels ("12 minutes, 3 seconds"). Anything else is unknown.
+
+    Returns:
+        numpy.ndarray: float seconds per value, NaN where the duration is unknown
+    """
+    count = len(values)
+    seconds = np.full(count, np.nan)
+    if count == 0:
+        return seconds
+
+    text_indices = []
+    texts = []
+    for index, value in enumerate(values):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if value > 0:
+                seconds[index] = value
+        elif isinstance(value, str) and value:
+            text_indices.append(index)
+            # One line per value so the patterns cannot match across values
+            texts.append(value.replace('\n', ' '))
+
+    if not texts:
+        return seconds
+
+    joined = "\n".join(texts)
+    line_starts = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]])
+    text_indices = np.asarray(text_indices)
+
+    parsed = np.zeros(len(texts))
+    found = np.zeros(len(texts), dtype=bool)
+
+    clock = [(match.start(), match.group(1) or 0, match.group(2), match.group(3))
+             for match in _CLOCK_PATTERN.finditer(joined)]
+    if clock:
+        positions, hours, minutes, secs = zip(*clock)
+        lines = np.searchsorted(line_starts, positions, side='right') - 1
+        values_seconds = (np.asarray(hours, dtype=float) * 3600 +
+                          np.asarray(minutes, dtype=float) * 60 +
+                          np.asarray(secs, dtype=float))
+        parsed[lines] = values_seconds
+        found[lines] = True
+
+    units = [(match.start(), match.group(1), match.group(2)[0].lower())
+             for match in _UNIT_PATTERN.finditer(joined)]
+    if units:
+        positions, amounts, unit_letters = zip(*units)
+        lines = np.searchsorted(line_starts, positions, side='right') - 1
+        # Lines already read as clock values are not labels
+        keep = ~found[lines]
+        multipliers = np.array([_UNIT_SECONDS[letter] for letter in unit_letters], dtype=float)
+        np.add.at(parsed, lines[keep], np.asarray(amounts, dtype=float)[keep] * multipliers[keep])
+        found[lines[keep]] = True
+
+    found &= parsed > 0
+    seconds[text_indices[found]] = parsed[found]
+    return seconds
+
+
+def video_durations(videos):
+    """Seconds for each video dict, preferring "duration_seconds" over the "duration" text"""
+    return parse_durations([
+        video.get("duration_seconds") or video.get("duration") for video in videos
+    ])
+
+
+def summarize_durations(seconds, video_count=None):
+    """
+    Aggregate parsed durations for a playlist
+
+    When fewer durations are known than the playlist has videos, the total is
+    extrapolated from the mean and the confidence is 1 minus the 95% relative margin
+    of the sample mean (with finite population correction).
+
+    Args:
+        seconds: Array from parse_durations (NaN entries are ignored)
+        video_count: Number of videos in the playlist (defaults to the number of known durations)
+
+    Returns:
+        dict: sample_size, avg_duration_minutes, total_duration_minutes and confidence.
+              The minutes are None when no duration is known.
+    """
+    known = np.asarray(seconds, dtype=float)
+    known = known[~np.isnan(known)]
+    sample_size = int(known.size)
+
+    summary = {
+        "sample_size": sample_size,
+        "avg_duration_minutes": None,
+        "total_duration_minutes": None,
+        "confidence": 0.0
+    }
+    if sample_size == 0:
+        return summary
+
+    if not video_count:
+        video_count = sample_size
+
+    mean_seconds = float(known.mean())
+    summary["avg_duration_minutes"] = mean_seconds / 60
+
+    if sample_size >= video_count:
+        # Every video is known, so the total is exact
+        summary["total_duration_minutes"] = float(known.sum()) / 60
+        summary["confidence"] = 1.0
+    else:
+        summary["total_duration_minutes"] = mean_seconds / 60 * video_count
+
+        if sample_size > 1 and mean_seconds > 0:
+            variance = float(known.var(ddof=1))
+            fpc = (video_count - sample_size) / (video_count - 1)
+            relative_margin = 1.96 * (variance / sample_size * fpc) ** 0.5 / mean_seconds
+            summary["confidence"] = max(0.0, min(1.0, 1.0 - relative_margin))
+
+    return summary
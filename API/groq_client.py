@@ -0,0 +1,354 @@
+"""
+Pooled, non-blocking client for the Groq chat completions API.
+
+Relevance checks used to call requests.post without a session or timeout and retry with
+time.sleep, which held a worker thread (or the event loop, from the async endpoints) for
+seconds at a time while Groq was rate limiting us. Calls now go through one
+httpx.AsyncClient with a keep-alive connection pool, running on a background event loop
+owned by this module. Backoff between attempts is an asyncio.sleep on that loop, honours
+Retry-After, and every attempt has its own timeout. Async callers await the result and
+threaded callers block only on their own call, never on someone else's retry.
+
+Each attempt also feeds a circuit breaker. When Groq is failing or slow the circuit
+opens and calls fail immediately with GroqCircuitOpenError, so callers go straight to
+their rule-based fallback while a background probe waits for Groq to recover.
+
+Every call is recorded in the usage meter with the token counts Groq reports, its
+latency and retries, under the usage_labels() of the caller.
+
+Calls in flight are capped at GROQ_MAX_CONCURRENCY, so callers can fan a large batch
+out into concurrent chunks. Attempts can also be spaced to stay under
+GROQ_REQUESTS_PER_MINUTE, but that is off unless it is set: spacing serializes the
+chunks (at 30 per minute a 10-chunk batch takes at least 18 s however high the
+concurrency is), while without it a burst over the account's limit gets 429s that are
+retried after Retry-After. Set it to the account's real limit when bursts are common.
+
+Point GROQ_API_URL at mock_llm_server.py to run without a Groq account.
+"""
+
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+
+import httpx
+
+from circuit_breaker import CircuitBreaker
+from usage_meter import current_labels, get_usage_meter
+
+GROQ_API_URL = os.environ.get("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+
+# Seconds to wait for a response to a single attempt, and for the connection itself
+GROQ_TIMEOUT = float(os.environ.get("GROQ_TIMEOUT", 20))
+GROQ_CONNECT_TIMEOUT = float(os.environ.get("GROQ_CONNECT_TIMEOUT", 5))
+
+# Attempts per call, and the backoff between them
+GROQ_MAX_RETRIES = int(os.environ.get("GROQ_MAX_RETRIES", 3))
+GROQ_RETRY_BASE_DELAY = float(os.environ.get("GROQ_RETRY_BASE_DELAY", 1.0))
+# A Retry-After longer than this is not waited for, the call fails straight away
+GROQ_MAX_RETRY_DELAY = float(os.environ.get("GROQ_MAX_RETRY_DELAY", 30))
+
+# Connection pool shared by every call
+GROQ_MAX_CONNECTIONS = int(os.environ.get("GROQ_MAX_CONNECTIONS", 10))
+GROQ_KEEPALIVE_EXPIRY = float(os.environ.get("GROQ_KEEPALIVE_EXPIRY", 60))
+
+# Provider rate limit: concurrent calls, and attempts per minute (0, the default, for no spacing)
+GROQ_MAX_CONCURRENCY = int(os.environ.get("GROQ_MAX_CONCURRENCY", 4))
+GROQ_REQUESTS_PER_MINUTE = float(os.environ.get("GROQ_REQUESTS_PER_MINUTE", 0))
+
+# Circuit breaker around the API (thresholds are the circuit_breaker defaults)
+GROQ_CIRCUIT_ENABLED = os.environ.get("GROQ_CIRCUIT_ENABLED", "true").lower() == "true"
+GROQ_PROBE_TIMEOUT = float(os.environ.get("GROQ_PROBE_TIMEOUT", 5))
+GROQ_PROBE_MODEL = os.environ.get("GROQ_MODEL", "llama-3.3-70b-versatile")
+
+# Statuses worth another attempt; anything else is returned to the caller as an error
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+
+
+class GroqAPIError(Exception):
+    """A call that failed after every attempt, with the last HTTP status if there was one"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class GroqCircuitOpenError(GroqAPIError):
+    """The circuit breaker is open, the API was not called"""
+
+
+def retry_after_seconds(headers, default):
+    """
+    Read the Retry-After header of a response
+
+    Args:
+        headers: Response headers
+        default: Delay returned when the header is missing or unreadable
+
+    Returns:
+        float: Seconds to wait before the next attempt
+    """
+    value = headers.get("retry-after")
+    if not value:
+        return default
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    # Retry-After may also be an HTTP date
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class GroqClient:
+    """
+    Chat completions client with a pooled keep-alive connection and async retries
+
+    The httpx.AsyncClient lives on a private event loop in a daemon thread, so a single
+    pool serves the FastAPI event loop and the evaluation threads of find_best_playlist
+    alike. Use chat() from async code and chat_sync() from threads. Any OpenAI-compatible
+    chat completions endpoint works; name labels it in the breaker and usage meter.
+    """
+
+    def __init__(self, api_key, api_url=GROQ_API_URL, timeout=GROQ_TIMEOUT,
+                 max_retries=GROQ_MAX_RETRIES, max_connections=GROQ_MAX_CONNECTIONS,
+                 max_concurrency=GROQ_MAX_CONCURRENCY, requests_per_minute=GROQ_REQUESTS_PER_MINUTE,
+                 circuit_enabled=GROQ_CIRCUIT_ENABLED, name="groq"):
+        self.name = name
+        self.api_key = api_key
+        self.api_url = api_url
+        self.timeout = timeout
+        self.max_retries = max(1, max_retries)
+        self.max_connections = max_connections
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self.breaker = CircuitBreaker(name, probe=self._probe) if circuit_enabled else None
+        self._lock = threading.Lock()
+        self._loop = None
+        self._client = None
+        # Created on the background loop, only touched from it
+        self._semaphore = None
+        self._next_slot = 0.0
+
+    def _ensure_loop(self):
+        """Start the background loop and the pooled client on first use"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="groq-client", daemon=True).start()
+                self._client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(self.timeout, connect=GROQ_CONNECT_TIMEOUT),
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                        keepalive_expiry=GROQ_KEEPALIVE_EXPIRY
+                    )
+                )
+                self._loop = loop
+            return self._loop
+
+    def _submit(self, payload, timeout, use_breaker=True):
+        # Labels are read here, in the caller's context, not on the background loop
+        labels = current_labels() if use_breaker else None
+        return asyncio.run_coroutine_threadsafe(
+            self._post(payload, timeout, use_breaker, labels), self._ensure_loop()
+        )
+
+    def submit(self, payload, timeout=None):
+        """
+        Start a call without waiting for it, e.g. to run several chunks concurrently
+
+        Returns:
+            concurrent.futures.Future: Resolves to the chat() result or raises its errors
+        """
+        return self._submit(payload, timeout)
+
+    async def chat(self, payload, timeout=None):
+        """
+        Send a chat completions request from async code
+
+        Args:
+            payload: Request body ({"model", "messages", ...})
+            timeout: Per-attempt timeout in seconds (defaults to the client's)
+
+        Returns:
+            dict: The decoded response body
+
+        Raises:
+            GroqAPIError: The call failed after every attempt
+            GroqCircuitOpenError: The circuit is open and the API was not called
+        """
+        return await asyncio.wrap_future(self._submit(payload, timeout))
+
+    def chat_sync(self, payload, timeout=None):
+        """Blocking variant of chat() for worker threads, same arguments and result"""
+        return self._submit(payload, timeout).result()
+
+    def circuit_stats(self):
+        """Return the circuit breaker state, or None when it is disabled"""
+        return self.breaker.stats() if self.breaker else None
+
+    def _probe(self):
+        """Background health check while the circuit is open: one tiny completion, no retries"""
+        payload = {
+            "model": GROQ_PROBE_MODEL,
+            "messages": [{"role": "user", "content": "Reply with OK"}],
+            "max_tokens": 1
+        }
+        try:
+            self._submit(payload, GROQ_PROBE_TIMEOUT, use_breaker=False).result()
+            return True
+        except GroqAPIError:
+            return False
+
+    async def _rate_slot(self):
+        """Wait for the next free slot under the requests-per-minute limit"""
+        if not self.min_interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _post(self, payload, timeout, use_breaker=True, labels=None):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            attempts = [0]
+            if labels is None:
+                # Probes are not metered
+                return await self._post_attempts(payload, timeout, use_breaker, attempts)
+
+            meter = get_usage_meter()
+            model = payload.get("model")
+            started = time.time()
+            try:
+                result = await self._post_attempts(payload, timeout, use_breaker, attempts)
+            except GroqAPIError as e:
+                # Only an open circuit counts as rejected; a missing API key is an error
+                meter.record_call(self.name, model, latency=time.time() - started,
+                                  retries=max(0, attempts[0] - 1), error=True,
+                                  rejected=isinstance(e, GroqCircuitOpenError) and attempts[0] == 0,
+                                  labels=labels)
+                raise
+
+            usage = result.get("usage") or {}
+            meter.record_call(self.name, model,
+                              prompt_tokens=usage.get("prompt_tokens", 0),
+                              completion_tokens=usage.get("completion_tokens", 0),
+                              latency=time.time() - started, retries=attempts[0] - 1, labels=labels)
+            return result
+
+    async def _post_attempts(self, payload, timeout, use_breaker, attempts):
+        """Send the request with retries, counting the attempts made in attempts[0]"""
+        if not self.api_key:
+            raise GroqAPIError("GROQ_API_KEY is not set")
+
+        breaker = self.breaker if use_breaker else None
+        if breaker is not None and not breaker.allow():
+            raise GroqCircuitOpenError("Groq circuit is open, skipping the API call")
+
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        request_timeout = httpx.Timeout(timeout or self.timeout, connect=GROQ_CONNECT_TIMEOUT)
+
+        # Probes bypass the breaker and get a single attempt
+        max_attempts = self.max_retries if use_breaker else 1
+
+        last_error = None
+        for attempt in range(max_attempts):
+            if attempt > 0 and breaker is not None and not breaker.allow():
+                # The circuit opened while we were backing off
+                raise GroqCircuitOpenError(f"{last_error} (circuit opened)", last_error.status_code)
+
+            delay = GROQ_RETRY_BASE_DELAY * (2 ** attempt) * random.uniform(0.8, 1.2)
+            await self._rate_slot()
+            attempts[0] += 1
+            started = time.time()
+            try:
+                response = await self._client.post(
+                    self.api_url, headers=headers, json=payload, timeout=request_timeout
+                )
+            except httpx.HTTPError as e:
+                last_error = GroqAPIError(f"Error calling Groq API: {e!r}")
+            else:
+                if response.status_code == 200:
+                    if breaker is not None:
+                        breaker.record(True, time.time() - started)
+                    try:
+                        return response.json()
+                    except ValueError as e:
+                        raise GroqAPIError(f"Invalid JSON body from Groq API: {e}", 200)
+
+                last_error = GroqAPIError(
+                    f"Groq API returned error: {response.status_code}", response.status_code
+                )
+                if response.status_code not in RETRYABLE_STATUS:
+                    # A bad request says nothing about Groq's health
+                    if breaker is not None:
+                        breaker.record(True, time.time() - started)
+                    raise last_error
+                delay = retry_after_seconds(response.headers, delay)
+
+            if breaker is not None:
+                breaker.record(False, time.time() - started)
+
+            if attempt == max_attempts - 1:
+                break
+            if delay > GROQ_MAX_RETRY_DELAY:
+                # Waiting this long would stall the caller more than falling back does,
+                # and every other caller would hit the same limit
+                if breaker is not None:
+                    breaker.trip(delay)
+                raise GroqAPIError(f"{last_error} (retry after {delay:.0f}s)", last_error.status_code)
+            await asyncio.sleep(delay)
+
+        raise last_error
+
+    def close(self):
+        """Close the pooled connections and stop the background loop"""
+        with self._lock:
+            loop, client = self._loop, self._client
+            self._loop = self._client = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+
+    async def aclose(self):
+        """close() for async code, without blocking the caller's event loop"""
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_groq_client():
+    """Return the shared client, creating it on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GroqClient(os.environ.get("GROQ_API_KEY", ""))
+        return _client
+
+
+def close_groq_client():
+    """Close the shared client if it was created (safe to call at shutdown)"""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
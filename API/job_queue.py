@@ -0,0 +1,309 @@
+"""
+Background jobs for long-running work such as /find/best-playlist.
+
+A best-playlist search scrapes YouTube for tens of seconds while the HTTP connection
+stays open, and clients that give up and retry start the whole search again. Jobs turn
+this around: submit() returns a job ID at once, a bounded pool of worker threads runs
+the work, and clients poll (or long-poll) the job for progress and the result. A job
+identical to one still queued or running is not started twice; the caller gets the
+existing job instead.
+
+Jobs are stored in SQLite, so finished results outlive the request that started them
+and jobs interrupted by a restart are queued again when the queue starts. A job runs in
+a copy of the submitter's context, so context variables such as the usage labels follow it.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+JOB_STORE_PATH = os.environ.get(
+    "JOB_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.db")
+)
+
+# Jobs running at once, and jobs queued or running before new ones are refused
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_MAX_PENDING = int(os.environ.get("JOB_MAX_PENDING", 50))
+
+# Finished jobs are deleted after this many seconds
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", 86400))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """Too many jobs are queued or running to accept another one"""
+
+
+class JobStore:
+    """
+    SQLite-backed store of jobs, one row per job
+
+    Thread-safe: workers update their jobs while requests read them.
+    """
+
+    def __init__(self, path=JOB_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    dedup_key TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, status)")
+
+    def insert(self, job):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, NULL, NULL, ?, NULL, NULL)",
+                (job["id"], job["kind"], job["dedup_key"], json.dumps(job["params"]), job["status"], job["created_at"])
+            )
+
+    def update(self, job_id, **fields):
+        """Set columns of a job; result is stored as JSON"""
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], default=str)
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock, self._connection:
+            self._connection.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        """Return a job as a dict, or None if it does not exist"""
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def find_active(self, dedup_key):
+        """Return the queued or running job with this key, if any"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT * FROM jobs WHERE dedup_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (dedup_key, QUEUED, RUNNING)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def unfinished(self):
+        """Jobs left queued or running, oldest first"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def prune(self, finished_before):
+        """Delete jobs that finished before the given time"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (finished_before,)
+            )
+
+    @staticmethod
+    def _to_dict(row):
+        job_id, kind, dedup_key, params, status, result, error, created_at, started_at, finished_at = row
+        return {
+            "id": job_id,
+            "kind": kind,
+            "dedup_key": dedup_key,
+            "params": json.loads(params),
+            "status": status,
+            "result": json.loads(result) if result is not None else None,
+            "error": error,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at
+        }
+
+
+class JobQueue:
+    """
+    Bounded worker pool running stored jobs
+
+    Handlers are registered per job kind as handler(params, report) and return a
+    JSON-serializable result; report(message) publishes a progress message. Call start()
+    before submitting jobs.
+    """
+
+    def __init__(self, store=None, workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING):
+        self.store = store or JobStore()
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._futures = {}
+        self._progress = {}
+
+    def register(self, kind, handler):
+        """Run jobs of this kind with handler(params, report)"""
+        self._handlers[kind] = handler
+
+    def start(self):
+        """
+        Start the workers and queue again the jobs a previous process left unfinished
+
+        Only one process may own a job store: pending() and this re-queueing only know
+        about the jobs of this process, so a second process would run them again.
+        """
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+
+        for job in self.store.unfinished():
+            future = self._futures.get(job["id"])
+            if future is not None and not future.done():
+                # Still running since before a stop() in this process
+                continue
+            if job["kind"] in self._handlers:
+                self.store.update(job["id"], status=QUEUED, started_at=None)
+                self._enqueue(job)
+            else:
+                self.store.update(job["id"], status=FAILED, error=f"No handler for job kind {job['kind']}",
+                                  finished_at=time.time())
+
+    def stop(self):
+        """Stop taking work; running jobs finish, queued ones run again after the next start()"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, kind, params, dedup_key=None):
+        """
+        Queue a job, or return the queued or running job with the same key
+
+        Args:
+            kind: Registered job kind
+            params: JSON-serializable handler arguments
+            dedup_key: Jobs with equal keys are the same work (defaults to kind and params)
+
+        Returns:
+            tuple: (job dict, whether a new job was created)
+
+        Raises:
+            JobQueueFull: JOB_MAX_PENDING jobs are already queued or running
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if dedup_key is None:
+            dedup_key = json.dumps(params, sort_keys=True)
+        dedup_key = f"{kind}:{dedup_key}"
+
+        with self._lock:
+            existing = self.store.find_active(dedup_key)
+            if existing is not None:
+                return self._with_progress(existing), False
+
+            if self.pending() >= self.max_pending:
+                raise JobQueueFull(f"{self.max_pending} jobs are already queued or running")
+
+            job = {
+                "id": uuid.uuid4().hex,
+                "kind": kind,
+                "dedup_key": dedup_key,
+                "params": params,
+                "status": QUEUED,
+                "created_at": time.time()
+            }
+            self.store.insert(job)
+            self._enqueue(job)
+
+        self.store.prune(time.time() - JOB_RETENTION_SECONDS)
+        return self.get(job["id"]), True
+
+    def pending(self):
+        """Number of jobs queued or running in this process"""
+        return sum(1 for future in list(self._futures.values()) if not future.done())
+
+    def get(self, job_id):
+        """Return a job with its latest progress, or None"""
+        job = self.store.get(job_id)
+        return self._with_progress(job) if job else None
+
+    async def wait(self, job_id, timeout):
+        """
+        Long-poll a job from async code: return it once it has finished or timeout seconds have passed
+
+        Returns:
+            dict: The job, or None if it does not exist
+        """
+        future = self._futures.get(job_id)
+        if future is not None and timeout > 0:
+            try:
+                # Shielded so a timed out wait does not cancel a queued job
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.get(job_id)
+
+    def _enqueue(self, job):
+        if self._executor is None:
+            raise RuntimeError("Job queue is not started")
+        self._progress[job["id"]] = {"message": None, "updates": 0}
+        future = self._executor.submit(contextvars.copy_context().run, self._run, job)
+        self._futures[job["id"]] = future
+        future.add_done_callback(lambda _: self._futures.pop(job["id"], None))
+
+    def _run(self, job):
+        job_id = job["id"]
+        self.store.update(job_id, status=RUNNING, started_at=time.time())
+
+        def report(message):
+            progress = self._progress.setdefault(job_id, {"message": None, "updates": 0})
+            progress["message"] = message
+            progress["updates"] += 1
+
+        try:
+            result = self._handlers[job["kind"]](job["params"], report)
+        except Exception as e:
+            logger.exception(f"Job {job_id} ({job['kind']}) failed: {e}")
+            self.store.update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+        else:
+            self.store.update(job_id, status=DONE, result=result, finished_at=time.time())
+        finally:
+            self._progress.pop(job_id, None)
+
+    def _with_progress(self, job):
+        job = dict(job)
+        job.pop("dedup_key", None)
+        job["progress"] = dict(self._progress.get(job["id"]) or {"message": None, "updates": 0})
+        return job
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the shared queue, creating it (not started) on first use"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
@@ -0,0 +1,480 @@
+"""
+Pluggable LLM backends for relevance checks and technology extraction, with hedging.
+
+Relevance checks used to depend on Groq alone and technology extraction on Gemini
+alone, so a slow or failing provider showed up directly in our tail latency. Both tasks
+now go through a ProviderRouter holding an ordered list of backends:
+
+    groq    Groq chat completions (groq_client.GroqClient)
+    gemini  Google Gemini (needs google-generativeai and GEMINI_API_KEY)
+    local   Any OpenAI-compatible endpoint at LOCAL_LLM_URL, e.g. mock_llm_server.py
+    rules   The local rule-based checks, registered by the task modules
+
+The router starts the first healthy backend. If it has not answered within the p95
+latency of its recent answers the next LLM backend is started as well, and the first
+answer wins; a backend that fails hands over to the next one at once. The local and
+rules backends are only used for failover, never raced against a slow LLM, since their
+answers are worse and the LLM is usually about to answer. Every backend has its own
+health record (a circuit breaker plus latency statistics), and unhealthy backends are
+skipped until their circuit lets a trial call through.
+
+Every backend answers with the JSON object the task's prompt asks for, so callers parse
+one format whichever backend won. A hedged call that loses the race is not cut off: it
+finishes in the background so the tokens it used are still metered.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from circuit_breaker import CircuitBreaker
+from groq_client import GroqAPIError, GroqClient, get_groq_client
+from usage_meter import current_labels, get_usage_meter, usage_labels
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+# Seconds without an answer before the next backend is started alongside, used until a
+# backend has LLM_HEDGE_MIN_SAMPLES answers; after that its own p95 latency is used. A
+# full relevance chunk (LLM_CHUNK_TOKEN_BUDGET tokens of prompt and answer) takes a few
+# seconds, so the default sits above that and below the circuit breaker's slow-call
+# threshold (CIRCUIT_SLOW_CALL_SECONDS, 8 s): only calls that are already slow are hedged.
+LLM_HEDGE_AFTER = float(os.environ.get("LLM_HEDGE_AFTER", 6.0))
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", 20))
+
+# Backends per task, in order of preference
+TASK_PROVIDERS = {
+    "relevance": os.environ.get("RELEVANCE_PROVIDERS", "groq,gemini,rules"),
+    "extraction": os.environ.get("EXTRACTION_PROVIDERS", "gemini,groq,rules")
+}
+
+GROQ_MODEL = os.environ.get("GROQ_MODEL", "llama-3.3-70b-versatile")
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.0-flash")
+LOCAL_LLM_URL = os.environ.get("LOCAL_LLM_URL", "http://127.0.0.1:8090/v1/chat/completions")
+LOCAL_LLM_MODEL = os.environ.get("LOCAL_LLM_MODEL", "mock")
+
+# Weight of the newest call in a backend's latency average
+LATENCY_EWMA_WEIGHT = 0.2
+
+# Successful calls per backend kept for its p95 latency
+LATENCY_WINDOW = 200
+
+
+class ProviderError(Exception):
+    """A backend could not answer, or no backend could"""
+
+
+class LLMRequest:
+    """
+    One task for a backend
+
+    Args:
+        task: "relevance" or "extraction"
+        prompt: Prompt for the LLM backends
+        data: The task's structured input (e.g. {"titles", "technology"}) for local backends
+    """
+
+    def __init__(self, task, prompt, data=None):
+        self.task = task
+        self.prompt = prompt
+        self.data = data or {}
+
+
+def parse_json_text(text):
+    """Decode a JSON answer, tolerating a surrounding markdown code block"""
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.startswith("json"):
+            text = text[4:]
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ProviderError(f"Invalid JSON answer: {e}")
+
+
+class ProviderHealth:
+    """
+    Success/latency record of one backend, with a circuit breaker deciding whether to use it
+
+    A backend whose client already runs a circuit breaker (GroqClient) passes it in, so
+    its calls are not counted by a second breaker; the client records every attempt itself.
+    """
+
+    def __init__(self, name, breaker=None):
+        self._owns_breaker = breaker is None
+        self.breaker = breaker if breaker is not None else CircuitBreaker(name)
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.latency_ewma = None
+        self.calls = 0
+        self.failures = 0
+        self.wins = 0
+        self.hedged = 0
+
+    def allow(self):
+        return self.breaker.allow()
+
+    def record(self, success, latency):
+        if self._owns_breaker:
+            self.breaker.record(success, latency)
+        with self._lock:
+            self.calls += 1
+            if not success:
+                self.failures += 1
+                return
+            self._latencies.append(latency)
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma += LATENCY_EWMA_WEIGHT * (latency - self.latency_ewma)
+
+    def record_win(self):
+        with self._lock:
+            self.wins += 1
+
+    def record_hedge(self):
+        with self._lock:
+            self.hedged += 1
+
+    def hedge_delay(self, default):
+        """p95 latency of the recent successful calls, or default until there are enough of them"""
+        with self._lock:
+            if len(self._latencies) < LLM_HEDGE_MIN_SAMPLES:
+                return default
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def stats(self, default_hedge_delay=LLM_HEDGE_AFTER):
+        hedge_delay = self.hedge_delay(default_hedge_delay)
+        with self._lock:
+            return {
+                "state": self.breaker.state,
+                "calls": self.calls,
+                "failures": self.failures,
+                "wins": self.wins,
+                "hedged": self.hedged,
+                "latency_ewma_seconds": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+                "hedge_after_seconds": round(hedge_delay, 3)
+            }
+
+
+class LLMProvider:
+    """Base class of the backends: run() answers a request with the task's JSON object"""
+
+    # Whether answers are worth caching (rule-based ones are recomputed cheaply and
+    # should not stand in for a model answer)
+    cacheable = True
+    # Whether the backend may be raced against a slow one, or only takes over after a failure
+    hedge = True
+    # Model answering the requests, part of the cache keys of its answers
+    model = None
+
+    def __init__(self, name, breaker=None):
+        self.name = name
+        self.health = ProviderHealth(name, breaker)
+
+    def supports(self, task):
+        return True
+
+    def configured(self):
+        """Whether the backend has what it needs (API key, library) to be tried at all"""
+        return True
+
+    async def run(self, request):
+        raise NotImplementedError
+
+
+class ChatCompletionsProvider(LLMProvider):
+    """OpenAI-compatible chat completions backend (Groq, or a local server) in JSON mode"""
+
+    def __init__(self, name, client, model, hedge=True):
+        super().__init__(name, client.breaker)
+        self.client = client
+        self.model = model
+        self.hedge = hedge
+
+    def configured(self):
+        return bool(self.client.api_key)
+
+    async def run(self, request):
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": request.prompt}],
+            "temperature": 0.1,  # Low temperature for more consistent results
+            "response_format": {"type": "json_object"}
+        }
+        try:
+            # Shielded so a lost hedge still completes and is metered by the client
+            result = await asyncio.shield(self.client.chat(payload))
+        except GroqAPIError as e:
+            raise ProviderError(str(e))
+
+        content = result.get("choices", [{}])[0].get("message", {}).get("content")
+        return parse_json_text(content)
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini backend, metered from the response's usage_metadata"""
+
+    def __init__(self, name="gemini", api_key=None, model=GEMINI_MODEL):
+        super().__init__(name)
+        self.api_key = api_key if api_key is not None else os.environ.get("GEMINI_API_KEY", "")
+        self.model = model
+        self._model = None
+        if self.configured():
+            genai.configure(api_key=self.api_key)
+            # One model client for every call
+            self._model = genai.GenerativeModel(model)
+
+    def configured(self):
+        return genai is not None and bool(self.api_key)
+
+    async def run(self, request):
+        # Shielded so a lost hedge still completes and its tokens are metered
+        return parse_json_text(await asyncio.shield(self._generate(request)))
+
+    async def _generate(self, request):
+        """Call Gemini and meter the call, returning the answer's text"""
+        meter = get_usage_meter()
+        started = time.time()
+        try:
+            response = await self._model.generate_content_async(
+                request.prompt,
+                generation_config={"temperature": 0.1, "response_mime_type": "application/json"}
+            )
+            text = response.text
+        except Exception as e:
+            meter.record_call(self.name, self.model, latency=time.time() - started, error=True)
+            raise ProviderError(f"Gemini error: {e}")
+
+        usage = getattr(response, "usage_metadata", None)
+        meter.record_call(
+            self.name, self.model,
+            prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+            completion_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+            latency=time.time() - started
+        )
+        return text
+
+
+class LocalProvider(LLMProvider):
+    """
+    In-process backend answering from request.data with a handler per task
+
+    Handlers return the same JSON object an LLM would and must be fast, since they run
+    on the event loop.
+    """
+
+    cacheable = False
+    hedge = False
+
+    def __init__(self, name, handlers=None):
+        super().__init__(name)
+        self.handlers = dict(handlers or {})
+
+    def supports(self, task):
+        return task in self.handlers
+
+    async def run(self, request):
+        return self.handlers[request.task](request.data)
+
+
+class ProviderRouter:
+    """
+    Runs a task on an ordered list of backends with hedging and failover
+
+    A backend is raced against after its hedge delay (see ProviderHealth.hedge_delay,
+    hedge_after until it has enough answers) only by later backends that allow hedging.
+    Every call runs on one background event loop, since clients such as Gemini's async
+    client are bound to the loop they were first used on. Use run_async() from async code
+    and submit()/run_sync() from threads; run() itself only runs on that loop.
+    """
+
+    def __init__(self, task, providers, hedge_after=LLM_HEDGE_AFTER):
+        self.task = task
+        self.providers = list(providers)
+        self.hedge_after = hedge_after
+
+    async def _timed(self, provider, request):
+        started = time.time()
+        try:
+            result = await provider.run(request)
+        except asyncio.CancelledError:
+            # Lost a hedged race; says nothing about the backend's health
+            raise
+        except Exception:
+            provider.health.record(False, time.time() - started)
+            raise
+        provider.health.record(True, time.time() - started)
+        return result
+
+    async def run(self, request):
+        """
+        Answer a request with the first backend that succeeds
+
+        Returns:
+            tuple: (the task's JSON object, the LLMProvider that answered)
+
+        Raises:
+            ProviderError: Every backend failed or was unavailable
+        """
+        candidates = [
+            provider for provider in self.providers
+            if provider.supports(request.task) and provider.configured()
+        ]
+        pending = {}
+        errors = []
+        next_index = 0
+        last_started = None
+
+        def start_next(hedge=False):
+            """Start the next available backend; as a hedge, stop at one that only takes over failures"""
+            nonlocal next_index, last_started
+            while next_index < len(candidates):
+                provider = candidates[next_index]
+                if hedge and not provider.hedge:
+                    return None
+                next_index += 1
+                if provider.health.allow():
+                    pending[asyncio.ensure_future(self._timed(provider, request))] = provider
+                    last_started = provider
+                    return provider
+                errors.append(f"{provider.name}: circuit open")
+            return None
+
+        start_next()
+        try:
+            while pending:
+                can_hedge = next_index < len(candidates) and candidates[next_index].hedge
+                done, _ = await asyncio.wait(
+                    pending, timeout=last_started.health.hedge_delay(self.hedge_after) if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # The backends in flight are slow, race the next one against them
+                    hedge = start_next(hedge=True)
+                    if hedge is not None:
+                        hedge.health.record_hedge()
+                    continue
+
+                for future in done:
+                    provider = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        errors.append(f"{provider.name}: {e}")
+                        if not pending:
+                            start_next()
+                        continue
+                    provider.health.record_win()
+                    return result, provider
+        finally:
+            for future in pending:
+                future.cancel()
+
+        raise ProviderError("; ".join(errors) or f"No backend available for {request.task}")
+
+    def submit(self, request):
+        """
+        Start run() on the background loop from a thread
+
+        Returns:
+            concurrent.futures.Future: Resolves to run()'s result
+        """
+        labels = current_labels()
+
+        async def run_with_labels():
+            # Keep the caller's usage labels on the background loop
+            with usage_labels(**labels):
+                return await self.run(request)
+
+        return asyncio.run_coroutine_threadsafe(run_with_labels(), _background_loop())
+
+    def run_sync(self, request):
+        """Blocking run() for worker threads"""
+        return self.submit(request).result()
+
+    async def run_async(self, request):
+        """run() for async code on any other loop, e.g. FastAPI's"""
+        return await asyncio.wrap_future(self.submit(request))
+
+    def stats(self):
+        return {
+            "task": self.task,
+            "hedge_after_seconds": self.hedge_after,
+            "providers": [
+                {"name": provider.name, "configured": provider.configured(), "hedge": provider.hedge,
+                 **provider.health.stats(self.hedge_after)}
+                for provider in self.providers if provider.supports(self.task)
+            ]
+        }
+
+
+_loop = None
+_providers = {}
+_routers = {}
+_lock = threading.Lock()
+
+
+def _background_loop():
+    """Event loop that runs routers for threaded callers, started on first use"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-providers", daemon=True).start()
+        return _loop
+
+
+def _create_provider(name):
+    if name == "groq":
+        return ChatCompletionsProvider("groq", get_groq_client(), GROQ_MODEL)
+    if name == "gemini":
+        return GeminiProvider()
+    if name == "local":
+        client = GroqClient(
+            os.environ.get("LOCAL_LLM_API_KEY", "local"), api_url=LOCAL_LLM_URL,
+            requests_per_minute=0, circuit_enabled=False, name="local"
+        )
+        return ChatCompletionsProvider("local", client, LOCAL_LLM_MODEL, hedge=False)
+    if name == "rules":
+        return LocalProvider("rules")
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+
+def get_provider(name):
+    """Return the shared backend with this name, creating it on first use"""
+    with _lock:
+        if name not in _providers:
+            _providers[name] = _create_provider(name)
+        return _providers[name]
+
+
+def register_local_handler(task, handler):
+    """Let the "rules" backend answer a task: handler(request.data) returns the task's JSON object"""
+    get_provider("rules").handlers[task] = handler
+
+
+def get_router(task):
+    """Return the shared router of a task, built from TASK_PROVIDERS"""
+    with _lock:
+        router = _routers.get(task)
+    if router is None:
+        names = [name.strip() for name in TASK_PROVIDERS[task].split(",") if name.strip()]
+        router = ProviderRouter(task, [get_provider(name) for name in names])
+        with _lock:
+            router = _routers.setdefault(task, router)
+    return router
+
+
+def providers_stats():
+    """Health of every task's backends"""
+    with _lock:
+        routers = list(_routers.values())
+    return {router.task: router.stats() for router in routers}
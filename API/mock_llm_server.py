@@ -0,0 +1,144 @@
+"""
+Local stand-in for the Groq chat completions API, for tests and offline development.
+
+Answers relevance prompts from relevance_checker and extraction prompts from
+tech_extractor with the rule-based checks instead of a model, and can be told to be slow or to rate limit, so the retry and timeout behaviour
+of groq_client can be exercised without a Groq account:
+
+    MOCK_LLM_DELAY=0.5 MOCK_LLM_FAIL_FIRST=2 python mock_llm_server.py
+    GROQ_API_URL=http://localhost:8090/openai/v1/chat/completions GROQ_API_KEY=test python relevance_checker.py
+
+It is also the default LOCAL_LLM_URL, so RELEVANCE_PROVIDERS=local,rules runs the
+hedging and failover of llm_providers against it.
+
+Environment:
+    MOCK_LLM_PORT: Port to listen on (default 8090)
+    MOCK_LLM_DELAY: Seconds to wait before answering
+    MOCK_LLM_FAIL_FIRST: Answer this many requests with an error before succeeding
+    MOCK_LLM_FAIL_STATUS: Status of those errors (default 429, e.g. 503 to trip the circuit breaker)
+    MOCK_LLM_RETRY_AFTER: Retry-After header sent with those errors
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+MOCK_LLM_DELAY = float(os.environ.get("MOCK_LLM_DELAY", 0))
+MOCK_LLM_FAIL_FIRST = int(os.environ.get("MOCK_LLM_FAIL_FIRST", 0))
+MOCK_LLM_FAIL_STATUS = int(os.environ.get("MOCK_LLM_FAIL_STATUS", 429))
+MOCK_LLM_RETRY_AFTER = os.environ.get("MOCK_LLM_RETRY_AFTER", "1")
+
+_TECHNOLOGY_PATTERN = re.compile(r"^Technology: (.+)$", re.MULTILINE)
+_NUMBERED_TITLE_PATTERN = re.compile(r"^(\d+): (\".*\")$", re.MULTILINE)
+_TEXTS_PATTERN = re.compile(r"^\s*Texts: (\[.*\])$", re.MULTILINE)
+
+app = FastAPI(title="Mock LLM API", description="Stand-in for the Groq chat completions API")
+
+_lock = threading.Lock()
+_request_count = 0
+
+
+def answer_extraction_prompt(texts):
+    """
+    Build the JSON content a model would return for an extraction prompt
+
+    Returns:
+        dict: {"results": [...]} with the rule-based extraction of every text
+    """
+    from relevance_checker import extract_technologies_from_title
+
+    return {"results": [
+        {"text": text, "technologies": extract_technologies_from_title(text)} for text in texts
+    ]}
+
+
+def answer_prompt(prompt):
+    """
+    Build the JSON content a model would return for a relevance or extraction prompt
+
+    Returns:
+        dict: {"r": [...]} with one compact rule-based result per numbered title, or the
+              answer_extraction_prompt() result
+    """
+    # Imported here so the mock can start without relevance_checker's environment checks
+    from relevance_checker import TITLES_MARKER, rule_based_relevance_check
+
+    texts_match = _TEXTS_PATTERN.search(prompt)
+    if texts_match:
+        return answer_extraction_prompt(json.loads(texts_match.group(1)))
+
+    technology_match = _TECHNOLOGY_PATTERN.search(prompt)
+    start = prompt.find(TITLES_MARKER)
+    if not technology_match or start < 0:
+        return {"r": []}
+
+    technology = technology_match.group(1).strip()
+    results = []
+    for match in _NUMBERED_TITLE_PATTERN.finditer(prompt, start):
+        result = rule_based_relevance_check(json.loads(match.group(2)), technology)
+        results.append({
+            "i": int(match.group(1)),
+            "ok": int(result["isRelevant"]),
+            "s": result["similarity"],
+            "t": result["technologies"],
+            "e": result["explanation"]
+        })
+    return {"r": results}
+
+
+@app.post("/openai/v1/chat/completions")
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """OpenAI-compatible chat completions endpoint"""
+    global _request_count
+    with _lock:
+        _request_count += 1
+        request_number = _request_count
+
+    if MOCK_LLM_DELAY:
+        await asyncio.sleep(MOCK_LLM_DELAY)
+
+    if request_number <= MOCK_LLM_FAIL_FIRST:
+        return JSONResponse(
+            status_code=MOCK_LLM_FAIL_STATUS,
+            headers={"Retry-After": MOCK_LLM_RETRY_AFTER},
+            content={"error": {"message": f"Mock failure {request_number}", "type": "mock_error"}}
+        )
+
+    body = await request.json()
+    prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+    content = json.dumps(answer_prompt(prompt))
+
+    return {
+        "id": f"mock-{request_number}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4
+        }
+    }
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "requests": _request_count}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="127.0.0.1", port=int(os.environ.get("MOCK_LLM_PORT", 8090)))
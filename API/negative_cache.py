@@ -0,0 +1,120 @@
+"""
+Short-lived memory of playlists and videos that could not be fetched.
+
+Dead playlists (private, deleted, empty) keep showing up in search results, and every
+attempt to fetch one walks through CustomPlaylist, yt-dlp and the web fallback before
+giving up. The outcome is remembered here per ID and failure class, with a TTL that
+depends on how likely the failure is to go away, so the next request returns straight
+away instead of repeating the whole fallback cascade.
+"""
+
+import os
+import re
+import time
+
+from ttl_cache import TTLCache
+
+# Failure classes and how long (seconds) each is remembered
+FAILURE_TTLS = {
+    # Owner made the playlist/video private, unlikely to change soon
+    "private": int(os.environ.get("NEGATIVE_CACHE_PRIVATE_TTL", 1800)),
+    # Removed, terminated or never existed
+    "deleted": int(os.environ.get("NEGATIVE_CACHE_DELETED_TTL", 3600)),
+    # Exists but has no videos
+    "empty": int(os.environ.get("NEGATIVE_CACHE_EMPTY_TTL", 900)),
+    # YouTube is throttling us, back off briefly
+    "rate_limited": int(os.environ.get("NEGATIVE_CACHE_RATE_LIMITED_TTL", 120)),
+    # The page loaded (HTTP 200) but came back in a shape we could not read
+    "parse_failure": int(os.environ.get("NEGATIVE_CACHE_PARSE_FAILURE_TTL", 300)),
+    # Network errors, timeouts and 5xx/429 responses, likely gone on the next attempt (0 disables)
+    "transient": int(os.environ.get("NEGATIVE_CACHE_TRANSIENT_TTL", 5))
+}
+
+# Failure classes that every fallback would hit as well, so there is no point trying them
+TERMINAL_FAILURES = ("private", "deleted", "rate_limited")
+
+# Checked in order, rate limiting first since a throttled page may also look empty
+_FAILURE_PATTERNS = (
+    ("rate_limited", re.compile(
+        r"\b429\b|too many requests|unusual traffic|confirm you.re not a bot|rate.?limit", re.IGNORECASE)),
+    ("private", re.compile(r"\bprivate (?:video|playlist)\b|playlist is private|video is private", re.IGNORECASE)),
+    ("deleted", re.compile(
+        r"does not exist|video unavailable|playlist unavailable|has been removed|account .{0,40}terminated"
+        r"|no longer available|\b404\b", re.IGNORECASE)),
+)
+
+
+def classify_failure(text, default=None):
+    """
+    Classify an error message, HTTP status or page text into a failure class
+
+    Args:
+        text: yt-dlp stderr, exception message, alert text or page HTML
+        default: Class returned when nothing matches (e.g. "parse_failure")
+
+    Returns:
+        str: One of FAILURE_TTLS, or default
+    """
+    if text:
+        text = str(text)
+        for failure, pattern in _FAILURE_PATTERNS:
+            if pattern.search(text):
+                return failure
+    return default
+
+
+def classify_status(status_code):
+    """
+    Classify the HTTP status of a response that was not 200
+
+    A missing page means the playlist or video is gone; anything else (5xx, 429, ...)
+    is a failure of this attempt rather than of the ID.
+    """
+    if status_code in (404, 410):
+        return "deleted"
+    return "transient"
+
+
+class NegativeCache:
+    """
+    Remembers failed fetches per (kind, ID) with a TTL chosen by failure class
+
+    kind is "playlist" or "video". Thread-safe through the underlying TTLCache.
+    """
+
+    def __init__(self, ttls=None, max_size=10000):
+        self.ttls = dict(FAILURE_TTLS, **(ttls or {}))
+        self._cache = TTLCache(ttl=max(self.ttls.values()), max_size=max_size)
+
+    def get(self, kind, item_id):
+        """
+        Return the remembered failure for an ID, or None
+
+        Returns:
+            dict: {"failure": class, "reason": message, "recorded_at": timestamp}
+        """
+        return self._cache.get((kind, item_id))
+
+    def add(self, kind, item_id, failure, reason=""):
+        """Remember that fetching an ID failed with the given failure class"""
+        if failure not in self.ttls:
+            raise ValueError(f"Unknown failure class: {failure}")
+        if self.ttls[failure] <= 0:
+            return
+
+        self._cache.set((kind, item_id), {
+            "failure": failure,
+            "reason": str(reason)[:200],
+            "recorded_at": time.time()
+        }, ttl=self.ttls[failure])
+
+    def discard(self, kind, item_id):
+        """Forget a failure, e.g. after a later fetch succeeded"""
+        self._cache.delete((kind, item_id))
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the number of remembered failures"""
+        return self._cache.stats()
@@ -0,0 +1,449 @@
+"""
+Vectorized playlist scoring.
+
+score_playlist() scores one candidate at a time. Its point components (video count,
+total views, average views, duration ratio, recency, like ratio and first-video views)
+only depend on a handful of numbers per playlist, so here they are computed for many
+playlists at once: the numbers are gathered into NumPy columns and each component is a
+threshold table lookup over a whole column. The per-playlist breakdowns are the same
+details dicts score_playlist() returns, which makes re-ranking thousands of cached
+playlists a matter of milliseconds.
+
+Run this module directly to check the batch scores match score_playlist() on a
+generated set of playlists:
+
+    python playlist_scorer.py
+"""
+
+import json
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+
+from duration_parser import summarize_durations, video_durations
+
+# Scoring parameters are read from a versioned JSON file so they can be tuned (and
+# candidates re-ranked with rescore.py) without editing code
+SCORING_CONFIG_PATH = os.environ.get(
+    "SCORING_CONFIG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "scoring_config.json")
+)
+
+# A config has a point table per component: a value gets points[i], where i is the number
+# of thresholds it reaches. Thresholds are ascending and a value reaches a threshold when
+# it is >= the threshold (or > with "reached_when": ">"). duration_ratio thresholds are
+# minutes per video, compared as total duration >= video count × threshold; recency
+# thresholds are an age in years, and recency_default is used when no year is known.
+SCORING_COMPONENTS = (
+    "video_count", "total_views", "avg_views", "duration_ratio",
+    "recency", "like_ratio", "first_video_views"
+)
+
+# Per-playlist inputs of the point components, as stored for re-ranking
+STAT_FIELDS = (
+    "video_count", "total_views", "total_duration_minutes", "duration_scored",
+    "publish_year", "first_video_likes", "first_video_views"
+)
+
+
+def validate_scoring_config(config):
+    """
+    Check a scoring config has every component with ascending thresholds and one more points entry
+
+    Raises:
+        ValueError: If the config is malformed
+    """
+    if not isinstance(config, dict) or not config.get("version"):
+        raise ValueError("Scoring config needs a version")
+
+    components = config.get("components")
+    if not isinstance(components, dict):
+        raise ValueError("Scoring config needs a components object")
+
+    for name in SCORING_COMPONENTS:
+        table = components.get(name)
+        if not isinstance(table, dict):
+            raise ValueError(f"Scoring config is missing the {name} component")
+
+        thresholds = table.get("thresholds")
+        points = table.get("points")
+        if not isinstance(thresholds, list) or not isinstance(points, list):
+            raise ValueError(f"{name}: thresholds and points must be lists")
+        if len(points) != len(thresholds) + 1:
+            raise ValueError(f"{name}: expected {len(thresholds) + 1} points for {len(thresholds)} thresholds")
+        if any(not isinstance(value, (int, float)) for value in thresholds + points):
+            raise ValueError(f"{name}: thresholds and points must be numbers")
+        if thresholds != sorted(thresholds):
+            raise ValueError(f"{name}: thresholds must be ascending")
+        if table.get("reached_when", ">=") not in (">=", ">"):
+            raise ValueError(f"{name}: reached_when must be \">=\" or \">\"")
+
+    if not isinstance(config.get("recency_default", 0.1), (int, float)):
+        raise ValueError("recency_default must be a number")
+
+    return config
+
+
+def load_scoring_config(path=None):
+    """Load and validate a scoring config file (SCORING_CONFIG_PATH by default)"""
+    with open(path or SCORING_CONFIG_PATH, 'r', encoding='utf-8') as f:
+        return validate_scoring_config(json.load(f))
+
+
+SCORING_CONFIG = load_scoring_config()
+
+
+def table_points(table, value):
+    """Points for a single value"""
+    if table.get("reached_when", ">=") == ">":
+        reached = sum(1 for threshold in table["thresholds"] if value > threshold)
+    else:
+        reached = sum(1 for threshold in table["thresholds"] if value >= threshold)
+    return table["points"][reached]
+
+
+def _lookup(table, values):
+    """Points for every value in a column"""
+    side = "left" if table.get("reached_when", ">=") == ">" else "right"
+    index = np.searchsorted(np.asarray(table["thresholds"], dtype=float), values, side=side)
+    return np.asarray(table["points"], dtype=float)[index]
+
+
+def publish_year_from_video(video, current_year=None):
+    """
+    Extract the publish year from a video's publish_date
+
+    Understands "YYYY-MM-DD", "YYYYMMDD", "YYYY", "N years ago" and other relative
+    dates ("3 weeks ago" is this year). Returns None if no year can be found.
+    """
+    if current_year is None:
+        current_year = datetime.now().year
+
+    publish_date = video.get("publish_date", "")
+    if not publish_date or not isinstance(publish_date, str):
+        return None
+
+    if "-" in publish_date and len(publish_date) >= 4:
+        year_str = publish_date.split("-")[0]
+        if year_str.isdigit():
+            return int(year_str)
+    elif publish_date.isdigit() and len(publish_date) == 8:
+        return int(publish_date[:4])
+    elif publish_date.isdigit() and len(publish_date) == 4:
+        return int(publish_date)
+    elif "year" in publish_date.lower():
+        match = re.search(r'(\d+) year', publish_date)
+        if match:
+            return current_year - int(match.group(1))
+    elif any(term in publish_date.lower() for term in ["month", "week", "day", "hour", "minute", "second"]):
+        return current_year
+
+    return None
+
+
+def playlist_stats(playlists, publish_years=None, current_year=None):
+    """
+    Extract the inputs of the point components from fetched playlists
+
+    These rows are all the scores depend on, so they can be stored and re-scored
+    later under another config without fetching anything again.
+
+    Args:
+        playlists: Playlist dicts as built by the fetchers (videos, _video_count, direct_view_count, ...)
+        publish_years: Optional publish year per playlist, overriding what can be read from the playlist
+        current_year: Year to resolve relative dates ("3 years ago") against
+
+    Returns:
+        list: One dict with the STAT_FIELDS per playlist (None where a value is unknown)
+    """
+    if current_year is None:
+        current_year = datetime.now().year
+
+    # Every duration of every playlist is parsed in one pass, then sliced per playlist
+    all_videos = [video for playlist in playlists for video in playlist.get("videos", [])]
+    all_durations = video_durations(all_videos)
+    offset = 0
+
+    rows = []
+    for index, playlist in enumerate(playlists):
+        videos = playlist.get("videos", [])
+        durations = all_durations[offset:offset + len(videos)]
+        offset += len(videos)
+        first_video = videos[0] if videos else {}
+        video_count = playlist.get("_video_count") or len(videos)
+
+        total_views = playlist.get("direct_view_count", 0)
+        if not total_views:
+            videos_with_views = [v for v in videos if "views" in v and v["views"]]
+            if videos_with_views:
+                total_views = sum(v["views"] for v in videos_with_views)
+
+        # Enhanced totals from the stats fetch win over the durations of the videos we have
+        total_duration = playlist.get("_total_duration_minutes", 0)
+        duration_scored = False
+        summary_total = summarize_durations(durations, video_count)["total_duration_minutes"]
+        if "_avg_duration_minutes" in playlist:
+            if "_total_duration_minutes" not in playlist and summary_total is not None:
+                total_duration = summary_total
+            duration_scored = True
+        elif summary_total is not None:
+            total_duration = summary_total
+            duration_scored = True
+
+        if publish_years is not None:
+            publish_year = publish_years[index]
+        elif "_publish_year" in playlist:
+            publish_year = playlist.get("_publish_year")
+        else:
+            publish_year = publish_year_from_video(first_video, current_year)
+
+        first_video_views = first_video.get("views")
+        first_video_likes = first_video.get("likes") if first_video_views else None
+
+        rows.append({
+            "video_count": video_count,
+            "total_views": total_views,
+            "total_duration_minutes": total_duration,
+            "duration_scored": duration_scored,
+            "publish_year": publish_year,
+            "first_video_likes": first_video_likes,
+            "first_video_views": first_video_views
+        })
+
+    return rows
+
+
+def stats_columns(stats):
+    """Turn rows from playlist_stats() into NumPy columns, NaN where a value is unknown"""
+    def column(field, falsy_unknown=False):
+        values = [row.get(field) for row in stats]
+        return np.array([
+            np.nan if value is None or (falsy_unknown and not value) else value
+            for value in values
+        ], dtype=float)
+
+    return {
+        "video_count": column("video_count"),
+        "total_views": np.nan_to_num(column("total_views")),
+        "total_duration_minutes": column("total_duration_minutes"),
+        "duration_scored": np.array([bool(row.get("duration_scored")) for row in stats], dtype=bool),
+        "publish_year": column("publish_year", falsy_unknown=True),
+        "first_video_likes": column("first_video_likes"),
+        "first_video_views": column("first_video_views")
+    }
+
+
+def playlist_columns(playlists, publish_years=None, current_year=None):
+    """NumPy columns for fetched playlists, see playlist_stats()"""
+    return stats_columns(playlist_stats(playlists, publish_years, current_year))
+
+
+def score_columns(columns, config=None, current_year=None):
+    """
+    Compute every score component for all playlists at once
+
+    Args:
+        columns: Columns from stats_columns() or playlist_columns()
+        config: Scoring config (defaults to SCORING_CONFIG)
+        current_year: Year to compute recency against (defaults to the current year)
+
+    Returns:
+        dict: One array per component plus "avg_views_per_video", "like_ratio" and "total_score"
+    """
+    if config is None:
+        config = SCORING_CONFIG
+    if current_year is None:
+        current_year = datetime.now().year
+    tables = config["components"]
+
+    video_count = columns["video_count"]
+    total_views = columns["total_views"]
+
+    scores = {}
+    scores["video_count_score"] = _lookup(tables["video_count"], video_count)
+    scores["total_views_score"] = _lookup(tables["total_views"], total_views)
+
+    has_views = (video_count > 0) & (total_views > 0)
+    avg_views = np.divide(total_views, video_count, out=np.zeros_like(total_views), where=has_views)
+    scores["avg_views_per_video"] = avg_views
+    scores["avg_views_score"] = np.where(has_views, _lookup(tables["avg_views"], avg_views), 0.0)
+
+    # Number of per-video thresholds the total duration reaches
+    duration_table = tables["duration_ratio"]
+    total_duration = np.nan_to_num(columns["total_duration_minutes"])
+    limits = video_count[:, None] * np.asarray(duration_table["thresholds"], dtype=float)[None, :]
+    if duration_table.get("reached_when", ">=") == ">":
+        reached = (total_duration[:, None] > limits).sum(axis=1)
+    else:
+        reached = (total_duration[:, None] >= limits).sum(axis=1)
+    duration_points = np.asarray(duration_table["points"], dtype=float)[reached]
+    scores["duration_ratio_score"] = np.where(columns["duration_scored"], duration_points, 0.0)
+
+    publish_year = columns["publish_year"]
+    known_year = ~np.isnan(publish_year)
+    years_old = np.where(known_year, current_year - publish_year, 0)
+    scores["recency_score"] = np.where(
+        known_year, _lookup(tables["recency"], years_old), config.get("recency_default", 0.1)
+    )
+
+    likes = columns["first_video_likes"]
+    first_views = columns["first_video_views"]
+    has_likes = ~np.isnan(likes)
+    like_ratio = np.divide(likes, first_views, out=np.zeros_like(likes), where=has_likes) * 100
+    scores["like_ratio"] = like_ratio
+    scores["like_ratio_score"] = np.where(has_likes, _lookup(tables["like_ratio"], like_ratio), 0.0)
+
+    has_first_views = ~np.isnan(first_views)
+    scores["first_video_views_score"] = np.where(
+        has_first_views, _lookup(tables["first_video_views"], np.nan_to_num(first_views)), 0.0
+    )
+
+    # Same order of additions as score_playlist so the totals are bit-for-bit equal
+    total = scores["video_count_score"] + scores["total_views_score"]
+    total = total + scores["avg_views_score"]
+    total = total + scores["duration_ratio_score"]
+    total = total + scores["recency_score"]
+    total = total + scores["like_ratio_score"]
+    total = total + scores["first_video_views_score"]
+    scores["total_score"] = total
+
+    return scores
+
+
+def score_stats(stats, config=None, current_year=None):
+    """
+    Score stored rows from playlist_stats()
+
+    Returns:
+        list: (score, details) per row, with details in the score_playlist() format
+    """
+    scores = score_columns(stats_columns(stats), config, current_year)
+
+    results = []
+    for index, row in enumerate(stats):
+        details = {
+            "title_relevance": True,
+            "video_count_score": float(scores["video_count_score"][index]),
+            "total_views_score": float(scores["total_views_score"][index]),
+            "duration_ratio_score": float(scores["duration_ratio_score"][index]),
+            "recency_score": float(scores["recency_score"][index]),
+            "like_ratio_score": float(scores["like_ratio_score"][index]),
+            "avg_views_score": float(scores["avg_views_score"][index]),
+            "first_video_views_score": float(scores["first_video_views_score"][index]),
+            "total_views": row.get("total_views"),
+            "total_likes": 0,
+            "total_duration_minutes": row.get("total_duration_minutes"),
+            "avg_views_per_video": float(scores["avg_views_per_video"][index]),
+            "publish_year": row.get("publish_year")
+        }
+        results.append((float(scores["total_score"][index]), details))
+
+    return results
+
+
+def score_playlists(playlists, publish_years=None, config=None, current_year=None):
+    """
+    Score many playlists at once
+
+    Relevance is not checked here - pass only playlists that already passed the title
+    relevance filter. Playlists without videos score None, like in score_playlist().
+
+    Args:
+        playlists: Playlist dicts as built by the fetchers
+        publish_years: Optional publish year per playlist (e.g. fetched from the first video's details)
+        config: Scoring config (defaults to SCORING_CONFIG)
+        current_year: Year to compute recency against (defaults to the current year)
+
+    Returns:
+        list: (score, details) per playlist, with details in the score_playlist() format
+    """
+    if current_year is None:
+        current_year = datetime.now().year
+
+    results = score_stats(playlist_stats(playlists, publish_years, current_year), config, current_year)
+    return [
+        result if playlist.get("videos") else (None, None)
+        for playlist, result in zip(playlists, results)
+    ]
+
+
+def _generate_playlists(seed=0, count=2000, current_year=2025):
+    """Random playlists covering every threshold and missing-data case"""
+    import random
+
+    rng = random.Random(seed)
+    playlists = []
+    for index in range(count):
+        video_count = rng.choice([1, 4, 5, 9, 10, 11, 30, 120])
+        videos = []
+        for video_index in range(rng.randint(1, video_count)):
+            video = {
+                "id": f"v{index}_{video_index}",
+                "title": "Python tutorial",
+                "duration": rng.choice(["12:34", "1:02:03", "45 minutes, 3 seconds", "Unknown", "0:45"])
+            }
+            if rng.random() < 0.3:
+                video["duration_seconds"] = rng.randint(0, 7200)
+            if rng.random() < 0.5:
+                video["views"] = rng.choice([0, 5000, 99999, 100000, 499999, 500000, 2000000])
+            videos.append(video)
+
+        first_video = videos[0]
+        if "views" in first_video and rng.random() < 0.7:
+            first_video["likes"] = rng.randint(0, max(1, first_video["views"] // 20))
+        first_video["publish_date"] = rng.choice([
+            "2024-03-01", "20230102", f"{current_year}", "3 years ago", "2 weeks ago", "Unknown"
+        ])
+        if first_video["publish_date"] == "Unknown":
+            # Keep the reference implementation from fetching details over the network
+            del first_video["id"]
+
+        playlist = {"title": "Python tutorial", "videos": videos}
+        if rng.random() < 0.5:
+            playlist["_video_count"] = video_count
+        if rng.random() < 0.4:
+            playlist["direct_view_count"] = rng.choice([0, 50000, 100000, 600000, 3000000])
+        if rng.random() < 0.3:
+            playlist["_avg_duration_minutes"] = rng.uniform(1, 60)
+            playlist["_total_duration_minutes"] = playlist["_avg_duration_minutes"] * video_count
+        playlists.append(playlist)
+    return playlists
+
+
+if __name__ == "__main__":
+    import contextlib
+    import io
+    import time
+
+    from Youtube import score_playlist
+
+    current_year = datetime.now().year
+    playlists = _generate_playlists(current_year=current_year)
+    relevance = {"is_relevant": True, "explanation": "generated"}
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = [score_playlist(playlist, "python", relevance_check=relevance) for playlist in playlists]
+    single_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = score_playlists(playlists, current_year=current_year)
+    batch_time = time.perf_counter() - started
+
+    mismatches = 0
+    for playlist, (expected_score, expected_details), (score, details) in zip(playlists, expected, actual):
+        if expected_score != score or expected_details != details:
+            mismatches += 1
+            print(f"MISMATCH: {playlist}\n  score_playlist: {expected_score} {expected_details}\n  batch:          {score} {details}")
+
+    # Re-ranking cached columns only needs score_columns()
+    columns = playlist_columns(playlists, current_year=current_year)
+    started = time.perf_counter()
+    score_columns(columns, current_year=current_year)
+    columns_time = time.perf_counter() - started
+
+    print(f"Checked {len(playlists)} playlists, {mismatches} mismatches")
+    print(f"score_playlist: {single_time:.3f}s, score_playlists: {batch_time:.3f}s, score_columns: {columns_time * 1000:.2f}ms")
+    raise SystemExit(1 if mismatches else 0)
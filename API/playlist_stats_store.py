@@ -0,0 +1,170 @@
+"""
+Query-independent store of playlist statistics.
+
+Popular playlists come up as candidates for many different queries, and everything
+score_playlist needs from them apart from title relevance (video count, views,
+duration aggregate, first-video stats) does not depend on the query. Those stats are
+kept here by playlist ID, in field groups with their own fetched_at time and maximum
+age, so a candidate seen for another query is scored without fetching it again and
+only the stale groups are refreshed.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from title_normalizer import NormalizedDict
+
+PLAYLIST_STATS_STORE_PATH = os.environ.get(
+    "PLAYLIST_STATS_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "playlist_stats.db")
+)
+
+# Maximum age in seconds of each field group
+FIELD_MAX_AGE = {
+    # Title, channel, video count and total views, read from the playlist page header
+    "header": int(os.environ.get("PLAYLIST_HEADER_MAX_AGE", 12 * 3600)),
+    # Duration aggregate estimated from the lengthText values on the first page
+    "durations": int(os.environ.get("PLAYLIST_DURATIONS_MAX_AGE", 7 * 24 * 3600)),
+    # First video with its likes/views/publish date
+    "first_video": int(os.environ.get("PLAYLIST_FIRST_VIDEO_MAX_AGE", 6 * 3600))
+}
+
+# Keys of a get_playlist_stats() result stored in each field group
+FIELD_KEYS = {
+    "header": ("title", "channel", "url", "video_count", "_video_count",
+               "direct_view_count", "direct_view_count_formatted"),
+    "durations": ("_avg_duration_minutes", "_total_duration_minutes",
+                  "duration_confidence", "duration_sample_size"),
+    "first_video": ("videos",)
+}
+
+
+class PlaylistStatsStore:
+    """
+    SQLite-backed playlist stats, one row per (playlist ID, field group)
+
+    Thread-safe: the evaluation threads of find_best_playlist read and write concurrently.
+    """
+
+    def __init__(self, path=PLAYLIST_STATS_STORE_PATH, max_age=None):
+        self.path = path
+        self.max_age = dict(FIELD_MAX_AGE, **(max_age or {}))
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self.hits = 0
+        self.misses = 0
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS playlist_stats (
+                    playlist_id TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (playlist_id, field)
+                )
+                """
+            )
+
+    def get(self, playlist_id, now=None):
+        """
+        Return every stored field group of a playlist and whether it is still fresh
+
+        Returns:
+            dict: {field: {"value": {...}, "fetched_at": timestamp, "fresh": bool}}
+        """
+        if now is None:
+            now = time.time()
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT field, value, fetched_at FROM playlist_stats WHERE playlist_id = ?", (playlist_id,)
+            ).fetchall()
+
+        entries = {}
+        for field, value, fetched_at in rows:
+            if field in self.max_age:
+                entries[field] = {
+                    "value": json.loads(value),
+                    "fetched_at": fetched_at,
+                    "fresh": now - fetched_at <= self.max_age[field]
+                }
+
+        fresh_count = sum(1 for entry in entries.values() if entry["fresh"])
+        with self._lock:
+            self.hits += fresh_count
+            self.misses += len(FIELD_KEYS) - fresh_count
+        return entries
+
+    def put(self, playlist_id, fields, now=None):
+        """
+        Store field groups for a playlist, stamping them with the current time
+
+        Args:
+            playlist_id: YouTube playlist ID
+            fields: {field: value dict} for the groups that were fetched
+        """
+        if now is None:
+            now = time.time()
+
+        rows = [(playlist_id, field, json.dumps(value), now) for field, value in fields.items()]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO playlist_stats VALUES (?, ?, ?, ?)", rows
+            )
+
+    def put_playlist(self, playlist, fields=None, now=None):
+        """Store the field groups of a get_playlist_stats() result (all of them unless fields is given)"""
+        fields = fields or FIELD_KEYS
+        self.put(playlist["id"], {
+            field: {key: playlist[key] for key in FIELD_KEYS[field] if key in playlist}
+            for field in fields
+        }, now)
+
+    def delete(self, playlist_id):
+        """Forget everything stored for a playlist"""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM playlist_stats WHERE playlist_id = ?", (playlist_id,))
+
+    def stats(self):
+        """Return field hit/miss counters and the number of stored playlists"""
+        with self._lock:
+            size = self._connection.execute(
+                "SELECT COUNT(DISTINCT playlist_id) FROM playlist_stats"
+            ).fetchone()[0]
+            return {
+                "size": size,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+def playlist_from_fields(playlist_id, fields):
+    """
+    Rebuild a get_playlist_stats()-shaped dict from stored field groups
+
+    Args:
+        playlist_id: YouTube playlist ID
+        fields: Result of PlaylistStatsStore.get() containing every field group
+    """
+    playlist = {"id": playlist_id, "videos_loaded": False}
+    for entry in fields.values():
+        playlist.update(entry["value"])
+    # Stored titles were normalized before they were saved
+    return NormalizedDict(playlist)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_playlist_stats_store():
+    """Return the shared store, opening it on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PlaylistStatsStore()
+        return _store
@@ -0,0 +1,408 @@
+"""
+Pre-warming of best-playlist results for popular topics.
+
+Most /find/best-playlist traffic asks for the same few hundred topics, yet every request
+runs a full search against YouTube. Results are now kept in a store shared by the API
+and this module, together with how often each topic is asked for (a request count that
+halves every PREWARM_HALF_LIFE seconds). The scheduler recomputes the hottest topics
+whose result is missing or getting old, only during off-peak hours (PREWARM_HOURS) and
+at most PREWARM_SEARCHES_PER_HOUR searches per hour, so user requests for popular
+topics are answered from the store. A topic whose search fails or finds nothing is
+retried after PREWARM_RETRY_AFTER seconds, doubling with every further failure, so it
+does not use up the budget night after night.
+
+The scheduler runs inside the API process when PREWARM_ENABLED=true, or from the
+command line (e.g. from cron at night):
+
+    python prewarm.py --list
+    python prewarm.py --top 50 --max-searches 20
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from usage_meter import usage_labels
+
+PREWARM_STORE_PATH = os.environ.get(
+    "PREWARM_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "prewarm.db")
+)
+
+# Stored results are served for this long, and refreshed once they are older than PREWARM_REFRESH_AGE
+BEST_PLAYLIST_CACHE_TTL = int(os.environ.get("BEST_PLAYLIST_CACHE_TTL", 86400))
+PREWARM_REFRESH_AGE = int(os.environ.get("PREWARM_REFRESH_AGE", 64800))
+
+PREWARM_ENABLED = os.environ.get("PREWARM_ENABLED", "false").lower() == "true"
+# Number of hottest topics kept warm, and the popularity a topic needs to count at all
+PREWARM_TOP_N = int(os.environ.get("PREWARM_TOP_N", 100))
+PREWARM_MIN_SCORE = float(os.environ.get("PREWARM_MIN_SCORE", 2.0))
+# Local hours in which refreshes may run, "start-end" with end exclusive ("22-6" wraps midnight, "*" always)
+PREWARM_HOURS = os.environ.get("PREWARM_HOURS", "1-6")
+PREWARM_SEARCHES_PER_HOUR = float(os.environ.get("PREWARM_SEARCHES_PER_HOUR", 20))
+PREWARM_HALF_LIFE = float(os.environ.get("PREWARM_HALF_LIFE", 7 * 86400))
+# Wait after a failed or empty search, doubled per consecutive failure up to PREWARM_RETRY_MAX
+PREWARM_RETRY_AFTER = float(os.environ.get("PREWARM_RETRY_AFTER", 3600))
+PREWARM_RETRY_MAX = float(os.environ.get("PREWARM_RETRY_MAX", 7 * 86400))
+
+# Seconds between checks for due topics when there is nothing to do
+PREWARM_IDLE_SECONDS = 600
+
+# Result fields that describe the search that produced them, not stored with the result
+PER_REQUEST_FIELDS = ("upstream_calls",)
+
+
+def normalize_query(query):
+    """Key of a query: lowercased, whitespace collapsed"""
+    return " ".join(query.split()).lower()
+
+
+def retry_delay(failures, base=PREWARM_RETRY_AFTER, maximum=PREWARM_RETRY_MAX):
+    """Seconds to wait before searching a topic again after this many consecutive failures"""
+    if failures <= 0:
+        return 0.0
+    return min(maximum, base * 2 ** min(failures - 1, 32))
+
+
+def in_hours(spec, hour):
+    """Whether an hour (0-23) falls in a PREWARM_HOURS window"""
+    spec = spec.strip()
+    if spec in ("", "*"):
+        return True
+    start, end = (int(part) for part in spec.split("-"))
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+class PrewarmStore:
+    """
+    SQLite-backed topic popularity and best-playlist results, keyed by normalized query
+
+    Thread-safe, and safe to share between the API process and the command line.
+    """
+
+    def __init__(self, path=PREWARM_STORE_PATH, half_life=PREWARM_HALF_LIFE):
+        self.path = path
+        self.half_life = half_life
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_stats (
+                    query TEXT PRIMARY KEY,
+                    display TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    requests INTEGER NOT NULL,
+                    last_requested REAL NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    query TEXT PRIMARY KEY,
+                    config_version TEXT,
+                    result TEXT NOT NULL,
+                    computed_at REAL NOT NULL
+                )
+                """
+            )
+            # Consecutive failed or empty pre-warm searches per topic, cleared by a success
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS failed_attempts (
+                    query TEXT PRIMARY KEY,
+                    failures INTEGER NOT NULL,
+                    last_attempt REAL NOT NULL,
+                    error TEXT
+                )
+                """
+            )
+
+    def _decayed(self, score, since, now):
+        return score * 0.5 ** (max(0.0, now - since) / self.half_life)
+
+    def record_request(self, query):
+        """Count a request for a topic"""
+        key = normalize_query(query)
+        if not key:
+            return
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT display, score, requests, last_requested FROM query_stats WHERE query = ?", (key,)
+            ).fetchone()
+            if row:
+                display, score, requests = row[0], self._decayed(row[1], row[3], now) + 1, row[2] + 1
+            else:
+                display, score, requests = " ".join(query.split()), 1.0, 1
+            self._connection.execute(
+                "INSERT OR REPLACE INTO query_stats VALUES (?, ?, ?, ?, ?)",
+                (key, display, score, requests, now)
+            )
+
+    def get_result(self, query, config_version, max_age=BEST_PLAYLIST_CACHE_TTL):
+        """Return the stored result of a topic if it was computed under config_version within max_age seconds"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT config_version, result, computed_at FROM results WHERE query = ?", (normalize_query(query),)
+            ).fetchone()
+        if row is None or row[0] != config_version or time.time() - row[2] > max_age:
+            return None
+        return json.loads(row[1])
+
+    def put_result(self, query, config_version, result):
+        """Store a result, without the PER_REQUEST_FIELDS that only describe the search itself"""
+        result = {key: value for key, value in result.items() if key not in PER_REQUEST_FIELDS}
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (normalize_query(query), config_version, json.dumps(result, default=str), time.time())
+            )
+
+    def record_attempt(self, query, error=None):
+        """Record the outcome of a pre-warm search: clears the failures on success, counts one otherwise"""
+        key = normalize_query(query)
+        with self._lock, self._connection:
+            if error is None:
+                self._connection.execute("DELETE FROM failed_attempts WHERE query = ?", (key,))
+                return
+            self._connection.execute(
+                """
+                INSERT INTO failed_attempts VALUES (?, 1, ?, ?)
+                ON CONFLICT (query) DO UPDATE SET
+                    failures = failures + 1, last_attempt = excluded.last_attempt, error = excluded.error
+                """,
+                (key, time.time(), str(error)[:200])
+            )
+
+    def hot_queries(self, limit=PREWARM_TOP_N, min_score=0.0):
+        """
+        Most requested topics by current (decayed) score
+
+        Returns:
+            list: [{"query", "score", "requests", "last_requested", "computed_at", "config_version",
+                    "failures", "last_attempt", "last_error"}, ...]
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._connection.execute(
+                """
+                SELECT s.display, s.score, s.requests, s.last_requested, r.computed_at, r.config_version,
+                       COALESCE(a.failures, 0), a.last_attempt, a.error
+                FROM query_stats s
+                LEFT JOIN results r ON r.query = s.query
+                LEFT JOIN failed_attempts a ON a.query = s.query
+                """
+            ).fetchall()
+
+        topics = [
+            {
+                "query": display,
+                "score": round(self._decayed(score, last_requested, now), 3),
+                "requests": requests,
+                "last_requested": last_requested,
+                "computed_at": computed_at,
+                "config_version": config_version,
+                "failures": failures,
+                "last_attempt": last_attempt,
+                "last_error": last_error
+            }
+            for (display, score, requests, last_requested, computed_at, config_version,
+                 failures, last_attempt, last_error) in rows
+        ]
+        topics = [topic for topic in topics if topic["score"] >= min_score]
+        topics.sort(key=lambda topic: -topic["score"])
+        return topics[:limit]
+
+    def prune(self, min_score=0.01):
+        """Forget topics whose score has decayed below min_score, and results older than the cache TTL"""
+        now = time.time()
+        with self._lock, self._connection:
+            rows = self._connection.execute("SELECT query, score, last_requested FROM query_stats").fetchall()
+            stale = [(query,) for query, score, last in rows if self._decayed(score, last, now) < min_score]
+            self._connection.executemany("DELETE FROM query_stats WHERE query = ?", stale)
+            self._connection.executemany("DELETE FROM failed_attempts WHERE query = ?", stale)
+            self._connection.execute("DELETE FROM results WHERE computed_at < ?", (now - BEST_PLAYLIST_CACHE_TTL,))
+
+
+class PrewarmScheduler:
+    """
+    Refreshes the stored results of the hottest topics under a rate budget
+
+    Args:
+        store: PrewarmStore to read popularity from and write results to
+        search: Callable(query) returning a find_best_playlist result (or None)
+        config_version: Scoring config version the results are stored under
+    """
+
+    def __init__(self, store, search, config_version, top_n=PREWARM_TOP_N, refresh_age=PREWARM_REFRESH_AGE,
+                 hours=PREWARM_HOURS, searches_per_hour=PREWARM_SEARCHES_PER_HOUR):
+        self.store = store
+        self.search = search
+        self.config_version = config_version
+        self.top_n = top_n
+        self.refresh_age = refresh_age
+        self.hours = hours
+        self.interval = 3600.0 / searches_per_hour if searches_per_hour > 0 else 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_search = 0.0
+        self.searches = 0
+        self.failures = 0
+
+    def due(self):
+        """
+        Hot topics without a result under the current config, or with one older than refresh_age
+
+        Topics whose last searches failed or found nothing wait for their retry_delay first.
+        """
+        now = time.time()
+        return [
+            topic for topic in self.store.hot_queries(self.top_n, min_score=PREWARM_MIN_SCORE)
+            if (topic["computed_at"] is None
+                or topic["config_version"] != self.config_version
+                or now - topic["computed_at"] > self.refresh_age)
+            and (not topic["failures"] or now - topic["last_attempt"] >= retry_delay(topic["failures"]))
+        ]
+
+    def off_peak(self):
+        return in_hours(self.hours, datetime.now().hour)
+
+    def run_once(self, max_searches=None, respect_hours=True):
+        """
+        Refresh due topics, hottest first, spacing searches by the rate budget
+
+        Args:
+            max_searches: Stop after this many searches
+            respect_hours: Stop once outside the off-peak window
+
+        Returns:
+            list: {"query", "seconds", "found"} or {"query", "error"} per search
+        """
+        report = []
+        for topic in self.due():
+            if self._stop.is_set() or (max_searches is not None and len(report) >= max_searches):
+                break
+            # Wait for the budget; the window is checked afterwards since the wait can be long
+            if self._stop.wait(max(0.0, self._last_search + self.interval - time.time())):
+                break
+            if respect_hours and not self.off_peak():
+                break
+
+            self._last_search = time.time()
+            self.searches += 1
+            try:
+                with usage_labels(endpoint="prewarm"):
+                    result = self.search(topic["query"])
+            except Exception as e:
+                self.failures += 1
+                print(f"Pre-warming '{topic['query']}' failed: {e}")
+                self.store.record_attempt(topic["query"], error=e)
+                report.append({"query": topic["query"], "error": str(e)})
+                continue
+
+            if result:
+                self.store.put_result(topic["query"], self.config_version, result)
+                self.store.record_attempt(topic["query"])
+            else:
+                self.store.record_attempt(topic["query"], error="No suitable playlist found")
+            report.append({
+                "query": topic["query"],
+                "seconds": round(time.time() - self._last_search, 1),
+                "found": bool(result)
+            })
+
+        self.store.prune()
+        return report
+
+    def _loop(self):
+        while not self._stop.is_set():
+            report = self.run_once() if self.off_peak() else []
+            if report:
+                print(f"Pre-warmed {len(report)} topics")
+            else:
+                self._stop.wait(PREWARM_IDLE_SECONDS)
+
+    def start(self):
+        """Run the scheduler in a daemon thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="prewarm", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def status(self):
+        """Scheduler settings and the hot topics with the age of their stored result"""
+        now = time.time()
+        due = {topic["query"] for topic in self.due()}
+        return {
+            "running": self._thread is not None,
+            "hours": self.hours,
+            "off_peak": self.off_peak(),
+            "searches_per_hour": round(3600.0 / self.interval, 2) if self.interval else None,
+            "searches": self.searches,
+            "failures": self.failures,
+            "topics": [
+                {
+                    **topic,
+                    "result_age_seconds": round(now - topic["computed_at"]) if topic["computed_at"] else None,
+                    "retry_in_seconds": max(0, round(topic["last_attempt"] + retry_delay(topic["failures"]) - now))
+                    if topic["failures"] else None,
+                    "due": topic["query"] in due
+                }
+                for topic in self.store.hot_queries(self.top_n)
+            ]
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_prewarm_store():
+    """Return the shared store, opening it on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PrewarmStore()
+        return _store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Refresh stored best-playlist results for the most requested topics")
+    parser.add_argument("--top", type=int, default=PREWARM_TOP_N, help="Number of hottest topics to keep warm")
+    parser.add_argument("--max-searches", type=int, help="Stop after this many searches")
+    parser.add_argument("--off-peak-only", action="store_true", help="Only run inside PREWARM_HOURS")
+    parser.add_argument("--list", action="store_true", help="Only list the hot topics and their result ages")
+    args = parser.parse_args()
+
+    from playlist_scorer import SCORING_CONFIG
+
+    def search(query):
+        # Imported here so --list works without the search dependencies. Results are cleaned
+        # by the same pipeline as the API's, since the API serves them from the store as they are
+        from Youtube import CleaningPlaylistPipeline, find_best_playlist
+        return find_best_playlist(query, pipeline=CleaningPlaylistPipeline())
+
+    scheduler = PrewarmScheduler(get_prewarm_store(), search, SCORING_CONFIG["version"], top_n=args.top)
+    if args.list:
+        for topic in scheduler.status()["topics"]:
+            age = topic["result_age_seconds"]
+            retry = f"  ({topic['failures']} failed, retry in {topic['retry_in_seconds'] / 3600:.1f}h)" \
+                if topic["failures"] and not topic["due"] else ""
+            print(f"{topic['score']:8.2f}  {topic['query']:<40} "
+                  f"{'no result' if age is None else f'{age / 3600:.1f}h old'}{'  (due)' if topic['due'] else ''}{retry}")
+    else:
+        for item in scheduler.run_once(max_searches=args.max_searches, respect_hours=args.off_peak_only):
+            print(item)
@@ -0,0 +1,107 @@
+"""
+Compact video and playlist records used while fetching playlists.
+
+A playlist can hold up to 500 videos, and each one used to be a dict with a nested
+channel dict and a derived link string. These records keep only the fields that are
+needed in __slots__ (no per-instance __dict__) and are converted to the JSON-ready dict
+structure with to_dict() only when a result leaves the fetching code.
+"""
+
+import math
+
+from duration_parser import parse_durations
+from title_normalizer import NormalizedDict, normalize_title
+
+
+class VideoRecord:
+    """One playlist video"""
+
+    __slots__ = ("id", "title", "channel", "duration", "publish_date", "thumbnail")
+
+    def __init__(self, id, title="Unknown", channel="Unknown Channel", duration="Unknown", publish_date="Unknown",
+                 thumbnail=None):
+        self.id = id
+        self.title = title
+        self.channel = channel
+        self.duration = duration
+        self.publish_date = publish_date
+        # Only the yt-dlp fallback knows it
+        self.thumbnail = thumbnail
+
+    @classmethod
+    def from_entry(cls, entry):
+        """Build a record from a parsed video dict, normalizing the title at ingestion"""
+        channel = entry.get("channel", {})
+        if isinstance(channel, dict):
+            channel = channel.get("name", "Unknown Channel")
+
+        return cls(
+            entry.get("id", ""),
+            normalize_title(entry.get("title", "Unknown")),
+            channel,
+            entry.get("duration", "Unknown"),
+            entry.get("publish_date", "Unknown"),
+            entry.get("thumbnail") or None
+        )
+
+    @property
+    def url(self):
+        return f"https://www.youtube.com/watch?v={self.id}"
+
+    def to_dict(self):
+        """Convert to the playlist video structure returned by the API"""
+        video = NormalizedDict({
+            "id": self.id,
+            "title": self.title,
+            "channel": {"name": self.channel},
+            "duration": self.duration,
+            "url": self.url,
+            "publish_date": self.publish_date
+        })
+        if self.thumbnail:
+            video["thumbnail"] = self.thumbnail
+        return video
+
+    def __repr__(self):
+        return f"VideoRecord(id={self.id!r}, title={self.title!r})"
+
+
+class PlaylistRecord:
+    """A playlist and its videos"""
+
+    __slots__ = ("id", "title", "channel", "url", "videos", "source")
+
+    def __init__(self, id, title="Unknown Playlist", channel="Unknown Channel", videos=None, source="custom_playlist"):
+        self.id = id
+        self.title = normalize_title(title) if title else "Unknown Playlist"
+        self.channel = channel
+        self.url = f"https://www.youtube.com/playlist?list={id}"
+        self.videos = videos if videos is not None else []
+        self.source = source
+
+    def to_dict(self):
+        """
+        Convert to the playlist structure returned by get_playlist_videos
+
+        The durations of all videos are parsed together and added as "duration_seconds"
+        where known, so scoring and clients do not have to fetch them per video.
+        """
+        videos = []
+        for video, seconds in zip(self.videos, parse_durations([video.duration for video in self.videos])):
+            video_dict = video.to_dict()
+            if not math.isnan(seconds):
+                video_dict["duration_seconds"] = int(seconds)
+            videos.append(video_dict)
+
+        return NormalizedDict({
+            "id": self.id,
+            "title": self.title,
+            "channel": {"name": self.channel},
+            "url": self.url,
+            "videos": videos,
+            "video_count": len(self.videos),
+            "source": self.source
+        })
+
+    def __repr__(self):
+        return f"PlaylistRecord(id={self.id!r}, title={self.title!r}, videos={len(self.videos)})"
@@ -6,13 +6,18 @@ import os
 import json
 import re
 import logging
-import requests
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Dict, List, Any, Optional
 import traceback
-import time
+import asyncio
+import functools
+from repetition_collapser import collapse_repetitions
+from ttl_cache import TTLCache
+from usage_meter import get_usage_meter, usage_labels
+from groq_client import GROQ_API_URL, get_groq_client, close_groq_client
+from llm_providers import LLMRequest, ProviderError, get_router, providers_stats, register_local_handler
 
 # Configure logging
 logging.basicConfig(
@@ -40,7 +45,16 @@ app.add_middleware(
 # Load environment variables
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
 GROQ_MODEL = os.environ.get("GROQ_MODEL", "llama-3.3-70b-versatile")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+# LLM relevance results per (prompt version, model, technology, title)
+RELEVANCE_CACHE_TTL = int(os.environ.get("RELEVANCE_CACHE_TTL", 6 * 3600))
+RELEVANCE_CACHE = TTLCache(ttl=RELEVANCE_CACHE_TTL, max_size=20000)
+
+# Chunking of large batches: prompt plus expected output tokens per LLM call
+LLM_CHUNK_TOKEN_BUDGET = int(os.environ.get("LLM_CHUNK_TOKEN_BUDGET", 3000))
+LLM_OUTPUT_TOKENS_PER_TITLE = int(os.environ.get("LLM_OUTPUT_TOKENS_PER_TITLE", 30))
+LLM_MAX_TITLES_PER_CHUNK = int(os.environ.get("LLM_MAX_TITLES_PER_CHUNK", 25))
+CHARS_PER_TOKEN = 4
 
 # Try to reload environment variables if not found
 if not GROQ_API_KEY:
@@ -104,26 +118,7 @@ def preprocess_title(title: str, max_length: int = 200) -> str:
     title = re.sub(r'\s+', ' ', title).strip()
     
     # Handle repetitive patterns (3 or more repetitions)
-    # This regex finds patterns of 3+ words that repeat
-    repetition_pattern = r'(\b[\w\s]{5,50}\b)(\s+\1){2,}'
-    
-    # Keep checking for repetitions until no more are found
-    prev_title = ""
-    current_title = title
-    
-    while prev_title != current_title:
-        prev_title = current_title
-        
-        # Find repetitive patterns
-        match = re.search(repetition_pattern, current_title, re.IGNORECASE)
-        if match:
-            # Get the repeating pattern
-            pattern = match.group(1)
-            # Replace multiple repetitions with just one instance
-            replacement = pattern
-            # Create a regex that matches 2 or more repetitions of this exact pattern
-            exact_pattern = re.escape(pattern) + r'(\s+' + re.escape(pattern) + r'){1,}'
-            current_title = re.sub(exact_pattern, replacement, current_title, flags=re.IGNORECASE)
+    current_title = collapse_repetitions(title)
     
     # Truncate if still too long
     if len(current_title) > max_length:
@@ -192,37 +187,16 @@ def prepare_examples_for_technology(tech):
     
     return tech_good_examples, tech_bad_examples
 
-def create_batch_prompt(titles, technology):
-    """Create a prompt for batch processing of titles"""
-    # Preprocess titles to handle repetition and excessive length
-    processed_titles = preprocess_titles(titles)
-    
-    # Log if any titles were modified
-    for i, (original, processed) in enumerate(zip(titles, processed_titles)):
-        if original != processed:
-            logger.info(f"Title {i+1} preprocessed: {len(original)} chars -> {len(processed)} chars")
-            if len(original) > 100:
-                logger.info(f"Original (truncated): {original[:50]}...{original[-50:]}")
-                logger.info(f"Processed: {processed}")
-            else:
-                logger.info(f"Original: {original}")
-                logger.info(f"Processed: {processed}")
-    
-    good_examples, bad_examples = prepare_examples_for_technology(technology)
-    
-    # Select a subset of examples to keep the prompt size manageable
-    good_examples_subset = good_examples[:10]
-    bad_examples_subset = bad_examples[:10]
-    
-    prompt = f"""You are evaluating whether YouTube playlist titles are relevant educational content for learning a specific technology.
-
-Technology: {technology}
+# Version of the relevance prompt template and response protocol. Part of every relevance
+# cache key, so bump it whenever the prompt or its interpretation changes.
+PROMPT_VERSION = "3"
 
-Here are examples of good educational titles for {technology}:
-{json.dumps(good_examples_subset, indent=2)}
+# Line before the numbered titles in a batch prompt
+TITLES_MARKER = "Titles to evaluate (index: title):"
 
-Here are examples of non-educational titles:
-{json.dumps(bad_examples_subset, indent=2)}
+# Instructions shared by every technology. They come first so that all relevance prompts
+# start with the same text and provider-side prefix caching can apply.
+STATIC_PROMPT_PREFIX = """You are evaluating whether YouTube playlist titles are relevant educational content for learning a specific technology (the target technology, given after these instructions).
 
 IMPORTANT GUIDELINES:
 1. Educational content should focus on teaching the technology, not just mentioning it.
@@ -237,8 +211,8 @@ IMPORTANT GUIDELINES:
 STRICT RELEVANCE RULES:
 1. The title MUST contain the SPECIFIC technology/topic name or a common abbreviation.
 2. General web development courses are NOT relevant for specific topics like CSS, JavaScript, React, etc.
-3. For a {technology} query, the playlist should be specifically about {technology}, not general web development.
-4. Be STRICT - only accept playlists that are clearly focused on {technology}.
+3. The playlist should be specifically about the target technology, not general web development.
+4. Be STRICT - only accept playlists that are clearly focused on the target technology.
 5. REJECT ALL social media style short-form content such as:
    - Videos with "#shorts", "#viral", "#trending", "#fyp" hashtags
    - Videos with multiple hashtags (3 or more)
@@ -265,127 +239,169 @@ For EVERY title, you MUST extract ALL technology names mentioned. For each title
 5. Tools (Docker, Git, AWS, Azure, etc.)
 6. Languages (C#, Java, etc.)
 
-MAKE SURE to normalize technology names in the "technologies" field:
+MAKE SURE to normalize technology names in the "t" field:
 - Use "node.js" instead of "node", "nodejs" or "node js"
 - Use "javascript" instead of "js"
 - Use "typescript" instead of "ts"
 - Use "react" instead of "reactjs"
 - Use "mongodb" instead of "mongo"
 
-Please evaluate each of the following titles and determine if they are relevant educational content for learning {technology}.
-For each title, provide:
-1. A boolean "isRelevant" (true/false)
-2. A confidence score "similarity" (0.0 to 1.0)
-3. A brief "explanation" of your decision
-4. An array of extracted technologies in the "technologies" field - THIS IS REQUIRED FOR EVERY TITLE
+RESPONSE FORMAT:
+Respond with a JSON object {"r": [...]} holding one entry per numbered title, in index order, with these short keys:
+- "i": the title's index
+- "ok": 1 if relevant, 0 if not
+- "s": confidence score (0.0 to 1.0)
+- "t": array of extracted technologies - REQUIRED, use [] if there are none
+- "e": reason in at most 8 words
+Do NOT repeat the titles in the response.
+"""
 
-Titles to evaluate:
-{json.dumps(processed_titles, indent=2)}
+@functools.lru_cache(maxsize=256)
+def prompt_prefix(technology: str) -> str:
+    """
+    Everything in a batch prompt before the numbered titles, built once per technology
+    
+    The static instructions come first, then the technology and its examples, so only the
+    titles differ between calls for the same technology.
+    """
+    good_examples, bad_examples = prepare_examples_for_technology(technology)
+    
+    # Select a subset of examples to keep the prompt size manageable
+    good_lines = "\n".join(f"- {example}" for example in good_examples[:10])
+    bad_lines = "\n".join(f"- {example}" for example in bad_examples[:10])
+    
+    return f"""{STATIC_PROMPT_PREFIX}
+Technology: {technology}
 
-Respond with a JSON array where each element is an object with "title", "isRelevant", "similarity", "explanation", and "technologies" fields.
-The "technologies" field MUST be included for every title, even if it's an empty array.
-"""
+Examples of good educational titles for {technology}:
+{good_lines}
 
-    return prompt
+Examples of non-educational titles:
+{bad_lines}
 
-def call_groq_api(prompt):
-    """Call the Groq LLM API with the given prompt"""
-    if not GROQ_API_KEY:
-        logger.error("GROQ_API_KEY is not set")
-        # Instead of raising an error, return a structured response indicating the error
-        return {
-            "error": "GROQ_API_KEY is not set",
-            "results": []
-        }
-    
-    logger.info(f"Calling Groq API with model: {GROQ_MODEL}")
+Evaluate each of the following numbered titles: is it relevant educational content for learning {technology}?
+
+{TITLES_MARKER}
+"""
+
+def create_batch_prompt(titles, technology):
+    """
+    Create a prompt for batch processing of titles
     
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
+    Titles are numbered and the model answers {"r": [{"i", "ok", "s", "t", "e"}, ...]} per
+    index (see expand_compact_result), which keeps the output short and maps back exactly.
+    Only the title lines are built per call; the rest comes from prompt_prefix.
+    """
+    # Titles are referenced by index in the response, so the model never has to echo them
+    numbered_titles = "\n".join(
+        f"{i}: {json.dumps(title, ensure_ascii=False)}" for i, title in enumerate(titles)
+    )
+    return prompt_prefix(technology) + numbered_titles + "\n"
+
+def _llm_results(answer):
+    """Extract the result list from a backend's JSON answer"""
+    # Compact results are expected under "r"; also accept a bare list or "results"
+    if isinstance(answer, list):
+        return answer
+    if isinstance(answer, dict):
+        for key in ("r", "results"):
+            if isinstance(answer.get(key), list):
+                return answer[key]
+    
+    logger.warning("No result list found in LLM answer")
+    return []
+
+def _relevance_request(chunk: List[str], technology: str) -> LLMRequest:
+    return LLMRequest("relevance", create_batch_prompt(chunk, technology),
+                      {"titles": chunk, "technology": technology})
+
+def _relevance_response(answer, provider) -> Dict[str, Any]:
+    """Response of a backend in the shape _batch_relevance_results expects"""
+    results = _llm_results(answer)
+    logger.info(f"Relevance backend '{provider.name}' answered with {len(results)} results")
+    return {"results": results, "provider": provider.name, "model": provider.model, "cacheable": provider.cacheable}
+
+def _relevance_error(error) -> Dict[str, Any]:
+    """Structured response when no backend answered (the caller falls back to the rule-based check)"""
+    logger.warning(f"No relevance backend answered: {error}")
+    return {
+        "error": str(error),
+        "results": []
     }
+
+def call_relevance_llm(chunks: List[List[str]], technology: str) -> List[Dict[str, Any]]:
+    """
+    Ask the relevance backends (see llm_providers) about every chunk concurrently
     
-    data = {
-        "model": GROQ_MODEL,
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.1,  # Low temperature for more consistent results
-        "response_format": {"type": "json_object"}
-    }
+    Blocks the calling thread only, until every chunk has an answer or has failed.
     
-    logger.info(f"API request data: {json.dumps(data, indent=2)}")
+    Returns:
+        list: One {"results", "provider", "cacheable"} or {"error", "results"} per chunk, in order
+    """
+    router = get_router("relevance")
+    futures = [router.submit(_relevance_request(chunk, technology)) for chunk in chunks]
     
-    try:
-        logger.info(f"Sending request to Groq API: {GROQ_API_URL}")
-        response = requests.post(GROQ_API_URL, headers=headers, json=data)
-        
-        # Log the raw response
-        logger.info(f"Groq API response status: {response.status_code}")
-        logger.info(f"Groq API response headers: {response.headers}")
-        
-        # Check for errors
-        if response.status_code != 200:
-            logger.error(f"Groq API error: {response.status_code} - {response.text}")
-            return {
-                "error": f"Groq API returned error: {response.status_code}",
-                "results": []
-            }
-        
-        result = response.json()
-        logger.info(f"Groq API result structure: {list(result.keys())}")
-        
-        content = result.get("choices", [{}])[0].get("message", {}).get("content", "{}")
-        logger.info(f"Extracted content: {content[:100]}...")
-        
-        # Parse the JSON response
+    responses = []
+    for future in futures:
         try:
-            parsed_result = json.loads(content)
-            logger.info(f"Successfully parsed JSON response with keys: {list(parsed_result.keys())}")
-            
-            # Check if the response has the expected structure
-            if "results" not in parsed_result:
-                # Try to adapt the response format
-                if isinstance(parsed_result, list):
-                    # If it's a list, assume it's a list of results
-                    return {"results": parsed_result}
-                elif isinstance(parsed_result, dict):
-                    # Check for evaluations key (from Groq API)
-                    if "evaluations" in parsed_result:
-                        logger.info(f"Found 'evaluations' key in response with {len(parsed_result['evaluations'])} items")
-                        return {"results": parsed_result["evaluations"]}
-                    # If it's a dict but missing 'results', create a results list
-                    elif any(key in parsed_result for key in ["isRelevant", "title", "similarity"]):
-                        # It looks like a single result
-                        return {"results": [parsed_result]}
-                    else:
-                        # Create an empty results list
-                        parsed_result["results"] = []
-                
-            return parsed_result
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON response: {content}")
-            logger.error(f"JSON parse error: {e}")
-            
-            # Return an empty result instead of raising an error
-            return {
-                "error": f"Invalid JSON response from Groq API: {e}",
-                "results": []
-            }
-    
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error calling Groq API: {e}")
-        
-        # Return an empty result instead of raising an error
-        return {
-            "error": f"Error calling Groq API: {e}",
-            "results": []
-        }
+            responses.append(_relevance_response(*future.result()))
+        except ProviderError as e:
+            responses.append(_relevance_error(e))
+    return responses
 
-def check_relevance(title: str, technology: str) -> Dict[str, Any]:
-    """Check if a title is relevant to a technology using Groq LLM"""
-    # Use batch processing with a single title
-    batch_result = check_batch_relevance([title], technology)
+async def async_call_relevance_llm(chunks: List[List[str]], technology: str) -> List[Dict[str, Any]]:
+    """call_relevance_llm for async code, without blocking the event loop"""
+    router = get_router("relevance")
+    
+    async def ask(chunk):
+        try:
+            return _relevance_response(*await router.run_async(_relevance_request(chunk, technology)))
+        except ProviderError as e:
+            return _relevance_error(e)
+    
+    return list(await asyncio.gather(*(ask(chunk) for chunk in chunks)))
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a prompt (about 4 characters per token for English text)"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def chunk_titles(titles: List[str], technology: str, token_budget: int = None) -> List[List[str]]:
+    """
+    Split titles into chunks whose prompt and expected answer fit the token budget
+    
+    Args:
+        titles: Preprocessed titles
+        technology: Technology the titles are checked against (its examples are part of every prompt)
+        token_budget: Prompt plus output tokens per chunk (defaults to LLM_CHUNK_TOKEN_BUDGET)
     
+    Returns:
+        list: Consecutive chunks of titles, in order
+    """
+    if token_budget is None:
+        token_budget = LLM_CHUNK_TOKEN_BUDGET
+    
+    # Instructions and examples are repeated in every chunk
+    base_tokens = estimate_tokens(prompt_prefix(technology))
+    
+    chunks = []
+    current = []
+    current_tokens = base_tokens
+    for index, title in enumerate(titles):
+        # The numbered line in the prompt plus the compact result it produces
+        title_tokens = estimate_tokens(f"{index}: {json.dumps(title, ensure_ascii=False)}\n") + LLM_OUTPUT_TOKENS_PER_TITLE
+        if current and (current_tokens + title_tokens > token_budget or len(current) >= LLM_MAX_TITLES_PER_CHUNK):
+            chunks.append(current)
+            current = []
+            current_tokens = base_tokens
+        current.append(title)
+        current_tokens += title_tokens
+    
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _single_relevance_result(title: str, technology: str, batch_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Pick the result for a single title out of a batch result"""
     # Check if results exist and are not empty
     if not batch_result or "results" not in batch_result or not batch_result["results"]:
         # Fallback to simple rule-based approach if batch processing failed
@@ -408,66 +424,72 @@ def check_relevance(title: str, technology: str) -> Dict[str, Any]:
     # Return the first result if available
     return batch_result["results"][0]
 
-def check_batch_relevance(titles: List[str], technology: str) -> Dict[str, Any]:
-    """Check if multiple titles are relevant to a technology using Groq LLM (batch processing)"""
-    logger.info(f"Checking batch relevance for {len(titles)} titles with technology: '{technology}'")
+def check_relevance(title: str, technology: str) -> Dict[str, Any]:
+    """Check if a title is relevant to a technology using Groq LLM"""
+    # Use batch processing with a single title
+    return _single_relevance_result(title, technology, check_batch_relevance([title], technology))
+
+async def async_check_relevance(title: str, technology: str) -> Dict[str, Any]:
+    """check_relevance for async code"""
+    return _single_relevance_result(title, technology, await async_check_batch_relevance([title], technology))
+
+def expand_compact_result(title: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turn a compact per-index LLM result into a full relevance result
     
-    # Preprocess titles to handle repetition and excessive length before any processing
-    titles = preprocess_titles(titles)
+    Args:
+        title: The title at the result's index
+        item: {"i": index, "ok": 0/1, "s": similarity, "t": [technologies], "e": explanation}
+    """
+    try:
+        similarity = float(item.get("s", 0.5))
+    except (TypeError, ValueError):
+        similarity = 0.5
     
-    # Send all titles directly to LLM processing
-    filtered_titles = titles
-    title_to_index = {title: i for i, title in enumerate(titles)}
-    results = [None] * len(titles)
+    technologies = item.get("t") or []
+    if not isinstance(technologies, list):
+        technologies = [technologies]
     
-    logger.info(f"Sending all {len(filtered_titles)} titles for LLM processing")
+    return {
+        "title": title,
+        "isRelevant": bool(item.get("ok", False)),
+        "similarity": similarity,
+        "explanation": item.get("e") or "No explanation provided",
+        "technologies": [normalize_tech_name(str(tech)) for tech in technologies]
+    }
+
+def _result_index(item: Any, count: int) -> Optional[int]:
+    """Index a compact result refers to, or None if it is missing or out of range"""
+    if not isinstance(item, dict):
+        return None
+    index = item.get("i")
+    if isinstance(index, str) and index.strip().isdigit():
+        index = int(index)
+    if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < count:
+        return None
+    return index
+
+def _batch_relevance_results(titles: List[str], technology: str, api_response: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map an LLM response back onto the titles, using the rule-based check for any title it missed
+    
+    Args:
+        titles: Preprocessed titles that were sent to the LLM
+        technology: Technology the titles were checked against
+        api_response: One response of call_relevance_llm (None when no call was made)
+    """
+    if titles and (not api_response or "error" in api_response):
+        # Every backend failed or was skipped because its circuit is open
+        error = api_response.get("error") if api_response else "no response"
+        logger.warning(f"No LLM results ({error}), using rule-based approach for {len(titles)} titles")
+        return {"results": [rule_based_relevance_check(title, technology) for title in titles]}
+    
+    results = [None] * len(titles)
     
-    # If there are titles that need LLM processing
-    if filtered_titles:
+    # If there are titles that needed LLM processing
+    if titles:
         try:
-            # Create prompt for batch processing
-            prompt = create_batch_prompt(filtered_titles, technology)
-            logger.info(f"Created prompt for {len(filtered_titles)} titles")
-            
-            # Call Groq API with retries
-            max_retries = 3
-            retry_delay = 2  # seconds
-            api_response = None
-            
-            for retry in range(max_retries):
-                try:
-                    logger.info(f"Calling Groq API (attempt {retry+1}/{max_retries})...")
-                    api_response = call_groq_api(prompt)
-                    
-                    # Check if there was an error in the API call
-                    if "error" in api_response:
-                        logger.error(f"Error from Groq API: {api_response.get('error')}")
-                        # If this is the last retry, use fallback
-                        if retry == max_retries - 1:
-                            raise ValueError(f"API error after {max_retries} attempts: {api_response.get('error')}")
-                        # Otherwise wait and retry
-                        logger.info(f"Retrying in {retry_delay} seconds...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                        continue
-                    
-                    # If we got a successful response, break out of the retry loop
-                    break
-                except Exception as e:
-                    logger.error(f"Error in API call (attempt {retry+1}/{max_retries}): {e}")
-                    # If this is the last retry, re-raise the exception
-                    if retry == max_retries - 1:
-                        raise
-                    # Otherwise wait and retry
-                    logger.info(f"Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-            
-            # If we didn't get a response after all retries, use the rule-based fallback
-            if not api_response:
-                raise ValueError("Failed to get API response after all retries")
-            
-            logger.info(f"Received API response: {json.dumps(api_response, indent=2)[:500]}...")
+            logger.debug(f"Received API response: {json.dumps(api_response, indent=2)[:500]}...")
             
             # Process API response
             llm_results = api_response.get("results", [])
@@ -478,51 +500,129 @@ def check_batch_relevance(titles: List[str], technology: str) -> Dict[str, Any]:
                 logger.warning("No results returned from API, using rule-based fallback")
                 raise ValueError("No results returned from API")
             
-            # Map LLM results back to original title indices
+            # Map LLM results back to the titles strictly by index
             for llm_result in llm_results:
-                title = llm_result.get("title")
-                if title in title_to_index:
-                    idx = title_to_index[title]
-                    logger.info(f"Processing LLM result for title: '{title}' - isRelevant: {llm_result.get('isRelevant', False)}")
-                    results[idx] = {
-                        "title": title,
-                        "isRelevant": llm_result.get("isRelevant", False),
-                        "similarity": llm_result.get("similarity", 0.5),
-                        "explanation": llm_result.get("explanation", "No explanation provided"),
-                        "technologies": llm_result.get("technologies", [])
-                    }
-                else:
-                    logger.warning(f"Title in LLM result not found in original titles: '{title}'")
+                idx = _result_index(llm_result, len(titles))
+                if idx is None:
+                    logger.warning(f"LLM result without a valid index: {llm_result}")
+                elif results[idx] is None:
+                    results[idx] = expand_compact_result(titles[idx], llm_result)
+                    # Only LLM answers are cached, under the model that gave them; rule-based
+                    # ones are retried next time
+                    if api_response.get("cacheable", True) and api_response.get("model"):
+                        RELEVANCE_CACHE.set(
+                            relevance_cache_key(titles[idx], technology, api_response["model"]), results[idx]
+                        )
             
             # Check if any titles were missed
-            processed_titles = {r.get("title") for r in results if r is not None}
-            missing_titles = set(titles) - processed_titles
-            if missing_titles:
-                logger.warning(f"Some titles were not processed: {missing_titles}")
-                # Process missing titles with rule-based approach
-                for title in missing_titles:
-                    if title in title_to_index:
-                        idx = title_to_index[title]
-                        logger.info(f"Processing missing title with rule-based approach: '{title}'")
-                        rule_based_result = rule_based_relevance_check(title, technology)
-                        results[idx] = rule_based_result
+            missing = [idx for idx, result in enumerate(results) if result is None]
+            if missing:
+                logger.warning(f"No LLM result for title indices {missing}, using rule-based approach")
+                for idx in missing:
+                    results[idx] = rule_based_relevance_check(titles[idx], technology)
                 
         except Exception as e:
             logger.error(f"Error in LLM processing: {e}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             # Fall back to simple heuristic for all titles
-            logger.info(f"Falling back to rule-based approach for {len(filtered_titles)} titles")
-            for i, title in enumerate(filtered_titles):
-                idx = title_to_index.get(title, i)
-                rule_based_result = rule_based_relevance_check(title, technology)
-                results[idx] = rule_based_result
-    
-    # Filter out any None values (should not happen, but just in case)
-    results = [r for r in results if r is not None]
+            logger.info(f"Falling back to rule-based approach for {len(titles)} titles")
+            results = [rule_based_relevance_check(title, technology) for title in titles]
     
     logger.info(f"Final results: {len(results)} titles processed")
     return {"results": results}
 
+def relevance_cache_key(title: str, technology: str, model: str) -> tuple:
+    """
+    RELEVANCE_CACHE key of an LLM relevance result
+    
+    Includes PROMPT_VERSION and the model that answered, so answers given to an older
+    prompt template or by a model that is no longer configured are never served.
+    """
+    return (PROMPT_VERSION, model, technology.strip().lower(), title)
+
+def _cached_models() -> List[str]:
+    """Models of the cacheable relevance backends, in order of preference"""
+    return [
+        provider.model for provider in get_router("relevance").providers
+        if provider.cacheable and provider.model
+    ]
+
+def _merge_chunk_results(chunks: List[List[str]], technology: str, responses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Map each chunk's response onto its titles and concatenate the results in order"""
+    results = []
+    for chunk, api_response in zip(chunks, responses):
+        results.extend(_batch_relevance_results(chunk, technology, api_response)["results"])
+    return {"results": results}
+
+def _split_cached(titles: List[str], technology: str):
+    """
+    Look titles up in RELEVANCE_CACHE
+    
+    Returns:
+        tuple: (results with None for misses, distinct titles that still need the LLM)
+    """
+    models = _cached_models()
+    results = []
+    for title in titles:
+        cached = None
+        for model in models:
+            cached = RELEVANCE_CACHE.get(relevance_cache_key(title, technology, model))
+            if cached is not None:
+                break
+        # Callers may modify result dicts, so never hand out the cached one
+        results.append(dict(cached) if cached is not None else None)
+    missing = list(dict.fromkeys(title for title, result in zip(titles, results) if result is None))
+    get_usage_meter().record_cache(hits=len(titles) - len(missing), misses=len(missing))
+    return results, missing
+
+def _fill_missing(titles: List[str], results: List[Optional[Dict[str, Any]]], missing: List[str],
+                  merged: Dict[str, Any]) -> Dict[str, Any]:
+    """Put the LLM results for the missing titles into their places among the cached ones"""
+    by_title = dict(zip(missing, merged["results"]))
+    return {"results": [
+        result if result is not None else dict(by_title[title])
+        for title, result in zip(titles, results)
+    ]}
+
+def check_batch_relevance(titles: List[str], technology: str) -> Dict[str, Any]:
+    """
+    Check if multiple titles are relevant to a technology using the LLM backends (batch processing)
+    
+    Titles answered before under the same prompt version come from RELEVANCE_CACHE. The
+    rest are split into chunks by chunk_titles and the chunks are sent concurrently, so
+    latency follows the chunk size rather than the batch size.
+    """
+    logger.info(f"Checking batch relevance for {len(titles)} titles with technology: '{technology}'")
+    
+    # Preprocess titles to handle repetition and excessive length before any processing
+    titles = preprocess_titles(titles)
+    with usage_labels(technology=technology):
+        results, missing = _split_cached(titles, technology)
+        if not missing:
+            return {"results": results}
+        
+        chunks = chunk_titles(missing, technology)
+        logger.info(f"Sending {len(missing)} of {len(titles)} titles for LLM processing in {len(chunks)} chunks")
+        responses = call_relevance_llm(chunks, technology)
+    
+    return _fill_missing(titles, results, missing, _merge_chunk_results(chunks, technology, responses))
+
+async def async_check_batch_relevance(titles: List[str], technology: str) -> Dict[str, Any]:
+    """check_batch_relevance for async code: the LLM calls and their retries never block the event loop"""
+    logger.info(f"Checking batch relevance for {len(titles)} titles with technology: '{technology}'")
+    
+    titles = preprocess_titles(titles)
+    with usage_labels(technology=technology):
+        results, missing = _split_cached(titles, technology)
+        if not missing:
+            return {"results": results}
+        
+        chunks = chunk_titles(missing, technology)
+        logger.info(f"Sending {len(missing)} of {len(titles)} titles for LLM processing in {len(chunks)} chunks")
+        responses = await async_call_relevance_llm(chunks, technology)
+    
+    return _fill_missing(titles, results, missing, _merge_chunk_results(chunks, technology, responses))
+
 def normalize_tech_name(tech: str) -> str:
     """Normalize technology names to canonical forms"""
     tech_lower = tech.lower().strip()
@@ -837,6 +937,23 @@ def rule_based_relevance_check(title: str, technology: str) -> Dict[str, Any]:
         "technologies": extracted_technologies
     }
 
+def _rule_based_answer(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Relevance answer of the "rules" backend, in the compact format the LLMs use"""
+    results = (rule_based_relevance_check(title, data["technology"]) for title in data["titles"])
+    return {"r": [
+        {"i": i, "ok": int(result["isRelevant"]), "s": result["similarity"],
+         "t": result["technologies"], "e": result["explanation"]}
+        for i, result in enumerate(results)
+    ]}
+
+register_local_handler("relevance", _rule_based_answer)
+
+@app.middleware("http")
+async def label_llm_usage(request, call_next):
+    """Attribute the LLM usage of a request to its endpoint"""
+    with usage_labels(endpoint=request.url.path):
+        return await call_next(request)
+
 @app.on_event("startup")
 async def startup_event():
     """Startup event handler"""
@@ -844,6 +961,11 @@ async def startup_event():
     if not GROQ_API_KEY:
         logger.warning("GROQ_API_KEY environment variable is not set. API calls will fail.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the pooled Groq connections"""
+    await asyncio.get_running_loop().run_in_executor(None, close_groq_client)
+
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Health check endpoint"""
@@ -851,14 +973,21 @@ async def health_check():
     return {
         "status": "healthy", 
         "model": GROQ_MODEL,
-        "api_key_configured": has_api_key
+        "api_key_configured": has_api_key,
+        "circuit": get_groq_client().circuit_stats(),
+        "providers": providers_stats()
     }
 
+@app.get("/metrics/llm", tags=["Health"])
+async def llm_metrics():
+    """LLM tokens, latency, retries, cost and cache hits per endpoint, technology and model"""
+    return get_usage_meter().snapshot()
+
 @app.post("/check-relevance", tags=["Relevance"], response_model=RelevanceResponse)
 async def check_title_relevance(request: RelevanceRequest):
     """Check if a title is relevant to a technology using Groq LLM"""
     try:
-        result = check_relevance(request.title, request.technology)
+        result = await async_check_relevance(request.title, request.technology)
         
         return RelevanceResponse(
             isRelevant=result["isRelevant"],
@@ -873,7 +1002,7 @@ async def check_title_relevance(request: RelevanceRequest):
 async def check_batch_title_relevance(request: BatchRelevanceRequest):
     """Check if multiple titles are relevant to a technology using Groq LLM (batch processing)"""
     try:
-        result = check_batch_relevance(request.titles, request.technology)
+        result = await async_check_batch_relevance(request.titles, request.technology)
         return result
     except Exception as e:
         logger.error(f"Error checking batch title relevance: {e}")
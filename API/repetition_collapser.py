@@ -0,0 +1,251 @@
+"""
+Repeated-phrase collapsing for scraped titles.
+
+Scraped titles sometimes contain the same phrase many times over, e.g.
+"Learn Python Learn Python Learn Python - Full Course". The original cleanup loops on
+
+    re.search(r'(\\b[\\w\\s]{5,50}\\b)(\\s+\\1){2,}', title, re.IGNORECASE)
+
+and, for every match, collapses "phrase phrase ..." back to "phrase". The backreference
+makes each search try every start position and every phrase length against the rest of
+the title, and the search starts over from the beginning after every substitution, so
+long scraped titles take a long time.
+
+collapse_repetitions() produces exactly the same output with a cheaper search: on
+whitespace-normalized text the phrase can only be a run of whole words joined by single
+spaces, so the search compares case-folded word tokens instead of backtracking over
+characters, and after a substitution it resumes just before the first change instead of
+at the start of the title. Each search is linear in the words it reads. Every collapse
+still runs the original substitution over the whole title, because it also removes
+two-fold repetitions of the phrase anywhere in the title, so the total cost is
+O(length x collapses): linear for the usual title with a few repeated phrases, quadratic
+only for huge titles with hundreds of them. Text that is not whitespace-normalized is
+handed to the original regex loop.
+
+Run this module directly to check both implementations agree on title_examples.json and
+a generated corpus:
+
+    python repetition_collapser.py
+"""
+
+import re
+
+MIN_PHRASE_LENGTH = 5
+MAX_PHRASE_LENGTH = 50
+
+# The longest possible match: a phrase and two repetitions, each after one space
+MAX_MATCH_LENGTH = 3 * MAX_PHRASE_LENGTH + 2
+
+REPETITION_PATTERN = re.compile(r'(\b[\w\s]{5,50}\b)(\s+\1){2,}', re.IGNORECASE)
+
+_WORD_RUN = re.compile(r'\w+')
+_WORD_CHAR = re.compile(r'\w')
+
+# Any whitespace other than a single ' ' between non-space characters
+_NOT_SINGLE_SPACED = re.compile(r'[^\S ]|  ')
+
+
+def collapse_repetitions_regex(title: str) -> str:
+    """Original implementation, kept as the reference for collapse_repetitions()"""
+    prev_title = ""
+    current_title = title
+
+    while prev_title != current_title:
+        prev_title = current_title
+
+        match = REPETITION_PATTERN.search(current_title)
+        if match:
+            pattern = match.group(1)
+            # Replace 2 or more repetitions of this exact phrase with just one instance
+            exact_pattern = re.escape(pattern) + r'(\s+' + re.escape(pattern) + r'){1,}'
+            current_title = re.sub(exact_pattern, pattern, current_title, flags=re.IGNORECASE)
+
+    return current_title
+
+
+def collapse_repetitions(title: str) -> str:
+    """
+    Collapse phrases repeated 3 or more times into a single occurrence, until none are left
+
+    Same result as collapse_repetitions_regex(), see the module docstring for the cost.
+    """
+    if not title or _NOT_SINGLE_SPACED.search(title):
+        return collapse_repetitions_regex(title)
+
+    current_title = title
+    search_from = 0
+
+    while True:
+        phrase = _find_repeated_phrase(current_title, search_from)
+        if phrase is None:
+            return current_title
+
+        # Same substitution as the original: 2 or more repetitions anywhere in the title
+        exact_pattern = re.compile(re.escape(phrase) + r'(\s+' + re.escape(phrase) + r'){1,}', re.IGNORECASE)
+        first_change = [len(current_title)]
+
+        def replace(match):
+            first_change[0] = min(first_change[0], match.start())
+            return phrase
+
+        current_title = exact_pattern.sub(replace, current_title)
+
+        # A match starting further back than MAX_MATCH_LENGTH cannot reach the changed text,
+        # and there was no match before the phrase we just found
+        search_from = max(0, first_change[0] - MAX_MATCH_LENGTH)
+
+
+def _fold_case(text):
+    """
+    Lowercase character by character, the way the regex compares a case-insensitive backreference
+
+    str.lower() differs only for U+0130 (lowercases to two characters) and for a final
+    capital sigma, so those are mapped first to keep the result aligned with the input.
+    """
+    return text.replace('İ', 'i').replace('Σ', 'σ').lower()
+
+
+def _find_repeated_phrase(text, search_from=0):
+    """
+    Return the phrase REPETITION_PATTERN would capture, or None if it would not match
+
+    text must be whitespace-normalized and must not match at any position before search_from.
+    The phrase is the leftmost, then longest, run of whole words joined by single spaces,
+    5-50 characters long, that is followed by one exact repetition and then one more
+    repetition whose last word only needs to start with the phrase's last word (the
+    regex does not require a word boundary after the final repetition).
+    """
+    folded = _fold_case(text)
+
+    # Word tokens from search_from on, skipping a word that search_from falls inside
+    if search_from > 0 and _WORD_CHAR.match(text, search_from - 1):
+        search_from = text.find(' ', search_from)
+        if search_from < 0:
+            return None
+
+    tokens = _WORD_RUN.finditer(text, search_from)
+    starts = []
+    ends = []
+    words = []
+
+    def load_tokens(count):
+        # Tokens are read lazily, only as far ahead as a match starting at the current word can reach
+        while len(starts) < count:
+            token = next(tokens, None)
+            if token is None:
+                return False
+            starts.append(token.start())
+            ends.append(token.end())
+            words.append(folded[token.start():token.end()])
+        return True
+
+    def linked(index):
+        # True if word index and the next one are separated by exactly one space
+        return starts[index + 1] - ends[index] == 1 and text[ends[index]] == ' '
+
+    i = 0
+    while load_tokens(i + 1):
+        # Longest run of linked words starting here that still fits in a phrase
+        k = 1
+        while load_tokens(i + k + 1) and linked(i + k - 1) and ends[i + k] - starts[i] <= MAX_PHRASE_LENGTH:
+            k += 1
+
+        # Try phrase lengths longest first, like the greedy {5,50}
+        while k > 0 and ends[i + k - 1] - starts[i] >= MIN_PHRASE_LENGTH:
+            # Cheap pre-check: the second occurrence has to start with the same word
+            if i + k < len(words) and words[i + k] == words[i] and _repeats_at(i, k, words, linked, load_tokens):
+                return text[starts[i]:ends[i + k - 1]]
+            k -= 1
+
+        i += 1
+
+    return None
+
+
+def _repeats_at(i, k, words, linked, load_tokens):
+    """Check whether the k-word phrase at word i is followed by two more repetitions"""
+    last = i + 3 * k - 1
+    if not load_tokens(last + 1):
+        return False
+
+    # Second occurrence: whole words
+    for offset in range(k):
+        if words[i + k + offset] != words[i + offset]:
+            return False
+
+    # Third occurrence: whole words except the last, which only needs to start with the phrase's last word
+    for offset in range(k - 1):
+        if words[i + 2 * k + offset] != words[i + offset]:
+            return False
+
+    if not words[last].startswith(words[i + k - 1]):
+        return False
+
+    # The phrase itself is already known to be linked, check the repetitions are too
+    for index in range(i + k - 1, last):
+        if not linked(index):
+            return False
+
+    return True
+
+
+def _generate_corpus(seed=0, count=3000):
+    """Random titles built from a small vocabulary so phrases repeat often"""
+    import random
+
+    rng = random.Random(seed)
+    vocabulary = [
+        "Learn", "learn", "LEARN", "Python", "python", "JS", "js", "React", "Full", "Course",
+        "for", "Beginners", "2024", "part", "Part", "1", "a", "ab", "abc", "Java", "JavaScript",
+        "tutorial", "Tutorial_", "C", "C++", "-", "|", ":", "İstanbul", "istanbul", "ſtate", "state",
+        "ΣΟΦΙΑ", "σοφια", "straße", "STRASSE", "Kelvin", "Kelvin", "naïve", "NAÏVE", "x"
+    ]
+    corpus = []
+    for _ in range(count):
+        phrase = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 6)))
+        variant = phrase.upper() if rng.random() < 0.2 else phrase
+        parts = [rng.choice(vocabulary) for _ in range(rng.randint(0, 3))]
+        parts += [phrase] * rng.randint(1, 5)
+        parts += [variant] * rng.randint(0, 2)
+        if rng.random() < 0.5:
+            parts.append(phrase + rng.choice(vocabulary))
+        parts += [rng.choice(vocabulary) for _ in range(rng.randint(0, 3))]
+        corpus.append(" ".join(parts))
+    return corpus
+
+
+if __name__ == "__main__":
+    import json
+    import os
+    import time
+
+    json_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'title_examples.json')
+    with open(json_path, 'r', encoding='utf-8') as f:
+        examples = json.load(f)
+
+    titles = examples.get('good_examples', []) + examples.get('bad_examples', [])
+    # Scraped-style repetitions of the examples themselves
+    titles += [" ".join([title] * 3) for title in titles]
+    titles += _generate_corpus()
+
+    mismatches = 0
+    legacy_time = 0.0
+    new_time = 0.0
+    for title in titles:
+        title = re.sub(r'\s+', ' ', title).strip()
+
+        started = time.perf_counter()
+        expected = collapse_repetitions_regex(title)
+        legacy_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        actual = collapse_repetitions(title)
+        new_time += time.perf_counter() - started
+
+        if actual != expected:
+            mismatches += 1
+            print(f"MISMATCH: {title!r}\n  regex: {expected!r}\n  new:   {actual!r}")
+
+    print(f"Checked {len(titles)} titles, {mismatches} mismatches")
+    print(f"regex loop: {legacy_time:.3f}s, token collapser: {new_time:.3f}s")
+    raise SystemExit(1 if mismatches else 0)
@@ -0,0 +1,95 @@
+"""
+Per-request memoization of upstream calls.
+
+One /find/best-playlist request evaluates several playlists in parallel, and the
+same upstream data (first-video details, playlist pages, relevance verdicts) is
+often asked for more than once along the way. A RequestContext is created for the
+request and passed down the pipeline so every upstream result is fetched once,
+while counting how many calls were made and how many were served from memory.
+"""
+
+import threading
+from collections import Counter
+
+
+class RequestContext:
+    """
+    Memoizes upstream results for the lifetime of one request.
+
+    Thread-safe: if two threads ask for the same key at the same time, the second
+    one waits for the first call to finish instead of making a duplicate call.
+    Failed calls are not memoized.
+    """
+
+    def __init__(self):
+        self._results = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self.reused = Counter()
+
+    def memoize(self, kind, key, fn, *args, **kwargs):
+        """
+        Return the result of fn(*args, **kwargs), calling it at most once per (kind, key)
+
+        Args:
+            kind: Category of upstream call, e.g. "video_details" (used for the stats)
+            key: Hashable key identifying the call within its kind
+            fn: Function performing the upstream call
+        """
+        cache_key = (kind, key)
+
+        while True:
+            with self._lock:
+                if cache_key in self._results:
+                    self.reused[kind] += 1
+                    return self._results[cache_key]
+
+                event = self._in_flight.get(cache_key)
+                if event is None:
+                    event = threading.Event()
+                    self._in_flight[cache_key] = event
+                    break
+
+            # Another thread is fetching the same thing, wait for it and re-check
+            event.wait()
+            with self._lock:
+                if cache_key in self._results:
+                    self.reused[kind] += 1
+                    return self._results[cache_key]
+                if cache_key not in self._in_flight:
+                    # The other call failed, make our own attempt
+                    event = threading.Event()
+                    self._in_flight[cache_key] = event
+                    break
+
+        try:
+            value = fn(*args, **kwargs)
+            with self._lock:
+                self._results[cache_key] = value
+                self.calls[kind] += 1
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(cache_key, None)
+            event.set()
+
+    def prime(self, kind, key, value):
+        """Store a result obtained elsewhere (e.g. from a batch call) so later lookups reuse it"""
+        with self._lock:
+            self._results[(kind, key)] = value
+
+    def stats(self):
+        """Return the number of upstream calls made and reused, per kind"""
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "reused": dict(self.reused)
+            }
+
+
+def memoized(context, kind, key, fn, *args, **kwargs):
+    """Call fn through the context if one is given, otherwise call it directly"""
+    if context is None:
+        return fn(*args, **kwargs)
+    return context.memoize(kind, key, fn, *args, **kwargs)
@@ -0,0 +1,136 @@
+"""
+Re-rank stored best-playlist candidates under a different scoring config.
+
+Candidates scored by /find/best-playlist are saved in the candidate store with the
+inputs of their point components. This module re-scores them with the vectorized
+scorer under a new config and reports how the rankings change, without any call to
+YouTube. It backs the /rescore endpoint and can be run from the command line:
+
+    python rescore.py new_scoring_config.json
+    python rescore.py new_scoring_config.json --query "react tutorial" --base scoring_config.json
+"""
+
+from candidate_store import get_candidate_store
+from playlist_scorer import SCORING_CONFIG, score_columns, stats_columns
+
+
+def _ranks(scores, ids):
+    """1-based rank of every candidate, by score descending and playlist ID for ties"""
+    order = sorted(range(len(scores)), key=lambda index: (-scores[index], ids[index]))
+    ranks = [0] * len(scores)
+    for rank, index in enumerate(order, start=1):
+        ranks[index] = rank
+    return ranks
+
+
+def rescore(config, base_config=None, query=None, limit=None, store=None):
+    """
+    Re-rank stored candidates under config and compare with base_config
+
+    Args:
+        config: Scoring config to evaluate
+        base_config: Config to compare against (defaults to the active SCORING_CONFIG)
+        query: Only re-rank the candidates of this query
+        limit: Only re-rank the most recently recorded queries
+        store: CandidateStore to read from (defaults to the shared store)
+
+    Returns:
+        dict: Versions, how many queries changed winner, and per query every candidate's
+              old and new score and rank
+    """
+    if base_config is None:
+        base_config = SCORING_CONFIG
+    if store is None:
+        store = get_candidate_store()
+
+    grouped = store.load(query=query, limit=limit)
+    queries = list(grouped)
+    candidates = [candidate for query_text in queries for candidate in grouped[query_text]]
+
+    result = {
+        "base_version": base_config.get("version"),
+        "config_version": config.get("version"),
+        "queries": len(queries),
+        "candidates": len(candidates),
+        "winners_changed": 0,
+        "results": []
+    }
+    if not candidates:
+        return result
+
+    # Both configs are applied to every stored candidate in one vectorized pass each
+    columns = stats_columns([candidate["stats"] for candidate in candidates])
+    old_scores = score_columns(columns, base_config)["total_score"]
+    new_scores = score_columns(columns, config)["total_score"]
+
+    offset = 0
+    for query_text in queries:
+        group = grouped[query_text]
+        old = old_scores[offset:offset + len(group)].tolist()
+        new = new_scores[offset:offset + len(group)].tolist()
+        offset += len(group)
+
+        ids = [candidate["id"] for candidate in group]
+        old_ranks = _ranks(old, ids)
+        new_ranks = _ranks(new, ids)
+
+        rows = [
+            {
+                "id": candidate["id"],
+                "title": candidate["title"],
+                "old_score": round(old[index], 2),
+                "new_score": round(new[index], 2),
+                "old_rank": old_ranks[index],
+                "new_rank": new_ranks[index],
+                "rank_change": old_ranks[index] - new_ranks[index]
+            }
+            for index, candidate in enumerate(group)
+        ]
+        rows.sort(key=lambda row: row["new_rank"])
+
+        winner_changed = old_ranks.index(1) != new_ranks.index(1)
+        if winner_changed:
+            result["winners_changed"] += 1
+
+        result["results"].append({
+            "query": query_text,
+            "winner_changed": winner_changed,
+            "candidates": rows
+        })
+
+    return result
+
+
+def print_rescore(result):
+    """Print a rescore() result as a table per query"""
+    print(f"Config {result['base_version']} → {result['config_version']}: "
+          f"{result['candidates']} candidates in {result['queries']} queries, "
+          f"{result['winners_changed']} winners changed")
+
+    for entry in result["results"]:
+        marker = " (winner changed)" if entry["winner_changed"] else ""
+        print(f"\n🔎 {entry['query']}{marker}")
+        for row in entry["candidates"]:
+            change = row["rank_change"]
+            arrow = f"▲{change}" if change > 0 else (f"▼{-change}" if change < 0 else "=")
+            print(f"  {row['new_rank']}. [{arrow:>3}] {row['new_score']:.1f} (was {row['old_score']:.1f}) {row['title']}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from playlist_scorer import load_scoring_config
+
+    parser = argparse.ArgumentParser(description="Re-rank stored playlist candidates under a new scoring config")
+    parser.add_argument("config", help="Path to the scoring config to evaluate")
+    parser.add_argument("--base", help="Config to compare against (default: the active scoring config)")
+    parser.add_argument("--query", help="Only re-rank the candidates of this query")
+    parser.add_argument("--limit", type=int, help="Only re-rank the most recently recorded queries")
+    args = parser.parse_args()
+
+    print_rescore(rescore(
+        load_scoring_config(args.config),
+        base_config=load_scoring_config(args.base) if args.base else None,
+        query=args.query,
+        limit=args.limit
+    ))
@@ -1,13 +1,17 @@
 """
-Technology Extractor - Extract technology names from text using Gemini API
+Technology Extractor - Extract technology names from text using the LLM backends (Gemini by default)
 """
 
 import os
 import json
+import asyncio
 import logging
+import threading
 from dotenv import load_dotenv
-import google.generativeai as genai
 from typing import List, Dict, Any, Optional, Union
+from llm_providers import LLMRequest, ProviderError, get_router, register_local_handler
+from ttl_cache import TTLCache
+from usage_meter import current_labels, get_usage_meter, usage_labels
 
 # Load environment variables from .env file
 load_dotenv()
@@ -21,94 +25,37 @@ logger = logging.getLogger(__name__)
 
 # Load API key from environment variable
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-print(f"GEMINI_API_KEY: {GEMINI_API_KEY}")
 
-# Configure Gemini API
 if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
     logger.info("Gemini API key configured successfully")
 else:
     logger.warning("GEMINI_API_KEY not found in environment variables")
 
-# Default model - using a free tier model
-DEFAULT_MODEL = "gemini-2.0-flash"
+# Extraction answers are reused for this many seconds
+EXTRACTION_CACHE_TTL = int(os.getenv("EXTRACTION_CACHE_TTL", 86400))
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", 50000))
 
-def extract_technology(text: str) -> Dict[str, Any]:
-    """
-    Extract all technologies mentioned in a text
-    
-    Args:
-        text: The text to analyze
-        
-    Returns:
-        dict: Dictionary with extracted technology information
-    """
-    try:
-        if not GEMINI_API_KEY:
-            logger.warning("Gemini API key not configured")
-            return fallback_technology_extraction(text)
-        
-        # Create prompt for technology extraction
-        prompt = f"""
-        Extract ALL technologies mentioned in this text. 
-        Focus on specific technologies, treating compound names like "React JS" as a single technology.
-        
-        Text: "{text}"
-        
-        Respond with JSON only in this exact format without any markdown formatting:
-        {{
-          "technologies": ["tech1", "tech2", "tech3"]
-        }}
-        
-        If no specific technology is mentioned, return an empty array.
-        """
-        
-        # Configure the model
-        model = genai.GenerativeModel(DEFAULT_MODEL)
-        
-        # Generate response
-        response = model.generate_content(
-            prompt,
-            generation_config={"temperature": 0.1}
-        )
-        
-        # Parse the response, handling potential markdown code blocks
-        try:
-            response_text = response.text
-            # Remove markdown code blocks if present
-            if "```" in response_text:
-                response_text = response_text.split("```")[1]
-                if response_text.startswith("json"):
-                    response_text = response_text[4:].strip()
-            
-            result = json.loads(response_text)
-            return result
-        except json.JSONDecodeError:
-            logger.error(f"Failed to parse JSON response: {response.text}")
-            return fallback_technology_extraction(text)
-            
-    except Exception as e:
-        logger.error(f"Error extracting technology: {e}")
-        return fallback_technology_extraction(text)
+# Prompt plus expected answer tokens per LLM call, and texts per call at most
+EXTRACTION_CHUNK_TOKEN_BUDGET = int(os.getenv("EXTRACTION_CHUNK_TOKEN_BUDGET", 3000))
+EXTRACTION_MAX_TEXTS_PER_CHUNK = int(os.getenv("EXTRACTION_MAX_TEXTS_PER_CHUNK", 25))
+EXTRACTION_OUTPUT_TOKENS_PER_TEXT = 20
+CHARS_PER_TOKEN = 4
 
-def extract_technologies_batch(texts: List[str]) -> Dict[str, Any]:
-    """
-    Extract technologies from multiple texts in a single API call
-    
-    Args:
-        texts: List of texts to analyze
-        
-    Returns:
-        dict: Dictionary with extracted technology information for each text
-    """
-    try:
-        if not GEMINI_API_KEY:
-            logger.warning("Gemini API key not configured")
-            return {"results": [fallback_technology_extraction(text) for text in texts]}
-        
-        # Create prompt for batch technology extraction
-        texts_json = json.dumps(texts)
-        prompt = f"""
+# Part of the cache key; bump whenever the extraction prompt changes
+EXTRACTION_PROMPT_VERSION = "2"
+
+def normalize_text(text: str) -> str:
+    """Cache and deduplication key of a text: lowercased, whitespace collapsed"""
+    return " ".join(text.split()).lower()
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English text)"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def create_extraction_prompt(texts: List[str]) -> str:
+    """Build the batch extraction prompt; every LLM backend answers it with {"results": [...]}"""
+    texts_json = json.dumps(texts)
+    return f"""
         Extract ALL technologies mentioned in each of these texts.
         Focus on specific technologies, treating compound names like "React JS" as a single technology.
         
@@ -118,6 +65,7 @@ def extract_technologies_batch(texts: List[str]) -> Dict[str, Any]:
         {{
           "results": [
             {{
+              "i": 0,
               "text": "the original text",
               "technologies": ["tech1", "tech2", "tech3"]
             }},
@@ -125,46 +73,198 @@ def extract_technologies_batch(texts: List[str]) -> Dict[str, Any]:
           ]
         }}
         
+        "i" is the position of the text in the list, starting at 0.
         If no specific technology is mentioned in a text, return an empty array for that text.
         """
+
+class TechExtractor:
+    """
+    Reusable technology extraction service
+    
+    Texts are normalized and deduplicated, answers come from a TTL cache keyed by the
+    normalized text when possible, and the remaining texts are split into chunks that
+    are sent to the extraction backends concurrently. A failing chunk falls back to the
+    rule-based extraction for its own texts only. Thread-safe; use the shared instance
+    from get_tech_extractor().
+    """
+    
+    def __init__(self, cache_ttl: int = EXTRACTION_CACHE_TTL, cache_size: int = EXTRACTION_CACHE_SIZE,
+                 token_budget: int = EXTRACTION_CHUNK_TOKEN_BUDGET, max_texts_per_chunk: int = EXTRACTION_MAX_TEXTS_PER_CHUNK):
+        self.cache = TTLCache(ttl=cache_ttl, max_size=cache_size)
+        self.token_budget = token_budget
+        self.max_texts_per_chunk = max(1, max_texts_per_chunk)
+    
+    def chunk_texts(self, texts: List[str]) -> List[List[str]]:
+        """Split texts into consecutive chunks whose prompt and expected answer fit the token budget"""
+        base_tokens = estimate_tokens(create_extraction_prompt([]))
+        chunks = []
+        current = []
+        current_tokens = base_tokens
+        for text in texts:
+            # The text appears in the prompt and is echoed back in the answer
+            text_tokens = estimate_tokens(json.dumps(text)) * 2 + EXTRACTION_OUTPUT_TOKENS_PER_TEXT
+            if current and (current_tokens + text_tokens > self.token_budget or len(current) >= self.max_texts_per_chunk):
+                chunks.append(current)
+                current = []
+                current_tokens = base_tokens
+            current.append(text)
+            current_tokens += text_tokens
+        
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def _plan(self, texts: List[str]):
+        """
+        Resolve cached texts and pick the ones still to extract
+        
+        Returns:
+            tuple: (technologies per normalized text found in the cache,
+                    one original text per normalized text that is missing)
+        """
+        found = {}
+        missing = {}
+        for text in texts:
+            key = normalize_text(text)
+            if key in found or key in missing:
+                continue
+            technologies = self.cache.get((EXTRACTION_PROMPT_VERSION, key))
+            if technologies is not None:
+                found[key] = technologies
+            else:
+                missing[key] = text
         
-        # Configure the model
-        model = genai.GenerativeModel(DEFAULT_MODEL)
+        get_usage_meter().record_cache(len(found), len(missing))
+        return found, list(missing.values())
+    
+    def _chunk_results(self, chunk: List[str], answer, provider) -> Dict[str, List[str]]:
+        """Technologies per normalized text of a chunk from a backend's answer, caching LLM answers"""
+        items = answer.get("results") if isinstance(answer, dict) else answer
+        if not isinstance(items, list):
+            logger.error(f"Unexpected extraction answer from {provider.name}: {answer}")
+            items = []
         
-        # Generate response
-        response = model.generate_content(
-            prompt,
-            generation_config={"temperature": 0.1}
-        )
+        # Answers are matched to texts by the echoed text, or else by their index, never by
+        # their position in the list, since backends skip and reorder texts
+        keys = [normalize_text(text) for text in chunk]
+        positions = {key: i for i, key in enumerate(keys)}
+        matched = {}
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("technologies"), list):
+                continue
+            i = positions.get(normalize_text(item["text"])) if isinstance(item.get("text"), str) else None
+            if i is None and isinstance(item.get("i"), int) and 0 <= item["i"] < len(chunk):
+                i = item["i"]
+            if i is not None:
+                matched.setdefault(i, item["technologies"])
         
-        # Parse the response, handling potential markdown code blocks
-        try:
-            response_text = response.text
-            # Remove markdown code blocks if present
-            if "```" in response_text:
-                response_text = response_text.split("```")[1]
-                if response_text.startswith("json"):
-                    response_text = response_text[4:].strip()
-            
-            result = json.loads(response_text)
-            
-            # Ensure the result has the expected format
-            if "results" not in result:
-                result = {"results": []}
+        # Texts without an answer get the rule-based one, which is not cached
+        results = {}
+        for i, text in enumerate(chunk):
+            if i not in matched:
+                results[keys[i]] = fallback_technology_extraction(text)["technologies"]
+                continue
+            results[keys[i]] = matched[i]
+            if provider.cacheable:
+                self.cache.set((EXTRACTION_PROMPT_VERSION, keys[i]), matched[i])
+        if len(matched) < len(chunk):
+            logger.warning(f"{provider.name} answered {len(matched)} of {len(chunk)} texts, using rules for the rest")
+        return results
+    
+    def _chunk_fallback(self, chunk: List[str], error) -> Dict[str, List[str]]:
+        logger.error(f"Error in batch technology extraction: {error}")
+        return {normalize_text(text): fallback_technology_extraction(text)["technologies"] for text in chunk}
+    
+    def _request(self, chunk: List[str]) -> LLMRequest:
+        return LLMRequest("extraction", create_extraction_prompt(chunk), {"texts": chunk})
+    
+    def _assemble(self, texts: List[str], found: Dict[str, List[str]]) -> Dict[str, Any]:
+        return {"results": [
+            {"text": text, "technologies": list(found.get(normalize_text(text), []))} for text in texts
+        ]}
+    
+    def extract_batch(self, texts: List[str]) -> Dict[str, Any]:
+        """
+        Extract technologies from texts, blocking the calling thread until every chunk has an answer
+        
+        Returns:
+            dict: {"results": [{"text", "technologies"}, ...]}, one result per input text, in order
+        """
+        # Label the calls with this operation unless the caller has set an endpoint
+        with usage_labels(**{"endpoint": "extract_technologies_batch", **current_labels()}):
+            found, missing = self._plan(texts)
+            if missing:
+                router = get_router("extraction")
+                chunks = self.chunk_texts(missing)
+                futures = [router.submit(self._request(chunk)) for chunk in chunks]
+                for chunk, future in zip(chunks, futures):
+                    try:
+                        found.update(self._chunk_results(chunk, *future.result()))
+                    except ProviderError as e:
+                        found.update(self._chunk_fallback(chunk, e))
+        
+        return self._assemble(texts, found)
+    
+    async def async_extract_batch(self, texts: List[str]) -> Dict[str, Any]:
+        """extract_batch for async code, without blocking the event loop"""
+        with usage_labels(**{"endpoint": "extract_technologies_batch", **current_labels()}):
+            found, missing = self._plan(texts)
+            if missing:
+                router = get_router("extraction")
+                
+                async def extract(chunk):
+                    try:
+                        return self._chunk_results(chunk, *await router.run_async(self._request(chunk)))
+                    except ProviderError as e:
+                        return self._chunk_fallback(chunk, e)
                 
-            # Ensure each result has the original text
-            for i, item in enumerate(result.get("results", [])):
-                if i < len(texts) and "text" not in item:
-                    item["text"] = texts[i]
-            
-            return result
-        except json.JSONDecodeError:
-            logger.error(f"Failed to parse JSON response: {response.text}")
-            return {"results": [fallback_technology_extraction(text) for text in texts]}
-            
-    except Exception as e:
-        logger.error(f"Error in batch technology extraction: {e}")
-        return {"results": [fallback_technology_extraction(text) for text in texts]}
+                for results in await asyncio.gather(*(extract(chunk) for chunk in self.chunk_texts(missing))):
+                    found.update(results)
+        
+        return self._assemble(texts, found)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"cache": self.cache.stats()}
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+def get_tech_extractor() -> TechExtractor:
+    """Return the shared extractor, creating it on first use"""
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            _extractor = TechExtractor()
+        return _extractor
+
+def extract_technology(text: str) -> Dict[str, Any]:
+    """
+    Extract all technologies mentioned in a text
+    
+    Args:
+        text: The text to analyze
+        
+    Returns:
+        dict: Dictionary with extracted technology information
+    """
+    result = get_tech_extractor().extract_batch([text])["results"][0]
+    return {"technologies": result["technologies"]}
+
+def extract_technologies_batch(texts: List[str]) -> Dict[str, Any]:
+    """
+    Extract technologies from multiple texts
+    
+    Uses the shared TechExtractor: repeated and cached texts are not sent again, and the
+    rest go to the extraction backends (see llm_providers, EXTRACTION_PROVIDERS) in
+    concurrent chunks.
+    
+    Args:
+        texts: List of texts to analyze
+        
+    Returns:
+        dict: Dictionary with extracted technology information for each text
+    """
+    return get_tech_extractor().extract_batch(texts)
 
 def fallback_technology_extraction(text: str) -> Dict[str, Any]:
     """
@@ -214,6 +314,14 @@ def fallback_technology_extraction(text: str) -> Dict[str, Any]:
         "technologies": found_techs
     }
 
+def _rule_based_answer(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Extraction answer of the "rules" backend, in the format the LLMs use"""
+    return {"results": [
+        {"i": i, "text": text, **fallback_technology_extraction(text)} for i, text in enumerate(data["texts"])
+    ]}
+
+register_local_handler("extraction", _rule_based_answer)
+
 # Test the module if run directly
 if __name__ == "__main__":
     # Test individual extraction
@@ -0,0 +1,98 @@
+"""
+Title normalization shared by the fetchers, the API layer and the relevance checker.
+
+YouTube titles sometimes come back with newlines or the same phrase repeated many
+times. Titles are normalized once, when the fetchers build their result dicts, and
+every dict that has been normalized is returned as a NormalizedDict. normalize_titles()
+skips those, so later passes over the same structure are cheap no-ops. The mark is the
+type rather than a key, so it never shows up in serialized responses.
+"""
+
+import functools
+import re
+
+from repetition_collapser import collapse_repetitions
+
+
+class NormalizedDict(dict):
+    """
+    A dict whose title, and every title nested inside it, is already normalized
+
+    Serializes like any dict. Copies made with dict() or {**d} are plain dicts again and
+    are just normalized once more.
+    """
+
+    __slots__ = ()
+
+MAX_TITLE_LENGTH = 200
+
+
+def normalize_title(title: str, max_length: int = MAX_TITLE_LENGTH) -> str:
+    """
+    Normalize a single title: keep the first line, collapse whitespace and repetitions, truncate
+
+    Idempotent - normalizing an already normalized title returns it unchanged.
+    """
+    if not title:
+        return title
+
+    if '\n' in title:
+        title = title.split('\n')[0]
+
+    title = re.sub(r'\s+', ' ', title).strip()
+    title = collapse_repetitions(title)
+
+    if len(title) > max_length:
+        title = title[:max_length] + "..."
+
+    return title
+
+
+def normalize_titles(data):
+    """
+    Normalize every "title" in a nested dict/list structure
+
+    Containers are updated in place. Dicts with a title are returned as NormalizedDicts
+    (and replaced by them inside their containers), so always use the return value.
+    NormalizedDicts are skipped along with everything inside them.
+    """
+    if isinstance(data, NormalizedDict):
+        return data
+
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if isinstance(value, (dict, list)):
+                data[key] = normalize_titles(value)
+
+        # Only records with a title are marked, containers are cheap to walk again
+        if isinstance(data.get("title"), str):
+            data["title"] = normalize_title(data["title"])
+            return NormalizedDict(data)
+
+    elif isinstance(data, list):
+        for index, item in enumerate(data):
+            if isinstance(item, (dict, list)):
+                data[index] = normalize_titles(item)
+
+    return data
+
+
+def normalizes_titles(fn):
+    """Decorator for fetchers: normalize the titles in the returned structure once, at ingestion"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return normalize_titles(fn(*args, **kwargs))
+    return wrapper
+
+
+if __name__ == "__main__":
+    import json
+
+    from records import PlaylistRecord, VideoRecord
+
+    # Normalized structures must serialize without any trace of the mark
+    playlist = PlaylistRecord("PL1", "React\nReact", videos=[VideoRecord("v1", "Hooks Hooks Hooks")]).to_dict()
+    response = normalize_titles({"playlist": playlist, "results": [{"title": "A  \n B"}]})
+    assert normalize_titles(response["playlist"]) is response["playlist"]
+    assert "_normalized" not in json.dumps(response), response
+    print(json.dumps(response, indent=2))
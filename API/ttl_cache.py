@@ -0,0 +1,85 @@
+"""
+Small thread-safe in-memory cache with per-entry expiry.
+
+Used to avoid re-fetching data from YouTube when the same IDs are requested
+again within a short period (e.g. video details for a playlist being re-opened).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe key/value cache where every entry expires after `ttl` seconds.
+
+    When `max_size` is reached the least recently used entry is evicted.
+    """
+
+    def __init__(self, ttl=3600, max_size=5000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if it is missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys):
+        """Return a dict of the keys that are cached and still fresh"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key, value, ttl=None):
+        """Store value under key, expiring after ttl seconds (defaults to the cache ttl)"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove key from the cache if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses
+            }
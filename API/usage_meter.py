@@ -0,0 +1,218 @@
+"""
+Accounting of LLM usage: tokens, latency, retries, cost and cache hits.
+
+Relevance checks (Groq) and technology extraction (Gemini) are the only metered
+upstream calls, and until now nothing recorded what they cost or how long they took.
+Every call is recorded here with the token counts reported by the provider, and the
+aggregates are kept per endpoint, technology and model, so rate limits can be sized
+from real numbers and cache changes can be judged by the calls they save.
+
+Labels (endpoint, technology) come from usage_labels(), a context manager around the
+code that triggers the calls. It uses a context variable, so it follows async tasks, and
+work handed to threads keeps the labels when it is run with contextvars.copy_context().run.
+"""
+
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, math.inf)
+
+# USD per million prompt/completion tokens; extend or override with LLM_MODEL_PRICES (JSON)
+MODEL_PRICES = {
+    "llama-3.3-70b-versatile": {"prompt": 0.59, "completion": 0.79},
+    "llama-3.1-8b-instant": {"prompt": 0.05, "completion": 0.08},
+    "gemini-2.0-flash": {"prompt": 0.10, "completion": 0.40},
+}
+MODEL_PRICES.update(json.loads(os.environ.get("LLM_MODEL_PRICES", "{}")))
+
+# Distinct technologies tracked before the rest are grouped under "other"
+MAX_TECHNOLOGIES = int(os.environ.get("USAGE_METER_MAX_TECHNOLOGIES", 500))
+
+_labels = contextvars.ContextVar("usage_labels", default={})
+
+
+@contextmanager
+def usage_labels(**labels):
+    """Attach labels (e.g. endpoint="/check-batch-relevance", technology="react") to calls made inside"""
+    token = _labels.set({**_labels.get(), **{key: value for key, value in labels.items() if value}})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def current_labels():
+    """Labels set by the enclosing usage_labels() blocks"""
+    return dict(_labels.get())
+
+
+def call_cost(model, prompt_tokens, completion_tokens):
+    """Estimated cost of a call in USD, 0 for models without a known price"""
+    prices = MODEL_PRICES.get(model)
+    if not prices:
+        return 0.0
+    return (prompt_tokens * prices["prompt"] + completion_tokens * prices["completion"]) / 1_000_000
+
+
+class _Aggregate:
+    """Counters and latency histogram of one group of calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def add_call(self, prompt_tokens, completion_tokens, cost, latency, retries, error, rejected):
+        if rejected:
+            self.rejected += 1
+            return
+        self.calls += 1
+        self.errors += int(error)
+        self.retries += retries
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_usd += cost
+        self.latency_sum += latency
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.latency_buckets[index] += 1
+                break
+
+    def _quantile(self, q):
+        """Upper bound of the bucket containing the q-quantile"""
+        if not self.calls:
+            return None
+        target = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets):
+            seen += count
+            if seen >= target:
+                return bound if bound != math.inf else None
+        return None
+
+    def to_dict(self):
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "latency": {
+                "avg_seconds": round(self.latency_sum / self.calls, 3) if self.calls else None,
+                "p50_seconds_le": self._quantile(0.5),
+                "p95_seconds_le": self._quantile(0.95),
+                "buckets": {
+                    ("+Inf" if bound == math.inf else str(bound)): count
+                    for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets)
+                }
+            },
+            "cache": {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "hit_rate": round(self.cache_hits / lookups, 3) if lookups else None
+            }
+        }
+
+
+class UsageMeter:
+    """
+    Thread-safe aggregation of LLM calls and cache lookups
+
+    Every record is added to the totals and to the groups of its endpoint, technology
+    and model.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.since = time.time()
+            self._totals = _Aggregate()
+            self._groups = {"endpoint": {}, "technology": {}, "model": {}}
+
+    def _aggregates(self, labels, model=None):
+        """Totals plus the group aggregates a record belongs to (lock held)"""
+        keys = {
+            "endpoint": labels.get("endpoint") or "unknown",
+            "technology": (labels.get("technology") or "").strip().lower() or None,
+            "model": model
+        }
+        aggregates = [self._totals]
+        for group, key in keys.items():
+            if key is None:
+                continue
+            groups = self._groups[group]
+            if key not in groups and group == "technology" and len(groups) >= MAX_TECHNOLOGIES:
+                key = "other"
+            aggregates.append(groups.setdefault(key, _Aggregate()))
+        return aggregates
+
+    def record_call(self, provider, model, prompt_tokens=0, completion_tokens=0, latency=0.0,
+                    retries=0, error=False, rejected=False, labels=None):
+        """
+        Record one LLM call
+
+        Args:
+            provider: "groq", "gemini", ...
+            model: Model name, used for the price lookup
+            prompt_tokens, completion_tokens: Usage reported by the provider (0 if unknown)
+            latency: Seconds from the first attempt to the final answer, retries included
+            retries: Attempts beyond the first
+            error: The call failed after every attempt
+            rejected: The call was not made at all (circuit breaker open)
+            labels: Labels to use instead of the current usage_labels()
+        """
+        labels = current_labels() if labels is None else labels
+        cost = call_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            for aggregate in self._aggregates(labels, f"{provider}/{model}"):
+                aggregate.add_call(prompt_tokens, completion_tokens, cost, latency, retries, error, rejected)
+
+    def record_cache(self, hits, misses, labels=None):
+        """Record cache lookups that saved (hits) or led to (misses) LLM work"""
+        labels = current_labels() if labels is None else labels
+        with self._lock:
+            for aggregate in self._aggregates(labels):
+                aggregate.cache_hits += hits
+                aggregate.cache_misses += misses
+
+    def snapshot(self):
+        """Return every aggregate as plain dicts"""
+        with self._lock:
+            return {
+                "since": self.since,
+                "uptime_seconds": round(time.time() - self.since, 1),
+                "totals": self._totals.to_dict(),
+                **{
+                    f"by_{group}": {key: aggregate.to_dict() for key, aggregate in sorted(groups.items())}
+                    for group, groups in self._groups.items()
+                }
+            }
+
+
+_meter = UsageMeter()
+
+
+def get_usage_meter():
+    """Return the process-wide meter"""
+    return _meter
@@ -9,18 +9,30 @@ from youtubesearchpython import Video
 import aiohttp
 import asyncio
 import yt_dlp
-from Youtube import format_number
+from records import VideoRecord
+from duration_parser import parse_durations, summarize_durations
+from negative_cache import classify_failure, classify_status
 
 class CustomPlaylist:
     """
     A custom implementation of playlist fetching to work around bugs
     in the youtube-search-python library
+
+    Every fetch path collects its videos through _add_video, so self.videos only ever
+    holds VideoRecords.
     """
     
     def __init__(self, playlist_id):
         """Initialize with a playlist ID"""
         self.playlist_id = self._extract_playlist_id(playlist_id)
         self.videos = []
+        self._seen_video_ids = set()
+        self._batch_start = 0
+        self._retain_videos = True
+        self._fetch_succeeded = False
+        # Failure class (see negative_cache.py) when the first page shows the playlist is unusable
+        self.failure = None
+        self.failure_reason = None
         self.info = {
             'title': 'Unknown Playlist',
             'channel': {'name': 'Unknown Channel'},
@@ -49,6 +61,10 @@ class CustomPlaylist:
             response = self._session.get(url)
             html = response.text
             
+            if response.status_code != 200:
+                self._set_failure(classify_status(response.status_code), f"HTTP {response.status_code}")
+                return
+            
             # Extract playlist title directly from title tag first as most reliable method
             title_tag_match = re.search(r'<title>(.*?) - YouTube</title>', html)
             if title_tag_match:
@@ -59,13 +75,22 @@ class CustomPlaylist:
             initial_data_match = re.search(r'var\s+ytInitialData\s*=\s*({.+?});\s*</script>', html, re.DOTALL)
             if not initial_data_match:
                 print("Could not find initial data in playlist page")
+                self._set_failure("parse_failure", "No ytInitialData in playlist page")
                 return
                 
             try:
                 initial_data = json.loads(initial_data_match.group(1))
             except json.JSONDecodeError:
                 print("Could not parse initial data JSON")
+                self._set_failure("parse_failure", "Invalid ytInitialData JSON")
                 return
+            
+            # Private and deleted playlists come back as a page with an alert instead of contents
+            alert_text = self._extract_alert_text(initial_data)
+            if alert_text:
+                failure = classify_failure(alert_text)
+                if failure:
+                    self._set_failure(failure, alert_text)
                 
             # Try to extract playlist info - multiple approaches for redundancy
             try:
@@ -78,6 +103,24 @@ class CustomPlaylist:
                     
                     video_count_text = header.get('numVideosText', {}).get('runs', [{}])[0].get('text', '0')
                     self.info['videoCount'] = re.sub(r'\D', '', video_count_text) or 'Unknown'
+                    
+                    view_count_text = header.get('viewCountText', {}).get('simpleText', '')
+                    if view_count_text:
+                        self.info['viewCount'] = re.sub(r'\D', '', view_count_text) or 'Unknown'
+                
+                # Header stats are also mirrored in the sidebar on most layouts
+                sidebar = initial_data.get('sidebar', {}).get('playlistSidebarRenderer', {})
+                for item in sidebar.get('items', []):
+                    primary_info = item.get('playlistSidebarPrimaryInfoRenderer')
+                    if not primary_info:
+                        continue
+                    for stat in primary_info.get('stats', []):
+                        stat_text = self._extract_text_from_runs(stat.get('runs', [])) or stat.get('simpleText', '')
+                        if self.info['videoCount'] in ('Unknown', '0') and 'video' in stat_text:
+                            self.info['videoCount'] = re.sub(r'\D', '', stat_text) or 'Unknown'
+                        elif 'viewCount' not in self.info and 'view' in stat_text:
+                            self.info['viewCount'] = re.sub(r'\D', '', stat_text) or 'Unknown'
+                    break
                 
                 # Second approach: via microformat
                 if self.info['title'] == 'Unknown Playlist':
@@ -131,6 +174,7 @@ class CustomPlaylist:
                 if not playlist_contents:
                     print("Could not find playlist contents")
                     self.has_more_videos = False
+                    self._set_failure("empty", "No playlist contents")
                     return
                 
                 videos_fetched = 0
@@ -173,9 +217,9 @@ class CustomPlaylist:
                             'link': f"https://www.youtube.com/watch?v={video_id}"
                         }
                         
-                        self.videos.append(video_data)
-                        videos_fetched += 1
-                        self._total_videos_fetched += 1
+                        if self._add_video(video_data):
+                            videos_fetched += 1
+                            self._total_videos_fetched += 1
                     
                     # Check for continuation token if we haven't found it yet
                     if not self.continuation_token and 'continuationItemRenderer' in item:
@@ -206,8 +250,27 @@ class CustomPlaylist:
                 
         except Exception as e:
             print(f"Error initializing playlist: {e}")
+            self._set_failure("transient", str(e))
             self.has_more_videos = False
     
+    def _set_failure(self, failure, reason):
+        """Record why the playlist could not be read, keeping the first (most specific) failure"""
+        if self.failure is None:
+            self.failure = failure
+            self.failure_reason = reason
+    
+    def _extract_alert_text(self, initial_data):
+        """Join the texts of the alerts shown on the playlist page"""
+        texts = []
+        for alert in initial_data.get('alerts', []):
+            renderer = alert.get('alertRenderer') or alert.get('alertWithButtonRenderer') or {}
+            text = renderer.get('text', {})
+            if 'simpleText' in text:
+                texts.append(text['simpleText'])
+            else:
+                texts.append(''.join(run.get('text', '') for run in text.get('runs', [])))
+        return ' '.join(text for text in texts if text)
+    
     def get_next_videos(self, batch_size=None):
         """Fetch next batch of videos using continuation token"""
         if not self.continuation_token or not self.has_more_videos:
@@ -400,9 +463,9 @@ class CustomPlaylist:
                         'link': f"https://www.youtube.com/watch?v={video_id}"
                     }
                     
-                    self.videos.append(video_data)
-                    videos_fetched += 1
-                    self._total_videos_fetched += 1
+                    if self._add_video(video_data):
+                        videos_fetched += 1
+                        self._total_videos_fetched += 1
             
             # Update continuation token if found
             if new_continuation_token:
@@ -435,6 +498,45 @@ class CustomPlaylist:
             self.has_more_videos = False
             return False
     
+    def get_stats(self):
+        """
+        Summarize the playlist from the first page only, without paging through it
+
+        Header totals (video count, view count) come from the playlist page that was
+        loaded in _init_playlist. Total duration is estimated from the lengthText values
+        of the videos on that page, with a confidence that reflects how representative
+        the sample is.
+
+        Returns:
+            dict: Playlist statistics, or None if the first page had no usable data
+        """
+        video_count = int(self.info['videoCount']) if str(self.info.get('videoCount', '')).isdigit() else None
+        view_count = int(self.info['viewCount']) if str(self.info.get('viewCount', '')).isdigit() else None
+
+        if not self.videos:
+            return None
+
+        # Header count is missing on some layouts; the page itself is a lower bound
+        if not video_count:
+            video_count = len(self.videos) if not self.continuation_token else None
+        if not video_count:
+            return None
+
+        summary = summarize_durations(parse_durations([video.duration for video in self.videos]), video_count)
+
+        return {
+            'id': self.playlist_id,
+            'title': self.info.get('title', 'Unknown Playlist'),
+            'channel': self.info.get('channel', {'name': 'Unknown Channel'}),
+            'video_count': video_count,
+            'view_count': view_count,
+            'first_video': self.videos[0],
+            'avg_duration_minutes': summary['avg_duration_minutes'],
+            'total_duration_minutes': summary['total_duration_minutes'],
+            'duration_sample_size': summary['sample_size'],
+            'duration_confidence': round(summary['confidence'], 3)
+        }
+
     @property
     def hasMoreVideos(self):
         """Property to match youtube-search-python API"""
@@ -444,8 +546,8 @@ class CustomPlaylist:
         """Method to match youtube-search-python API with batch size support"""
         return self.get_next_videos(batch_size) 
 
-    async def _fetch_remaining_videos_with_api(self, start_index: int, total_videos: int) -> None:
-        """Fetch remaining videos from a playlist using YouTube's internal API"""
+    async def _iter_remaining_videos_with_api(self, start_index: int, total_videos: int):
+        """Fetch remaining videos from a playlist using YouTube's internal API, yielding after each batch"""
         try:
             # Initialize variables
             self._continuation_token = None
@@ -560,11 +662,7 @@ class CustomPlaylist:
                             # Add videos to our list
                             videos_added = 0
                             for video_id, title in unique_videos.items():
-                                # Skip videos we already have
-                                if any(v.get('id') == video_id for v in self.videos):
-                                    continue
-                                
-                                # Create video data
+                                # Create video data (videos we already have are skipped)
                                 video_data = {
                                     'id': video_id,
                                     'title': title,
@@ -573,14 +671,16 @@ class CustomPlaylist:
                                     'link': f"https://www.youtube.com/watch?v={video_id}"
                                 }
                                 
-                                self.videos.append(video_data)
-                                videos_added += 1
+                                if self._add_video(video_data):
+                                    videos_added += 1
                             
                             print(f"Extracted {videos_added} videos directly from page")
+                            if videos_added > 0:
+                                yield videos_added
                             
                             # Create a fake continuation token to continue fetching
                             if videos_added > 0:
-                                self._continuation_token = f"fake_token_{self.playlist_id}_{len(self.videos)}"
+                                self._continuation_token = f"fake_token_{self.playlist_id}_{len(self._seen_video_ids)}"
                                 print(f"Created fake continuation token to continue fetching: {self._continuation_token[:20]}...")
                         except Exception as e:
                             print(f"Error extracting videos from page: {e}")
@@ -592,13 +692,13 @@ class CustomPlaylist:
                         return
                     
                     # Now fetch the remaining videos with the continuation token
-                    videos_before = len(self.videos)
+                    videos_before = len(self._seen_video_ids)
                     batch_count = 0
                     max_batches = 20  # Limit to prevent infinite loops
                     
-                    while self._continuation_token and len(self.videos) < total_videos and batch_count < max_batches:
+                    while self._continuation_token and len(self._seen_video_ids) < total_videos and batch_count < max_batches:
                         batch_count += 1
-                        print(f"Fetching batch {batch_count}/{max_batches}... (Current total: {len(self.videos)} videos)")
+                        print(f"Fetching batch {batch_count}/{max_batches}... (Current total: {len(self._seen_video_ids)} videos)")
                         
                         # Check if we're using a fake token
                         if self._continuation_token.startswith("fake_token_"):
@@ -611,7 +711,7 @@ class CustomPlaylist:
                             try:
                                 current_index = int(self._continuation_token.split("_")[-1])
                             except:
-                                current_index = len(self.videos)
+                                current_index = len(self._seen_video_ids)
                             
                             # Calculate the page number (each page has about 100 videos)
                             page_number = (current_index // 100) + 1
@@ -650,11 +750,7 @@ class CustomPlaylist:
                                     # Add videos to our list
                                     videos_added = 0
                                     for video_id, title in unique_videos.items():
-                                        # Skip videos we already have
-                                        if any(v.get('id') == video_id for v in self.videos):
-                                            continue
-                                        
-                                        # Create video data
+                                        # Create video data (videos we already have are skipped)
                                         video_data = {
                                             'id': video_id,
                                             'title': title,
@@ -663,14 +759,14 @@ class CustomPlaylist:
                                             'link': f"https://www.youtube.com/watch?v={video_id}"
                                         }
                                         
-                                        self.videos.append(video_data)
-                                        videos_added += 1
+                                        if self._add_video(video_data):
+                                            videos_added += 1
                                     
                                     print(f"Extracted {videos_added} videos from page {page_number}")
                                     
                                     # Update the fake token for the next batch
                                     if videos_added > 0:
-                                        self._continuation_token = f"fake_token_{self.playlist_id}_{len(self.videos)}"
+                                        self._continuation_token = f"fake_token_{self.playlist_id}_{len(self._seen_video_ids)}"
                                         print(f"Updated fake token: {self._continuation_token[:20]}...")
                                     else:
                                         # If we didn't find any new videos, stop fetching
@@ -684,15 +780,19 @@ class CustomPlaylist:
                             await self._fetch_videos_with_continuation(session, total_videos)
                         
                         # If we didn't get any new videos and this isn't the first batch, break
-                        if len(self.videos) == videos_before and batch_count > 1:
+                        if len(self._seen_video_ids) == videos_before and batch_count > 1:
                             print("No new videos fetched. Stopping.")
                             break
+                        
+                        if len(self._seen_video_ids) > videos_before:
+                            # The next batch is only requested once the consumer asks for more
+                            yield len(self._seen_video_ids) - videos_before
                             
-                        videos_before = len(self.videos)
+                        videos_before = len(self._seen_video_ids)
                         # Add a small delay between requests
                         await asyncio.sleep(1)
                     
-                    print(f"Finished fetching videos. Total videos: {len(self.videos)}")
+                    print(f"Finished fetching videos. Total videos: {len(self._seen_video_ids)}")
             
         except Exception as e:
             print(f"Error fetching remaining videos: {e}")
@@ -968,7 +1068,7 @@ class CustomPlaylist:
                         continue
                     
                     # Skip videos we already have
-                    if any(v.get('id') == video_id for v in self.videos):
+                    if video_id in self._seen_video_ids:
                         print(f"Skipping duplicate video: {video_id}")
                         continue
                     
@@ -1020,11 +1120,11 @@ class CustomPlaylist:
                                 video_data['views'] = run['text']
                                 break
                     
-                    self.videos.append(video_data)
+                    self._add_video(video_data)
                     videos_added += 1
-                    print(f"Fetched video {len(self.videos)}/{total_videos}: {title}")
+                    print(f"Fetched video {len(self._seen_video_ids)}/{total_videos}: {title}")
                 
-                print(f"Added {videos_added} videos in this batch. Total videos: {len(self.videos)}")
+                print(f"Added {videos_added} videos in this batch. Total videos: {len(self._seen_video_ids)}")
                 
                 # If we didn't find a continuation token in the items, try to find it in the raw response
                 if not self._continuation_token:
@@ -1052,7 +1152,7 @@ class CustomPlaylist:
                     if not self._continuation_token and videos_added > 0:
                         # Create a fake token based on the current video count
                         # This will allow us to continue fetching even if the API doesn't provide a token
-                        current_count = len(self.videos)
+                        current_count = len(self._seen_video_ids)
                         # Only create a fake token if we haven't reached the end of the playlist
                         if total_videos > current_count:
                             self._continuation_token = f"fake_token_{self.playlist_id}_{current_count}"
@@ -1072,8 +1172,43 @@ class CustomPlaylist:
             traceback.print_exc()
             self._continuation_token = None
 
-    async def fetch_playlist(self) -> bool:
-        """Fetch all videos in the playlist using yt-dlp and YouTube's internal API"""
+    async def fetch_playlist(self, limit: int = 0) -> bool:
+        """
+        Fetch videos in the playlist using yt-dlp and YouTube's internal API
+        
+        The fetched videos are kept in self.videos as VideoRecords.
+        
+        Args:
+            limit: Stop fetching once this many videos are collected (0 for all videos)
+        """
+        async for _ in self.iter_pages(limit=limit, retain=True):
+            pass
+        return self._fetch_succeeded
+    
+    async def iter_pages(self, limit: int = 0, retain: bool = False):
+        """
+        Yield batches of VideoRecords as each page or continuation response arrives
+        
+        Usage:
+            async for batch in playlist.iter_pages(limit=50):
+                ...
+        
+        The next page is only requested once the consumer asks for the next batch.
+        Call aclose() on the iterator when stopping early so the HTTP session is
+        closed straight away rather than when the generator is garbage collected.
+        
+        Args:
+            limit: Stop once this many videos have been yielded (0 for all videos)
+            retain: Keep yielded records in self.videos (fetch_playlist behaviour).
+                    When False, only the IDs are kept for deduplication.
+        """
+        self.videos = []
+        self._seen_video_ids = set()
+        self._batch_start = 0
+        self._retain_videos = retain
+        self._fetch_succeeded = False
+        yielded_count = 0
+        
         try:
             url = f"https://www.youtube.com/playlist?list={self.playlist_id}"
             print(f"Fetching playlist: {url}")
@@ -1090,15 +1225,17 @@ class CustomPlaylist:
                 'geo_bypass': True,
                 'socket_timeout': 30,
                 'retries': 10,
-                'playlistend': 100,  # Limit to first 100 videos for initial fetch
+                'playlistend': min(limit, 100) if limit > 0 else 100,  # Limit to first 100 videos for initial fetch
                 'playliststart': 1,
             }
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                playlist_info = ydl.extract_info(url, download=False)
+                # yt-dlp is blocking, keep it off the event loop
+                loop = asyncio.get_running_loop()
+                playlist_info = await loop.run_in_executor(None, lambda: ydl.extract_info(url, download=False))
                 
                 if not playlist_info:
-                    return False
+                    return
             
                 # Extract playlist metadata
                 self.info = {
@@ -1123,12 +1260,14 @@ class CustomPlaylist:
                 # Set videoCount in self.info
                 self.info['videoCount'] = str(total_videos)
                 
+                # Number of videos we actually need to collect
+                target_videos = min(total_videos, limit) if limit > 0 else total_videos
+                
                 print(f"Found playlist: {self.info['title']}")
                 print(f"Channel: {self.info['channel']['name']}")
                 print(f"Total videos in playlist: {total_videos}")
                 
                 # Process videos from yt-dlp
-                self.videos = []
                 for entry in entries:
                     if not entry:
                         continue
@@ -1144,14 +1283,20 @@ class CustomPlaylist:
                     # Create video data object
                     video_data = self._extract_video_info(None, title, channel, duration, video_id)
                     
-                    self.videos.append(video_data)
+                    self._add_video(video_data)
+                
+                print(f"Initial batch: Fetched {len(self._seen_video_ids)} videos (Total: {total_videos})")
                 
-                print(f"Initial batch: Fetched {len(self.videos)} videos (Total: {total_videos})")
+                batch = self._take_batch(limit, yielded_count)
+                if batch:
+                    yielded_count += len(batch)
+                    yield batch
                 
                 # If there are no more videos to fetch, we're done
-                if total_videos <= len(self.videos) or total_videos <= 100:
-                    print(f"All videos fetched. Total: {len(self.videos)}")
-                    return True
+                if target_videos <= len(self._seen_video_ids) or total_videos <= 100:
+                    print(f"All videos fetched. Total: {len(self._seen_video_ids)}")
+                    self._fetch_succeeded = True
+                    return
                 
                 # We need to fetch more videos - prepare to use the webpage approach
                 headers = {
@@ -1201,16 +1346,20 @@ class CustomPlaylist:
                                 
                                 videos_added = 0
                                 for video_id, title, channel in videos_found:
-                                    # Skip videos we already have
-                                    if any(v.get('id') == video_id for v in self.videos):
-                                        continue
+                                    if len(self._seen_video_ids) >= target_videos:
+                                        break
                                     
-                                    # Create video data object
+                                    # Create video data object (videos we already have are skipped)
                                     video_data = self._extract_video_info(None, title, channel, "Unknown", video_id)
-                                    self.videos.append(video_data)
-                                    videos_added += 1
+                                    if self._add_video(video_data):
+                                        videos_added += 1
+                                
+                                print(f"Added {videos_added} videos from page {page_num}. Total: {len(self._seen_video_ids)}")
                                 
-                                print(f"Added {videos_added} videos from page {page_num}. Total: {len(self.videos)}")
+                                batch = self._take_batch(limit, yielded_count)
+                                if batch:
+                                    yielded_count += len(batch)
+                                    yield batch
                                 
                                 # If we didn't add any new videos, we're probably at the end
                                 if videos_added == 0:
@@ -1218,8 +1367,8 @@ class CustomPlaylist:
                                     break
                                 
                                 # If we've fetched all videos or reached a limit, stop
-                                if len(self.videos) >= total_videos or len(self.videos) >= 500:
-                                    print(f"All videos fetched or reached limit. Total: {len(self.videos)}")
+                                if len(self._seen_video_ids) >= target_videos or len(self._seen_video_ids) >= 500:
+                                    print(f"All videos fetched or reached limit. Total: {len(self._seen_video_ids)}")
                                     break
                         
                         except Exception as e:
@@ -1227,7 +1376,7 @@ class CustomPlaylist:
                             continue
                 
                 # If we still haven't found all videos, try the continuation token approach
-                if len(self.videos) < total_videos and len(self.videos) < 500:
+                if len(self._seen_video_ids) < target_videos and len(self._seen_video_ids) < 500:
                     print(f"Trying continuation token approach for remaining videos...")
                     self._continuation_token = None
                     
@@ -1257,18 +1406,51 @@ class CustomPlaylist:
                             
                             if self._continuation_token:
                                 # Fetch videos using continuation token
-                                await self._fetch_remaining_videos_with_api(len(self.videos), total_videos)
+                                remaining = self._iter_remaining_videos_with_api(len(self._seen_video_ids), target_videos)
+                                try:
+                                    async for _ in remaining:
+                                        batch = self._take_batch(limit, yielded_count)
+                                        if batch:
+                                            yielded_count += len(batch)
+                                            yield batch
+                                        if limit > 0 and yielded_count >= limit:
+                                            break
+                                finally:
+                                    await remaining.aclose()
                     except Exception as e:
                         print(f"Error extracting continuation token: {e}")
                 
-                print(f"Successfully fetched {len(self.videos)} videos out of approximately {total_videos}")
-                return True
+                print(f"Successfully fetched {yielded_count} videos out of approximately {total_videos}")
+                self._fetch_succeeded = True
                 
         except Exception as e:
             print(f"Error fetching playlist: {e}")
             import traceback
             traceback.print_exc()
+    
+    def _add_video(self, video_data):
+        """Collect a parsed video as a compact VideoRecord, returning False if it was already collected"""
+        if video_data['id'] in self._seen_video_ids:
             return False
+        self._seen_video_ids.add(video_data['id'])
+        self.videos.append(VideoRecord.from_entry(video_data))
+        return True
+    
+    def _take_batch(self, limit, yielded_count):
+        """Return the videos collected since the last batch, trimmed to the remaining limit"""
+        batch = self.videos[self._batch_start:]
+        if limit > 0:
+            batch = batch[:max(0, limit - yielded_count)]
+        
+        if self._retain_videos:
+            # Drop any overshoot past the limit so self.videos matches what was yielded
+            del self.videos[self._batch_start + len(batch):]
+            self._batch_start = len(self.videos)
+        else:
+            self.videos = []
+            self._batch_start = 0
+        return batch
+    
             
     def _extract_videos_from_html(self, html):
         """Extract video IDs, titles, and channels from HTML"""
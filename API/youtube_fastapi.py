@@ -1,5 +1,6 @@
 from fastapi import FastAPI, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any
 import uvicorn
 import logging
@@ -9,15 +10,31 @@ import types
 import re
 import traceback
 import time  # Add time module for retries and backoff
+import asyncio
+import contextvars
 from pydantic import BaseModel
 from Youtube import (
     get_video_details,
+    get_videos_details,
     get_playlist_videos,
+    get_playlist_stats,
+    iter_playlist_videos,
     search_youtube,
     search_playlists,
-    find_best_playlist as original_find_best_playlist
+    find_best_playlist as original_find_best_playlist,
+    CleaningPlaylistPipeline,
+    clean_repeated_title
 )
+from playlist_scorer import validate_scoring_config
+from rescore import rescore
 import relevance_checker  # Import our new relevance checker module
+from groq_client import close_groq_client
+from llm_providers import providers_stats
+from tech_extractor import get_tech_extractor
+from job_queue import JobQueueFull, get_job_queue
+from playlist_scorer import SCORING_CONFIG
+from prewarm import PREWARM_ENABLED, PrewarmScheduler, get_prewarm_store
+from usage_meter import current_labels, get_usage_meter, usage_labels
 import os
 import json
 from difflib import SequenceMatcher
@@ -112,15 +129,58 @@ class RelevanceResponse(BaseModel):
 class BatchRelevanceResponse(BaseModel):
     results: List[Dict[str, Any]]
 
+class VideoDetailsBatchRequest(BaseModel):
+    ids: List[str]
+    fields: Optional[List[str]] = None
+
+# Maximum number of IDs accepted by POST /videos/details
+MAX_VIDEO_DETAILS_BATCH = 300
+
+class BestPlaylistJobRequest(BaseModel):
+    query: str
+    debug: bool = False
+    max_videos: int = 0
+
+# Longest long-poll accepted by GET /jobs/{job_id}
+MAX_JOB_WAIT_SECONDS = 30
+
+class ExtractTechnologiesRequest(BaseModel):
+    texts: List[str]
+
+# Maximum number of texts accepted by POST /extract-technologies
+MAX_EXTRACTION_BATCH = 1000
+
+class RescoreRequest(BaseModel):
+    config: Dict[str, Any]
+    base_config: Optional[Dict[str, Any]] = None
+    query: Optional[str] = None
+    limit: Optional[int] = None
+
+@app.middleware("http")
+async def label_llm_usage(request, call_next):
+    """Attribute the LLM usage of a request to its endpoint in the usage meter"""
+    with usage_labels(endpoint=request.url.path):
+        return await call_next(request)
+
 @app.on_event("startup")
 async def startup_event():
     """Startup event handler"""
     logger.info("Starting YouTube API with lightweight technology matching")
+    job_queue = get_job_queue()
+    job_queue.register("best-playlist", run_best_playlist_job)
+    job_queue.start()
+    if PREWARM_ENABLED:
+        get_prewarm_scheduler().start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Shutdown event handler"""
     logger.info("Shutting down YouTube API")
+    # Queued jobs stay in the job store and run again after a restart
+    get_job_queue().stop()
+    get_prewarm_scheduler().stop()
+    # Close the pooled Groq connections used by the relevance checks
+    await asyncio.get_running_loop().run_in_executor(None, close_groq_client)
     # Add a small delay to ensure resources are properly released
     # This helps prevent issues during hot reloads
     try:
@@ -135,85 +195,6 @@ async def shutdown_event():
     except:
         pass
 
-def clean_repeated_title(data: Dict[str, Any]) -> Dict[str, Any]:
-    """Clean repeated titles in data recursively, handling any nested structures"""
-    if not data:
-        return data
-    
-    # Handle dictionary case
-    if isinstance(data, dict):
-        # Clean title if present
-        if "title" in data and isinstance(data["title"], str):
-            # First handle newlines
-            if '\n' in data["title"]:
-                data["title"] = data["title"].split('\n')[0].strip()
-            
-            # Try to use the preprocess_title function from relevance_checker if available
-            try:
-                original_title = data["title"]
-                data["title"] = relevance_checker.preprocess_title(original_title, max_length=200)
-                
-                # Only log if title was modified significantly
-                if original_title != data["title"] and len(original_title) > 50:
-                    logger.info(f"Title cleaned with preprocess_title: {len(original_title)} chars -> {len(data['title'])} chars")
-                    if len(original_title) > 100:
-                        logger.info(f"Original (truncated): {original_title[:40]}...{original_title[-40:]}")
-                        logger.info(f"Cleaned: {data['title']}")
-            except (AttributeError, ImportError):
-                # If relevance_checker.preprocess_title is not available, use our local implementation
-                title = data["title"]
-                
-                # Handle repetitive patterns (3 or more repetitions)
-                # This regex finds patterns of 3+ words that repeat
-                repetition_pattern = r'(\b[\w\s]{5,50}\b)(\s+\1){2,}'
-                
-                # Keep checking for repetitions until no more are found
-                prev_title = ""
-                current_title = title
-                
-                while prev_title != current_title:
-                    prev_title = current_title
-                    
-                    # Find repetitive patterns
-                    match = re.search(repetition_pattern, current_title, re.IGNORECASE)
-                    if match:
-                        # Get the repeating pattern
-                        pattern = match.group(1)
-                        # Replace multiple repetitions with just one instance
-                        replacement = pattern
-                        # Create a regex that matches 2 or more repetitions of this exact pattern
-                        exact_pattern = re.escape(pattern) + r'(\s+' + re.escape(pattern) + r'){1,}'
-                        current_title = re.sub(exact_pattern, replacement, current_title, flags=re.IGNORECASE)
-                
-                # Truncate if still too long
-                max_length = 200
-                if len(current_title) > max_length:
-                    logger.warning(f"Title too long ({len(title)} chars), truncating to {max_length} chars")
-                    current_title = current_title[:max_length] + "..."
-                
-                # Only log if title was modified significantly
-                if title != current_title and len(title) > 50:
-                    logger.info(f"Title cleaned with local function: {len(title)} chars -> {len(current_title)} chars")
-                    if len(title) > 100:
-                        logger.info(f"Original (truncated): {title[:40]}...{title[-40:]}")
-                        logger.info(f"Cleaned: {current_title}")
-                
-                data["title"] = current_title
-        
-        # Recursively clean all nested dictionaries and lists
-        for key, value in data.items():
-            if isinstance(value, (dict, list)):
-                data[key] = clean_repeated_title(value)
-                
-    # Handle list case
-    elif isinstance(data, list):
-        # Clean each item in the list
-        for i, item in enumerate(data):
-            if isinstance(item, (dict, list)):
-                data[i] = clean_repeated_title(item)
-    
-    return data
-
 # Technology matching utility functions
 def normalize_tech_name(tech_name: str) -> str:
     """Normalize technology name for better matching"""
@@ -359,13 +340,44 @@ async def video_details(url: str = Query(..., description="YouTube video URL or
         logger.error(f"Error fetching video details: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/videos/details", tags=["Video"])
+async def videos_details(request: VideoDetailsBatchRequest):
+    """Get details for many videos at once, keyed by video ID"""
+    if len(request.ids) > MAX_VIDEO_DETAILS_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_VIDEO_DETAILS_BATCH} video IDs can be requested at once")
+    
+    try:
+        # Fetching blocks on yt-dlp subprocesses, keep it off the event loop
+        loop = asyncio.get_running_loop()
+        videos = await loop.run_in_executor(None, get_videos_details, request.ids, request.fields)
+        return {
+            "videos": {video_id: clean_repeated_title(details) for video_id, details in videos.items()},
+            "count": len(videos)
+        }
+    except Exception as e:
+        logger.error(f"Error fetching video details batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/playlist/videos", tags=["Playlist"])
 async def playlist_videos(
     url: str = Query(..., description="YouTube playlist URL or ID"),
     limit: int = Query(0, description="Maximum number of videos to retrieve (0 for all)"),
-    max_details: int = Query(15, description="Maximum number of videos to fetch detailed info for")
+    max_details: int = Query(15, description="Maximum number of videos to fetch detailed info for"),
+    stream: bool = Query(False, description="Stream NDJSON: a playlist line, one line per video as it is fetched, then an end line")
 ):
     """Get all videos from a YouTube playlist"""
+    if stream:
+        async def ndjson_lines():
+            try:
+                async for item in iter_playlist_videos(url, limit, max_details):
+                    yield json.dumps(clean_repeated_title(item)) + "\n"
+            except Exception as e:
+                # Headers are already sent, report the failure in-band
+                logger.error(f"Error streaming playlist videos: {str(e)}")
+                yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+        
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+    
     try:
         playlist_data = get_playlist_videos(url, limit, max_details)
         # Clean all titles recursively
@@ -375,6 +387,23 @@ async def playlist_videos(
         logger.error(f"Error fetching playlist videos: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/playlist/stats", tags=["Playlist"])
+async def playlist_stats(
+    url: str = Query(..., description="YouTube playlist URL or ID"),
+    max_details: int = Query(1, description="Fetch detailed info for the first video (0 to skip)")
+):
+    """Get playlist statistics from the first page without fetching every video"""
+    try:
+        stats = get_playlist_stats(url, max_details)
+        if not stats:
+            raise HTTPException(status_code=404, detail="Could not read playlist statistics")
+        return clean_repeated_title(stats)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching playlist stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/search/videos", tags=["Search"])
 async def search_videos(
     query: str = Query(..., description="Search query"),
@@ -408,6 +437,81 @@ async def search_playlists_endpoint(
         logger.error(f"Error searching playlists: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+class JobPlaylistPipeline(CleaningPlaylistPipeline):
+    """Pipeline for background jobs: progress messages are also published on the job"""
+    
+    def __init__(self, report):
+        super().__init__()
+        self.report = report
+    
+    def log(self, message):
+        super().log(message)
+        self.report(message)
+
+def best_playlist_response(best_playlist_result, max_videos):
+    """Shape a find_best_playlist result for the API"""
+    if not best_playlist_result:
+        return {"status": "no_suitable_playlist", "message": "No suitable playlist found"}
+    
+    # Clean any remaining problematic titles in the result
+    best_playlist_result = clean_repeated_title(best_playlist_result)
+    
+    # Limit the number of videos if requested (playlists scored in full mode are fetched whole)
+    if max_videos > 0 and "playlist" in best_playlist_result and "videos" in best_playlist_result["playlist"]:
+        best_playlist_result["playlist"]["videos"] = best_playlist_result["playlist"]["videos"][:max_videos]
+    
+    return best_playlist_result
+
+def find_best_playlist_cached(query, debug, max_videos, pipeline):
+    """
+    find_best_playlist through the pre-warmed result store (see prewarm.py)
+    
+    Only with PREWARM_ENABLED; otherwise every search runs live and nothing is stored.
+    Every call counts towards the topic's popularity. Debug searches always run live;
+    other searches are answered from a stored result computed under the current scoring
+    config, and complete results (max_videos=0) are stored for the next request.
+    """
+    if not PREWARM_ENABLED:
+        return original_find_best_playlist(query, debug, max_videos=max_videos, pipeline=pipeline)
+    
+    store = get_prewarm_store()
+    store.record_request(query)
+    if debug:
+        return original_find_best_playlist(query, debug, max_videos=max_videos, pipeline=pipeline)
+    
+    cached = store.get_result(query, SCORING_CONFIG["version"])
+    if cached is not None:
+        pipeline.log(f"Using stored best playlist for: {query}")
+        return cached
+    
+    result = original_find_best_playlist(query, debug, max_videos=max_videos, pipeline=pipeline)
+    if result and max_videos == 0:
+        store.put_result(query, SCORING_CONFIG["version"], result)
+    return result
+
+_prewarm_scheduler = None
+
+def get_prewarm_scheduler():
+    """Return the scheduler refreshing popular topics, creating it (not started) on first use"""
+    global _prewarm_scheduler
+    if _prewarm_scheduler is None:
+        _prewarm_scheduler = PrewarmScheduler(
+            get_prewarm_store(),
+            lambda query: original_find_best_playlist(query, pipeline=CleaningPlaylistPipeline()),
+            SCORING_CONFIG["version"]
+        )
+    return _prewarm_scheduler
+
+def run_best_playlist_job(params, report):
+    """Job handler behind POST /jobs/best-playlist, run on a job queue worker thread"""
+    # The worker runs in the submitting request's context; the endpoint is only a default
+    # for jobs queued again at startup
+    with usage_labels(**{"endpoint": "/jobs/best-playlist", **current_labels()}):
+        result = find_best_playlist_cached(
+            params["query"], params["debug"], params["max_videos"], JobPlaylistPipeline(report)
+        )
+    return best_playlist_response(result, params["max_videos"])
+
 @app.get("/find/best-playlist", tags=["Recommendations"])
 async def find_best_playlist_endpoint(
     query: str = Query(..., description="Topic to find the best educational playlist for"),
@@ -418,75 +522,104 @@ async def find_best_playlist_endpoint(
     try:
         logger.info(f"Finding best playlist for: {query}")
         
-        # Monkey patch the get_playlist_videos function to clean titles
-        # This ensures that all playlist data has clean titles
-        original_get_playlist_videos = get_playlist_videos
-        
-        def enhanced_get_playlist_videos(playlist_id_or_url, limit=0, max_details=15):
-            """Enhanced version of get_playlist_videos that cleans titles"""
-            result = original_get_playlist_videos(playlist_id_or_url, limit, max_details)
-            
-            # Clean titles in the result
-            if result:
-                result = clean_repeated_title(result)
-                
-                # Ensure all video titles are also cleaned
-                if "videos" in result and isinstance(result["videos"], list):
-                    for video in result["videos"]:
-                        if isinstance(video, dict) and "title" in video:
-                            # Clean any remaining problematic titles
-                            if '\n' in video["title"]:
-                                video["title"] = video["title"].split('\n')[0].strip()
-            
-            return result
-        
-        # Apply the monkey patch
-        import types
-        import Youtube
-        Youtube.get_playlist_videos = enhanced_get_playlist_videos
-        
-        # Also monkey patch the score_playlist function to add more logging
-        original_score_playlist = Youtube.score_playlist
-        
-        def score_playlist_with_logging(playlist, query, debug=False, relevance_check=None):
-            """Enhanced version of score_playlist with more logging"""
-            # Clean any titles in the playlist before scoring
-            if playlist:
-                playlist = clean_repeated_title(playlist)
-            
-            # Log the playlist title
-            if playlist and "title" in playlist:
-                logger.info(f"Scoring playlist: {playlist['title']}")
-            
-            # Call the original function
-            return original_score_playlist(playlist, query, debug, relevance_check)
-        
-        # Apply the second monkey patch
-        Youtube.score_playlist = score_playlist_with_logging
-        
-        # Call the find_best_playlist function
-        best_playlist_result = original_find_best_playlist(query, debug)
-        
-        # Restore the original functions
-        Youtube.get_playlist_videos = original_get_playlist_videos
-        Youtube.score_playlist = original_score_playlist
-        
-        if not best_playlist_result:
-            return {"status": "no_suitable_playlist", "message": "No suitable playlist found"}
-        
-        # Clean any remaining problematic titles in the result
-        best_playlist_result = clean_repeated_title(best_playlist_result)
-        
-        # Limit the number of videos if requested
-        if max_videos > 0 and "playlist" in best_playlist_result and "videos" in best_playlist_result["playlist"]:
-            best_playlist_result["playlist"]["videos"] = best_playlist_result["playlist"]["videos"][:max_videos]
+        # Clean titles and log through the pipeline hooks for this request only. No globals are
+        # patched, so the blocking search can run in a worker thread alongside other requests
+        # run_in_executor does not carry context variables, so the search runs in a copy of
+        # this request's context to keep its usage labels
+        loop = asyncio.get_running_loop()
+        best_playlist_result = await loop.run_in_executor(
+            None,
+            contextvars.copy_context().run,
+            lambda: find_best_playlist_cached(query, debug, max_videos, CleaningPlaylistPipeline())
+        )
         
-        return best_playlist_result
+        return best_playlist_response(best_playlist_result, max_videos)
     except Exception as e:
         logger.error(f"Error finding best playlist: {e}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error finding best playlist: {str(e)}")
 
+@app.post("/jobs/best-playlist", tags=["Recommendations"], status_code=202)
+async def submit_best_playlist_job(request: BestPlaylistJobRequest):
+    """
+    Start a best-playlist search in the background and return its job at once
+    
+    A search for the same query and options that is still queued or running is reused
+    instead of started again (deduplicated is then true). Poll GET /jobs/{job_id} for
+    progress and the result.
+    """
+    params = {"query": request.query, "debug": request.debug, "max_videos": request.max_videos}
+    # Queries differing only in case or surrounding whitespace are the same search
+    dedup_key = json.dumps({**params, "query": request.query.strip().lower()}, sort_keys=True)
+    try:
+        job, created = get_job_queue().submit("best-playlist", params, dedup_key=dedup_key)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    
+    logger.info(f"{'Queued' if created else 'Reusing'} best-playlist job {job['id']} for: {request.query}")
+    return {**job, "deduplicated": not created}
+
+@app.get("/jobs/{job_id}", tags=["Recommendations"])
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, description=f"Seconds to wait for the job to finish before answering (long-poll, at most {MAX_JOB_WAIT_SECONDS})")
+):
+    """Status, latest progress message and, once done, the result (or error) of a job"""
+    job = await get_job_queue().wait(job_id, min(max(wait, 0), MAX_JOB_WAIT_SECONDS))
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@app.get("/prewarm/status", tags=["Recommendations"])
+async def prewarm_status():
+    """
+    Most requested topics and the age of their stored best-playlist result
+    
+    Also reports whether the pre-warming scheduler runs, its off-peak window and rate
+    budget, and which topics are due for a refresh.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, get_prewarm_scheduler().status)
+
+@app.post("/rescore", tags=["Recommendations"])
+async def rescore_endpoint(request: RescoreRequest):
+    """Re-rank stored best-playlist candidates under a new scoring config, without calling YouTube"""
+    try:
+        config = validate_scoring_config(request.config)
+        base_config = validate_scoring_config(request.base_config) if request.base_config else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid scoring config: {e}")
+    
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: rescore(config, base_config=base_config, query=request.query, limit=request.limit)
+        )
+    except Exception as e:
+        logger.error(f"Error rescoring candidates: {e}")
+        raise HTTPException(status_code=500, detail=f"Error rescoring candidates: {str(e)}")
+
+@app.get("/metrics/llm", tags=["Relevance"])
+async def llm_metrics():
+    """
+    LLM usage since startup
+    
+    Prompt/completion tokens, estimated cost, latency histogram, retries and relevance cache
+    hits, in total and per endpoint, technology and model.
+    """
+    return get_usage_meter().snapshot()
+
+@app.get("/llm/providers", tags=["Relevance"])
+async def llm_providers():
+    """
+    Health of the LLM backends per task
+    
+    Circuit state, calls, failures, hedged starts, wins and average latency of every
+    relevance and extraction backend, in order of preference.
+    """
+    return providers_stats()
+
 @app.post("/check-relevance", tags=["Relevance"], response_model=RelevanceResponse)
 async def check_title_relevance(request: RelevanceRequest):
     """
@@ -496,7 +629,7 @@ async def check_title_relevance(request: RelevanceRequest):
     """
     try:
         # Use our relevance checker module
-        result = relevance_checker.check_relevance(request.title, request.technology)
+        result = await relevance_checker.async_check_relevance(request.title, request.technology)
         
         return RelevanceResponse(
             isRelevant=result["isRelevant"],
@@ -517,13 +650,30 @@ async def check_batch_title_relevance(request: BatchRelevanceRequest):
     """
     try:
         # Use our batch relevance checker
-        result = relevance_checker.check_batch_relevance(request.titles, request.technology)
+        result = await relevance_checker.async_check_batch_relevance(request.titles, request.technology)
         return result
     except Exception as e:
         logger.error(f"Error checking batch title relevance: {e}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/extract-technologies", tags=["Relevance"])
+async def extract_technologies(request: ExtractTechnologiesRequest):
+    """
+    Extract the technologies mentioned in each text
+    
+    Repeated texts are extracted once and earlier answers are served from a cache; the
+    rest are sent to the extraction backends in concurrent chunks.
+    """
+    if len(request.texts) > MAX_EXTRACTION_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_EXTRACTION_BATCH} texts can be extracted at once")
+    
+    try:
+        return await get_tech_extractor().async_extract_batch(request.texts)
+    except Exception as e:
+        logger.error(f"Error extracting technologies: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     import os
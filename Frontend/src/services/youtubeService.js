@@ -429,32 +429,46 @@ export const fetchRealDurations = async (videos) => {
   
   console.log(`Found ${videosToUpdate.length} videos with placeholder durations`);
   
-  // Process in batches to avoid overloading the API
-  const batchSize = 5;
+  // Fetch all durations through the bulk endpoint (it accepts up to 300 IDs per request)
+  const batchSize = 300;
   const updatedVideos = [...videos]; // Create a copy to update
   
   for (let i = 0; i < videosToUpdate.length; i += batchSize) {
     const batch = videosToUpdate.slice(i, i + batchSize);
-    const promises = batch.map(video => getVideoDetails(video.url).catch(err => null));
     
     try {
-      const results = await Promise.all(promises);
+      const response = await fetch(`${API_URL}/videos/details`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          ids: batch.map(video => video.id),
+          fields: ['duration', 'duration_string']
+        })
+      });
+      
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      
+      const { videos: details } = await response.json();
       
       // Update videos with real durations
-      results.forEach((result, index) => {
+      batch.forEach(videoToUpdate => {
+        const result = details[videoToUpdate.id];
         if (!result) return; // Skip if we couldn't get details
         
-        const videoToUpdate = batch[index];
         const videoIndex = updatedVideos.findIndex(v => v.id === videoToUpdate.id);
         
         if (videoIndex !== -1) {
-          // Update duration information
-          if (result.duration_seconds) {
-            updatedVideos[videoIndex].duration_seconds = result.duration_seconds;
+          // Update duration information (the API returns duration in seconds)
+          if (result.duration) {
+            updatedVideos[videoIndex].duration_seconds = result.duration;
             
             // Format duration string
-            const minutes = Math.floor(result.duration_seconds / 60);
-            const seconds = result.duration_seconds % 60;
+            const minutes = Math.floor(result.duration / 60);
+            const seconds = result.duration % 60;
             updatedVideos[videoIndex].duration = `${minutes}:${seconds.toString().padStart(2, '0')}`;
           } else if (result.duration_string) {
             updatedVideos[videoIndex].duration = result.duration_string;
@@ -466,11 +480,6 @@ export const fetchRealDurations = async (videos) => {
     } catch (error) {
       console.error('Error fetching video details batch:', error);
     }
-    
-    // Add a small delay between batches to avoid rate limiting
-    if (i + batchSize < videosToUpdate.length) {
-      await new Promise(resolve => setTimeout(resolve, 500));
-    }
   }
   
   console.log(`Updated durations for ${videosToUpdate.length} videos`);